@@ -0,0 +1,131 @@
+"""Serialization share of /revenue/events and /revenue/summary request time.
+
+Seeds a throwaway SQLite database, then for each page size times:
+- query:  loading the page of `RevenueEvent` rows
+- legacy: `from_orm` per row, FastAPI's `response_model` validation and
+          `jsonable_encoder`-style dump, stdlib `json.dumps`
+- fast:   plain dicts encoded once by `FastJSONResponse`
+- request: the whole request through the ASGI app (current, fast path)
+
+Usage: python -m benchmarks.serialization [--rows 20000] [--repeat 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from branchberg.app.database import Base, RevenueEvent, get_db
+from branchberg.app.main import RevenueEventResponse, _revenue_event_dict, app
+from branchberg.app.serialization import FastJSONResponse
+
+PAGE_SIZES = (50, 500, 5000)
+
+
+def seed(session_factory, rows: int) -> None:
+    db = session_factory()
+    start = datetime(2026, 1, 1)
+    db.bulk_save_objects(
+        [
+            RevenueEvent(
+                id=str(uuid.uuid4()),
+                event_id=f"bench_{index}",
+                provider=("stripe", "gumroad", "manual")[index % 3],
+                event_type="sale",
+                amount_cents=100 + index,
+                currency="USD",
+                customer_email=f"buyer{index}@example.com",
+                entity="A+ Enterprise LLC",
+                event_metadata={"order": index, "source": "benchmark"},
+                created_at=start + timedelta(seconds=index),
+                processed_at=start + timedelta(seconds=index),
+            )
+            for index in range(rows)
+        ]
+    )
+    db.commit()
+    db.close()
+
+
+def median_ms(func: Callable[[], object], repeat: int) -> float:
+    """Median wall time of `func` in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+        seed(session_factory, args.rows)
+
+        def override_get_db():
+            db = session_factory()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+        client = TestClient(app)
+        adapter = TypeAdapter(List[RevenueEventResponse])
+
+        print(f"{'limit':>6} {'query':>9} {'legacy':>9} {'fast':>9} {'request':>9} {'share before':>13} {'share after':>12}")
+        for limit in PAGE_SIZES:
+            db = session_factory()
+            events = (
+                db.query(RevenueEvent).order_by(RevenueEvent.created_at.desc()).limit(limit).all()
+            )
+
+            def query():
+                db.expire_all()
+                db.query(RevenueEvent).order_by(RevenueEvent.created_at.desc()).limit(limit).all()
+
+            def legacy():
+                models = [RevenueEventResponse.from_orm(event) for event in events]
+                validated = adapter.validate_python(models)
+                json.dumps(adapter.dump_python(validated, mode="json")).encode()
+
+            def fast():
+                FastJSONResponse([_revenue_event_dict(event) for event in events])
+
+            query_ms = median_ms(query, args.repeat)
+            legacy_ms = median_ms(legacy, args.repeat)
+            fast_ms = median_ms(fast, args.repeat)
+            request_ms = median_ms(lambda: client.get("/revenue/events", params={"limit": limit}), args.repeat)
+            db.close()
+            print(
+                f"{limit:>6} {query_ms:>8.2f}ms {legacy_ms:>8.2f}ms {fast_ms:>8.2f}ms {request_ms:>8.2f}ms"
+                f" {legacy_ms / (query_ms + legacy_ms):>12.0%} {fast_ms / (query_ms + fast_ms):>11.0%}"
+            )
+
+        summary_ms = median_ms(lambda: client.get("/revenue/summary"), args.repeat)
+        print(f"/revenue/summary request: {summary_ms:.2f}ms")
+        app.dependency_overrides.pop(get_db, None)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
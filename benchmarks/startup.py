@@ -0,0 +1,123 @@
+"""Cold start of the revenue API: import time and time to first response.
+
+Each run is a fresh interpreter (as on a serverless cold start) against a
+throwaway SQLite database. The child process times:
+- import:  `import branchberg.app.main`
+- startup: the ASGI lifespan startup (init_db, background workers)
+- first:   the first `GET /health`, measured from process start
+
+and reports which heavy optional dependencies got imported along the way;
+none of them should be needed to serve a request.
+
+Usage: python -m benchmarks.startup [--runs 7] [--path /health]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+HEAVY_MODULES = ("pandas", "numpy", "pyarrow", "stripe", "reportlab", "requests", "openai")
+
+_CHILD = r"""
+import asyncio, json, sys, time
+
+started = time.perf_counter()
+from branchberg.app.main import app
+imported = time.perf_counter()
+
+
+async def main(path):
+    lifespan_inbox = asyncio.Queue()
+    lifespan_outbox = asyncio.Queue()
+    scope = {"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}
+    lifespan = asyncio.create_task(app(scope, lifespan_inbox.get, lifespan_outbox.put))
+    await lifespan_inbox.put({"type": "lifespan.startup"})
+    message = await lifespan_outbox.get()
+    assert message["type"] == "lifespan.startup.complete", message
+    ready = time.perf_counter()
+
+    response = {}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        response.setdefault(message["type"], message)
+
+    await app(
+        {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": [(b"host", b"bench")],
+            "client": ("127.0.0.1", 1),
+            "server": ("bench", 80),
+            "state": dict(scope["state"]),
+        },
+        receive,
+        send,
+    )
+    answered = time.perf_counter()
+    assert response["http.response.start"]["status"] == 200, response
+
+    await lifespan_inbox.put({"type": "lifespan.shutdown"})
+    await lifespan_outbox.get()
+    await lifespan
+    return ready, answered
+
+
+ready, answered = asyncio.run(main(sys.argv[1]))
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "startup_ms": (ready - imported) * 1000,
+    "first_response_ms": (answered - started) * 1000,
+    "heavy_modules": [name for name in json.loads(sys.argv[2]) if name in sys.modules],
+}))
+"""
+
+
+def run_once(path: str, workdir: str) -> dict:
+    env = dict(os.environ)
+    env["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'startup.db')}"
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(Path(__file__).resolve().parents[1]), env.get("PYTHONPATH")]))
+    output = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", _CHILD, path, json.dumps(HEAVY_MODULES)],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--path", default="/health")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        runs = [run_once(args.path, workdir) for _ in range(args.runs)]
+
+    for key in ("import_ms", "startup_ms", "first_response_ms"):
+        values = [run[key] for run in runs]
+        print(f"{key:>18}: median {statistics.median(values):7.1f}  min {min(values):7.1f}  max {max(values):7.1f}")
+    heavy = sorted({name for run in runs for name in run["heavy_modules"]})
+    print(f"{'heavy modules':>18}: {', '.join(heavy) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""Benchmark suite: ingest, summary, event listing, webhooks and the PO flow at scale.
+
+Seeds a reproducible synthetic dataset (`benchmarks.datasets`), then drives
+the ASGI app in-process and records, per operation, latency percentiles
+(p50/p90/p95/p99/max) and throughput. Webhooks are signed for real, so
+signature verification is part of the measurement. Results are written as
+JSON so runs can be compared across commits:
+
+    python -m benchmarks.suite run --events 1000000
+    python -m benchmarks.suite run --database-url postgresql://localhost/bench --reset-database
+    python -m benchmarks.suite compare before.json after.json --threshold 0.2
+
+`compare` exits non-zero when an operation's p95 got slower than the
+threshold allows, so it can gate CI.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Optional
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+import branchberg.app.main as main_module
+from branchberg.app.database import Base, ensure_indexes, get_db
+from branchberg.app.revenue_agent.config import AgentSettings
+from benchmarks.datasets import DatasetSpec, csv_upload, seed_database
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+STRIPE_SECRET = "whsec_benchmark"
+GUMROAD_SECRET = "gumroad_benchmark"
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(ordered: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(samples_ms: list[float], items_per_call: int = 1) -> dict:
+    ordered = sorted(samples_ms)
+    total_seconds = sum(ordered) / 1000
+    stats = {"calls": len(ordered), "items_per_call": items_per_call, "mean_ms": sum(ordered) / len(ordered)}
+    stats.update({f"p{pct}_ms": percentile(ordered, pct) for pct in PERCENTILES})
+    stats["max_ms"] = ordered[-1]
+    stats["throughput_per_s"] = len(ordered) * items_per_call / total_seconds if total_seconds else None
+    return {key: round(value, 3) if isinstance(value, float) else value for key, value in stats.items()}
+
+
+class Recorder:
+    def __init__(self, warmup: int):
+        self.warmup = warmup
+        self.results: dict[str, dict] = {}
+
+    def measure(self, name: str, call: Callable[[int], None], calls: int, *, items_per_call: int = 1) -> None:
+        """Time `call(i)` for i in range(calls) after `warmup` untimed calls."""
+        for index in range(self.warmup):
+            call(-1 - index)
+        samples = []
+        for index in range(calls):
+            started = time.perf_counter()
+            call(index)
+            samples.append((time.perf_counter() - started) * 1000)
+        self.add(name, samples, items_per_call)
+
+    def add(self, name: str, samples_ms: list[float], items_per_call: int = 1) -> None:
+        self.results[name] = summarize(samples_ms, items_per_call)
+        stats = self.results[name]
+        print(
+            f"{name:>26} {stats['calls']:>6} calls  p50 {stats['p50_ms']:>9.2f}ms  p95 {stats['p95_ms']:>9.2f}ms"
+            f"  p99 {stats['p99_ms']:>9.2f}ms  {stats['throughput_per_s'] or 0:>10.1f}/s",
+            flush=True,
+        )
+
+
+def _ok(response) -> None:
+    if response.status_code >= 400:
+        raise RuntimeError(f"{response.request.method} {response.request.url}: {response.status_code} {response.text[:200]}")
+
+
+def _stripe_request(event_id: str, amount: int) -> tuple[bytes, dict]:
+    payload = json.dumps(
+        {
+            "id": event_id,
+            "object": "event",
+            "type": "charge.succeeded",
+            "data": {"object": {"object": "charge", "amount": amount, "currency": "usd"}},
+        }
+    ).encode()
+    timestamp = int(time.time())
+    signature = hmac.new(STRIPE_SECRET.encode(), f"{timestamp}.".encode() + payload, hashlib.sha256).hexdigest()
+    return payload, {"Stripe-Signature": f"t={timestamp},v1={signature}", "Content-Type": "application/json"}
+
+
+def _gumroad_form(order_number: str, price: int) -> dict:
+    signature = hmac.new(GUMROAD_SECRET.encode(), order_number.encode(), hashlib.sha256).hexdigest()
+    return {
+        "order_number": order_number,
+        "signature": signature,
+        "price": str(price),
+        "currency": "usd",
+        "email": "buyer@example.com",
+        "product_id": "bench-product",
+    }
+
+
+def run_operations(client: TestClient, recorder: Recorder, args) -> None:
+    run_id = f"{int(time.time())}"
+
+    csv_body = csv_upload(args.csv_rows, seed=args.seed)
+    recorder.measure(
+        "ingest_csv",
+        lambda i: _ok(
+            client.post(
+                "/ingest/csv",
+                files={"file": ("bench.csv", csv_body, "text/csv")},
+                data={"amount_column": "Amount", "currency_column": "Currency", "email_column": "Email",
+                      "entity_column": "Entity", "description_column": "Memo"},
+            )
+        ),
+        args.csv_uploads,
+        items_per_call=args.csv_rows,
+    )
+    recorder.measure("revenue_summary", lambda i: _ok(client.get("/revenue/summary")), args.repeat)
+    for limit in (50, 500):
+        recorder.measure(
+            f"revenue_events_limit_{limit}",
+            lambda i, limit=limit: _ok(client.get("/revenue/events", params={"limit": limit})),
+            args.repeat,
+            items_per_call=limit,
+        )
+
+    def stripe_new(i: int) -> None:
+        body, headers = _stripe_request(f"evt_bench_{run_id}_{i}", 1000 + abs(i))
+        _ok(client.post("/webhooks/stripe", content=body, headers=headers))
+
+    def stripe_duplicate(i: int) -> None:
+        body, headers = _stripe_request(f"evt_bench_{run_id}_0", 1000)
+        _ok(client.post("/webhooks/stripe", content=body, headers=headers))
+
+    def gumroad_new(i: int) -> None:
+        _ok(client.post("/webhooks/gumroad", data=_gumroad_form(f"bench-{run_id}-{i}", 2500)))
+
+    recorder.measure("webhook_stripe_new", stripe_new, args.repeat)
+    recorder.measure("webhook_stripe_duplicate", stripe_duplicate, args.repeat)
+    recorder.measure("webhook_gumroad_new", gumroad_new, args.repeat)
+
+    steps: dict[str, list[float]] = {"po_create": [], "po_invoice": [], "po_payment": [], "po_flow": []}
+    for index in range(args.warmup + args.repeat):
+        timings = {}
+        flow_started = time.perf_counter()
+        started = flow_started
+        po = client.post(
+            "/po",
+            json={"po_number": f"BENCH-{run_id}-{index}", "customer_name": "Bench Co", "amount": 1250.0,
+                  "entity": "A+ Enterprise LLC"},
+        )
+        _ok(po)
+        timings["po_create"] = time.perf_counter() - started
+        started = time.perf_counter()
+        invoice = client.post(
+            f"/po/{po.json()['id']}/invoice",
+            json={"invoice_number": f"BENCH-INV-{run_id}-{index}", "amount": 1250.0},
+        )
+        _ok(invoice)
+        timings["po_invoice"] = time.perf_counter() - started
+        started = time.perf_counter()
+        _ok(
+            client.post(
+                f"/invoice/{invoice.json()['id']}/payment",
+                json={"payment_reference": f"BENCH-ACH-{run_id}-{index}", "amount": 1250.0, "method": "ach",
+                      "artifact_uri": "s3://bench/remittance.pdf"},
+            )
+        )
+        timings["po_payment"] = time.perf_counter() - started
+        timings["po_flow"] = time.perf_counter() - flow_started
+        if index >= args.warmup:
+            for name, seconds in timings.items():
+                steps[name].append(seconds * 1000)
+    for name, samples in steps.items():
+        recorder.add(name, samples)
+
+
+def _git_sha() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parents[1],
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return main_module.resolve_git_sha()
+
+
+def _engine(url: str) -> Engine:
+    if url.startswith("sqlite"):
+        return create_engine(url, connect_args={"check_same_thread": False})
+    return create_engine(url, pool_size=5)
+
+
+def run(args) -> dict:
+    spec = DatasetSpec(events=args.events, purchase_orders=args.purchase_orders, seed=args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        if args.database_url and not args.reset_database:
+            sys.exit("--database-url drops and recreates every table; pass --reset-database to confirm.")
+        engine = _engine(url)
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        ensure_indexes(engine)
+        print(f"seeding {spec.events:,} events and {spec.purchase_orders:,} POs into {engine.dialect.name} ...", flush=True)
+        seeded = seed_database(engine, spec)
+        print(f"seeded in {seeded['seconds']:.1f}s ({seeded['events_per_second']:,.0f} events/s)", flush=True)
+
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        def override_get_db():
+            db = session_factory()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app = main_module.app
+        settings = main_module.AGENT_SETTINGS
+        app.dependency_overrides[get_db] = override_get_db
+        main_module.AGENT_SETTINGS = AgentSettings(
+            safe_mode=False,
+            stripe_webhook_secret=STRIPE_SECRET,
+            gumroad_webhook_secret=GUMROAD_SECRET,
+            slack_webhook_url=None,
+        )
+        recorder = Recorder(args.warmup)
+        try:
+            run_operations(TestClient(app), recorder, args)
+        finally:
+            app.dependency_overrides.pop(get_db, None)
+            main_module.AGENT_SETTINGS = settings
+            if args.database_url:
+                Base.metadata.drop_all(bind=engine)
+            engine.dispose()
+
+    return {
+        "meta": {
+            "git_sha": _git_sha(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "dialect": engine.dialect.name,
+            "dataset": spec.as_dict(),
+            "seed_load": seeded,
+            "repeat": args.repeat,
+            "warmup": args.warmup,
+            "csv_rows": args.csv_rows,
+        },
+        "operations": recorder.results,
+    }
+
+
+def compare(old: dict, new: dict, threshold: float) -> list[str]:
+    """Print p50/p95 deltas per operation; return the operations whose p95 regressed."""
+    if old["meta"].get("dataset") != new["meta"].get("dataset") or old["meta"].get("dialect") != new["meta"].get("dialect"):
+        print("warning: runs used different datasets or databases; deltas are not like for like")
+    print(f"{'operation':>26} {'p50 old':>10} {'p50 new':>10} {'p95 old':>10} {'p95 new':>10} {'p95 change':>11}")
+    regressions = []
+    for name in sorted(set(old["operations"]) | set(new["operations"])):
+        before, after = old["operations"].get(name), new["operations"].get(name)
+        if before is None or after is None:
+            print(f"{name:>26} {'only in ' + ('new' if before is None else 'old'):>54}")
+            continue
+        change = after["p95_ms"] / before["p95_ms"] - 1 if before["p95_ms"] else 0.0
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(
+            f"{name:>26} {before['p50_ms']:>8.2f}ms {after['p50_ms']:>8.2f}ms"
+            f" {before['p95_ms']:>8.2f}ms {after['p95_ms']:>8.2f}ms {change:>+10.1%}{flag}"
+        )
+    return regressions
+
+
+def _default_output(results: dict) -> Path:
+    meta = results["meta"]
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    return RESULTS_DIR / f"{stamp}-{meta['git_sha'][:8]}-{meta['dialect']}-{meta['dataset']['events']}.json"
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="seed a dataset and benchmark every operation")
+    run_parser.add_argument("--events", type=int, default=100_000)
+    run_parser.add_argument("--purchase-orders", type=int, default=2_000)
+    run_parser.add_argument("--seed", type=int, default=1)
+    run_parser.add_argument("--repeat", type=int, default=50, help="timed calls per operation")
+    run_parser.add_argument("--warmup", type=int, default=3)
+    run_parser.add_argument("--csv-rows", type=int, default=5_000)
+    run_parser.add_argument("--csv-uploads", type=int, default=5)
+    run_parser.add_argument("--database-url", help="benchmark this database instead of a temporary SQLite file")
+    run_parser.add_argument("--reset-database", action="store_true", help="allow dropping tables at --database-url")
+    run_parser.add_argument("--output", type=Path, help=f"results file (default: {RESULTS_DIR.name}/<time>-<sha>-<db>-<events>.json)")
+
+    compare_parser = commands.add_parser("compare", help="compare two results files")
+    compare_parser.add_argument("old", type=Path)
+    compare_parser.add_argument("new", type=Path)
+    compare_parser.add_argument("--threshold", type=float, default=0.2, help="allowed p95 slowdown (0.2 = 20%%)")
+
+    args = parser.parse_args(argv)
+    if args.command == "compare":
+        regressions = compare(json.loads(args.old.read_text()), json.loads(args.new.read_text()), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1 if regressions else 0
+
+    results = run(args)
+    output = args.output or _default_output(results)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2) + "\n")
+    print(f"results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+"""Columnar (Arrow IPC / Parquet) export of revenue events.
+
+Rows are read with a Core `select` in partitions and turned straight into
+Arrow record batches, column by column, with no ORM objects or Pydantic
+models in between. Each batch is written to the response as soon as it is
+built, so memory is bounded by the batch size.
+
+`pyarrow` is optional (`requirements-columnar.txt`): it is imported on
+first use and the endpoint answers 501 when it is missing.
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from typing import Any, Callable, Iterator, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .database import RevenueEvent
+
+DEFAULT_BATCH_SIZE = 65536
+
+MEDIA_TYPES = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# name -> (column, arrow type factory, value converter)
+_COLUMNS: dict[str, tuple[Any, Callable[[Any], Any], Optional[Callable[[Any], Any]]]] = {
+    "id": (RevenueEvent.id, lambda pa: pa.string(), None),
+    "event_id": (RevenueEvent.event_id, lambda pa: pa.string(), None),
+    "provider": (RevenueEvent.provider, lambda pa: pa.string(), None),
+    "event_type": (RevenueEvent.event_type, lambda pa: pa.string(), None),
+    "amount_cents": (RevenueEvent.amount_cents, lambda pa: pa.int64(), None),
+    "currency": (RevenueEvent.currency, lambda pa: pa.string(), None),
+    "customer_email": (RevenueEvent.customer_email, lambda pa: pa.string(), None),
+    "customer_id": (RevenueEvent.customer_id, lambda pa: pa.string(), None),
+    "entity": (RevenueEvent.entity, lambda pa: pa.string(), None),
+    "created_at": (RevenueEvent.created_at, lambda pa: pa.timestamp("us", tz="UTC"), None),
+    "processed_at": (RevenueEvent.processed_at, lambda pa: pa.timestamp("us", tz="UTC"), None),
+    "po_id": (RevenueEvent.po_id, lambda pa: pa.string(), None),
+    "invoice_id": (RevenueEvent.invoice_id, lambda pa: pa.string(), None),
+    "payment_id": (RevenueEvent.payment_id, lambda pa: pa.string(), None),
+    "metadata": (
+        RevenueEvent.event_metadata,
+        lambda pa: pa.string(),
+        lambda value: None if value is None else json.dumps(value, sort_keys=True),
+    ),
+}
+COLUMN_NAMES = tuple(_COLUMNS)
+# `metadata` is free-form JSON and the widest column; ask for it explicitly.
+DEFAULT_COLUMNS = tuple(name for name in COLUMN_NAMES if name != "metadata")
+
+
+class ColumnarUnavailable(RuntimeError):
+    """Raised when pyarrow is not installed."""
+
+
+def load_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as exc:
+        raise ColumnarUnavailable(
+            "Columnar export needs pyarrow; install it with "
+            "`pip install -r requirements-columnar.txt`."
+        ) from exc
+    return pyarrow
+
+
+def parse_columns(value: Optional[str]) -> tuple[str, ...]:
+    """`"a,b"` -> `("a", "b")`; raises ValueError naming unknown columns."""
+    if not value:
+        return DEFAULT_COLUMNS
+    names = tuple(dict.fromkeys(name.strip() for name in value.split(",") if name.strip()))
+    unknown = [name for name in names if name not in _COLUMNS]
+    if unknown or not names:
+        raise ValueError(
+            f"Unknown columns: {', '.join(unknown) or '(none given)'}. "
+            f"Choose from {', '.join(COLUMN_NAMES)}."
+        )
+    return names
+
+
+def revenue_events_select(
+    columns: Sequence[str],
+    *,
+    provider: Optional[str] = None,
+    entity: Optional[str] = None,
+    event_type: Optional[str] = None,
+    currency: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: Optional[int] = None,
+):
+    stmt = select(*(_COLUMNS[name][0] for name in columns))
+    for column, value in (
+        (RevenueEvent.provider, provider),
+        (RevenueEvent.entity, entity),
+        (RevenueEvent.event_type, event_type),
+        (RevenueEvent.currency, currency),
+    ):
+        if value:
+            stmt = stmt.where(column == value)
+    if since:
+        stmt = stmt.where(RevenueEvent.created_at >= since)
+    if until:
+        stmt = stmt.where(RevenueEvent.created_at < until)
+    stmt = stmt.order_by(RevenueEvent.created_at, RevenueEvent.id)
+    if limit:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+def schema_for(pa, columns: Sequence[str]):
+    return pa.schema([(name, _COLUMNS[name][1](pa)) for name in columns])
+
+
+def iter_record_batches(
+    db: Session, stmt, columns: Sequence[str], *, batch_size: int = DEFAULT_BATCH_SIZE
+) -> Iterator[Any]:
+    """Yield `pyarrow.RecordBatch`es of at most `batch_size` rows."""
+    pa = load_pyarrow()
+    schema = schema_for(pa, columns)
+    converters = [_COLUMNS[name][2] for name in columns]
+    result = db.execute(stmt.execution_options(yield_per=batch_size))
+    for rows in result.partitions(batch_size):
+        arrays = []
+        for index, values in enumerate(zip(*rows)):
+            convert = converters[index]
+            if convert is not None:
+                values = [convert(value) for value in values]
+            arrays.append(pa.array(values, type=schema.field(index).type))
+        yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class _ChunkSink:
+    """Write-only file object whose output is collected with `drain()`."""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def encode_batches(batches: Iterator[Any], columns: Sequence[str], format: str) -> Iterator[bytes]:
+    """Serialize record batches as an Arrow IPC stream or a Parquet file."""
+    pa = load_pyarrow()
+    schema = schema_for(pa, columns)
+    sink = _ChunkSink()
+    if format == "parquet":
+        writer = pa.parquet.ParquetWriter(sink, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+    try:
+        for batch in batches:
+            writer.write_batch(batch)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    yield sink.drain()
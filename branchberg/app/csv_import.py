@@ -0,0 +1,175 @@
+"""Bulk import of revenue transactions from CSV.
+
+Rows are read one at a time with the `csv` module and flushed in batches,
+so memory stays flat however large the file is. Every row still goes
+through the outbox in the same transaction as its `RevenueEvent`.
+
+By default the whole file is one transaction: a failure imports nothing.
+With `commit_batches=True` (the streaming endpoint, meant for files too large
+for one transaction) each batch is committed, and a failure raises
+`CsvImportInterrupted` saying how much was committed and where to resume.
+"""
+
+from __future__ import annotations
+
+import csv
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Optional, TextIO
+
+from sqlalchemy.orm import Session
+
+from .database import RevenueEvent
+from .outbox import enqueue_revenue_event
+from .reconciliation import parse_amount_cents
+
+DEFAULT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 100
+
+
+class CsvImportError(ValueError):
+    """Raised when a CSV file cannot be imported at all."""
+
+
+class CsvImportInterrupted(RuntimeError):
+    """Raised when an import fails part-way; earlier committed batches stay."""
+
+    def __init__(self, reason: str, committed_count: int, committed_through_row: int):
+        if committed_through_row:
+            kept = (
+                f"{committed_count} events from rows 1-{committed_through_row} were committed; "
+                f"resume after row {committed_through_row}"
+            )
+        else:
+            kept = "nothing was committed"
+        super().__init__(f"CSV import failed: {reason} ({kept})")
+        self.committed_count = committed_count
+        self.committed_through_row = committed_through_row
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "message": str(self),
+            "committed_count": self.committed_count,
+            "committed_through_row": self.committed_through_row,
+        }
+
+
+@dataclass(frozen=True)
+class CsvColumnMapping:
+    amount: str
+    currency: Optional[str] = None
+    email: Optional[str] = None
+    entity: Optional[str] = None
+    description: Optional[str] = None
+
+    def validate(self, columns: list[str]) -> None:
+        if self.amount not in columns:
+            raise CsvImportError(f"Amount column '{self.amount}' not found in CSV")
+
+
+@dataclass
+class CsvImportResult:
+    created_count: int = 0
+    total_rows: int = 0
+    error_count: int = 0
+    errors: list[str] = field(default_factory=list)
+    committed_count: int = 0
+    committed_through_row: int = 0
+
+    def add_error(self, message: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(message)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "success": True,
+            "created_count": self.created_count,
+            "total_rows": self.total_rows,
+            "error_count": self.error_count,
+            "errors": self.errors or None,
+        }
+
+
+def _optional(row: dict[str, Optional[str]], column: Optional[str]) -> Optional[str]:
+    if not column:
+        return None
+    value = (row.get(column) or "").strip()
+    return value or None
+
+
+def import_revenue_csv(
+    db: Session,
+    stream: TextIO,
+    mapping: CsvColumnMapping,
+    *,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    commit_batches: bool = False,
+) -> CsvImportResult:
+    """Create a `RevenueEvent` per CSV row, flushing every `batch_size` rows.
+
+    Rows that fail to parse are reported and skipped. Everything is
+    committed at the end, or every batch if `commit_batches`; on failure the
+    uncommitted part is rolled back and `CsvImportInterrupted` is raised.
+    """
+
+    reader = csv.DictReader(stream)
+    columns = reader.fieldnames or []
+    if not columns:
+        raise CsvImportError("CSV file is empty")
+    mapping.validate(columns)
+
+    result = CsvImportResult()
+    pending = 0
+    try:
+        for row_number, row in enumerate(reader, start=1):
+            result.total_rows = row_number
+            try:
+                amount_cents = parse_amount_cents(row[mapping.amount])
+            except ValueError as exc:
+                result.add_error(f"Row {row_number}: {exc}")
+                continue
+
+            description = _optional(row, mapping.description)
+            metadata: dict[str, Any] = {"csv_row": row_number}
+            if description:
+                metadata["description"] = description
+            now = datetime.utcnow()
+            revenue_event = RevenueEvent(
+                id=str(uuid.uuid4()),
+                event_id=f"csv_{uuid.uuid4().hex[:16]}",
+                provider="manual",
+                event_type="csv_import",
+                amount_cents=amount_cents,
+                currency=_optional(row, mapping.currency) or "USD",
+                customer_email=_optional(row, mapping.email),
+                entity=_optional(row, mapping.entity),
+                event_metadata=metadata,
+                created_at=now,
+                processed_at=now,
+            )
+            db.add(revenue_event)
+            enqueue_revenue_event(db, revenue_event)
+            result.created_count += 1
+            pending += 1
+            if pending >= batch_size:
+                if commit_batches:
+                    _commit(db, result)
+                else:
+                    db.flush()
+                db.expunge_all()
+                pending = 0
+        _commit(db, result)
+    except Exception as exc:
+        db.rollback()
+        raise CsvImportInterrupted(
+            str(exc), result.committed_count, result.committed_through_row
+        ) from exc
+    return result
+
+
+def _commit(db: Session, result: CsvImportResult) -> None:
+    db.commit()
+    result.committed_count = result.created_count
+    result.committed_through_row = result.total_rows
@@ -1,9 +1,11 @@
 """Database configuration and models for BranchOS revenue tracking."""
 import os
 from datetime import datetime
-from sqlalchemy import create_engine, Column, String, Integer, DateTime, JSON, ForeignKey, UniqueConstraint
+from sqlalchemy import create_engine, event, func, inspect, literal_column, select, text, tuple_, BigInteger, Sequence, Column, String, Integer, Float, Date, DateTime, JSON, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import Session, sessionmaker, relationship
+
+from .search import drop_search_index, ensure_search_index
 
 # Get DATABASE_URL from environment
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./branchbot.db")
@@ -26,6 +28,11 @@ Base = declarative_base()
 class RevenueEvent(Base):
     """Revenue events table - stores all income transactions."""
     __tablename__ = "revenue_events"
+    __table_args__ = (
+        # Daily-total threshold rules seed their running totals from here.
+        Index("ix_revenue_events_entity_currency_created_at", "entity", "currency", "created_at"),
+        Index("ix_revenue_events_txid_seq", "txid", "seq"),
+    )
 
     id = Column(String, primary_key=True)  # UUID as string
     event_id = Column(String, unique=True, nullable=False, index=True)
@@ -39,6 +46,14 @@ class RevenueEvent(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     processed_at = Column(DateTime, default=datetime.utcnow)
     entity = Column(String, nullable=True)  # A+ Enterprise LLC or Legacy Unchained Inc
+    # Links for PO payments, promoted from event_metadata so lookups are index probes.
+    po_id = Column(String, nullable=True, index=True)
+    invoice_id = Column(String, nullable=True, index=True)
+    payment_id = Column(String, nullable=True, index=True)
+    # (txid, seq) is commit order, for "everything recorded since" cursors
+    # (see "Commit positions" and `_assign_revenue_event_seq`).
+    seq = Column(Integer, nullable=True, unique=True, index=True)
+    txid = Column(BigInteger, nullable=True, default=0)
 
 
 class PurchaseOrder(Base):
@@ -130,6 +145,15 @@ class Payment(Base):
 class AuditLog(Base):
     """Append-only audit log for PO-to-paid lifecycle actions."""
     __tablename__ = "audit_log"
+    __table_args__ = (
+        # One (key, created_at) index per lookup path so a trail query is an
+        # index range scan already in chronological order.
+        Index("ix_audit_log_po_id_created_at", "po_id", "created_at"),
+        Index("ix_audit_log_invoice_id_created_at", "invoice_id", "created_at"),
+        Index("ix_audit_log_payment_id_created_at", "payment_id", "created_at"),
+        Index("ix_audit_log_entity_created_at", "entity", "created_at"),
+        Index("ix_audit_log_actor_created_at", "actor", "created_at"),
+    )
 
     id = Column(String, primary_key=True)  # UUID as string
     entity = Column(String, nullable=False)
@@ -145,9 +169,368 @@ class AuditLog(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+class RevenueDailySummary(Base):
+    """Per-day, per-entity revenue totals maintained by the daily summary job."""
+    __tablename__ = "revenue_summaries"
+    __table_args__ = (
+        UniqueConstraint(
+            "day",
+            "entity",
+            "currency",
+            name="uq_revenue_summary_day_entity_currency",
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    day = Column(Date, nullable=False)  # business day in Central time
+    entity = Column(String, nullable=False)  # "unassigned" when the event has no entity
+    currency = Column(String, nullable=False)
+    total_cents = Column(Integer, nullable=False, default=0)
+    event_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class JobWatermark(Base):
+    """High-water marks for incremental jobs over revenue_events."""
+    __tablename__ = "job_watermarks"
+
+    name = Column(String, primary_key=True)
+    processed_at = Column(DateTime, nullable=False)  # last folded RevenueEvent.processed_at
+    event_id = Column(String, nullable=True)  # last folded RevenueEvent.id
+    seq = Column(Integer, nullable=True)  # last folded RevenueEvent.seq
+    txid = Column(BigInteger, nullable=True)  # ... and its RevenueEvent.txid
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class RevenueSeriesStats(Base):
+    """Streaming per-(entity, provider) statistics for anomaly detection.
+
+    Holds the open time bucket plus EWMA mean/variance of closed buckets, so
+    evaluating a series never rescans `revenue_events`.
+    """
+    __tablename__ = "revenue_series_stats"
+    __table_args__ = (
+        UniqueConstraint("entity", "provider", name="uq_revenue_series_entity_provider"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    entity = Column(String, nullable=False)  # "unassigned" when the event has no entity
+    provider = Column(String, nullable=False)
+    bucket_start = Column(DateTime, nullable=False)  # start of the open bucket (UTC)
+    bucket_count = Column(Integer, nullable=False, default=0)
+    bucket_amount_cents = Column(Integer, nullable=False, default=0)
+    samples = Column(Integer, nullable=False, default=0)  # closed buckets in the baseline
+    count_mean = Column(Float, nullable=False, default=0.0)
+    count_var = Column(Float, nullable=False, default=0.0)
+    amount_mean = Column(Float, nullable=False, default=0.0)
+    amount_var = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class RevenueAlert(Base):
+    """Alerts raised by the Revenue Tracking Agent (threshold/anomaly/duplicate)."""
+    __tablename__ = "revenue_alerts"
+    __table_args__ = (
+        Index("ix_revenue_alerts_type_created_at", "alert_type", "created_at"),
+    )
+
+    id = Column(String, primary_key=True)  # UUID as string
+    alert_type = Column(String, nullable=False)
+    severity = Column(String, nullable=False)
+    key = Column(String, nullable=True)
+    message = Column(String, nullable=False)
+    record_metadata = Column("metadata", JSON, default={})
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class SchedulerLease(Base):
+    """Leader lease for the embedded job scheduler (SQLite and other non-Postgres DBs)."""
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)  # replica id of the current leader
+    expires_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class JobRun(Base):
+    """One execution of a scheduled job, with its duration."""
+    __tablename__ = "job_runs"
+    __table_args__ = (
+        UniqueConstraint("job_name", "scheduled_for", name="uq_job_run_job_scheduled_for"),
+        Index("ix_job_runs_job_name_started_at", "job_name", "started_at"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    job_name = Column(String, nullable=False)
+    scheduled_for = Column(DateTime, nullable=False)  # cron slot (UTC), before jitter
+    started_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+    duration_ms = Column(Float, nullable=True)
+    status = Column(String, nullable=False)  # running|success|error
+    error = Column(String, nullable=True)
+    holder = Column(String, nullable=True)  # replica that ran it
+
+
+class OutboxEvent(Base):
+    """Change written in the same transaction as the revenue/payment row it describes.
+
+    `(txid, id)` is the delivery order (see "Commit positions" below);
+    subscribers track how far they got in `outbox_cursors`.
+    """
+    __tablename__ = "outbox_events"
+    __table_args__ = (
+        Index("ix_outbox_events_created_at", "created_at"),
+        Index("ix_outbox_events_txid_id", "txid", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    txid = Column(BigInteger, nullable=True, default=0)  # writing transaction (Postgres)
+    topic = Column(String, nullable=False)  # revenue_event.created|payment.recorded
+    key = Column(String, nullable=True)  # id of the row the event is about
+    payload = Column(JSON, nullable=False, default={})
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class OutboxCursor(Base):
+    """Per-subscriber delivery position and retry state for the outbox."""
+    __tablename__ = "outbox_cursors"
+
+    subscriber = Column(String, primary_key=True)
+    last_event_id = Column(Integer, nullable=False, default=0)  # last delivered OutboxEvent.id
+    last_txid = Column(BigInteger, nullable=True)  # ... and its OutboxEvent.txid
+    attempts = Column(Integer, nullable=False, default=0)  # consecutive failures
+    next_attempt_at = Column(DateTime, nullable=True)
+    last_error = Column(String, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+# Commit positions
+#
+# Rows read through "everything since" cursors carry the id of the
+# transaction that wrote them (`txid`) and are read in (txid, id) order. On
+# Postgres ids are handed out at insert but become visible at commit, so a
+# cursor on ids alone could move past a row that is still committing.
+# Readers there only see rows written by transactions older than every
+# transaction still in flight (`pg_snapshot_xmin`); no later commit can
+# sort below those, so writers never wait on each other. SQLite serializes
+# writers, so txid stays 0 and id order already is commit order.
+
+Position = tuple[int, int]  # (txid, id)
+BEFORE_ALL: Position = (-1, 0)  # below every row, including negative legacy seqs
+
+CURRENT_TXID = literal_column("pg_current_xact_id()::text::bigint")
+COMMIT_HORIZON = literal_column("pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+
+
+def stamp_txid(session, records):
+    """Record the writing transaction on new rows (Postgres only)."""
+    if records and session.connection().dialect.name == "postgresql":
+        for record in records:
+            record.txid = CURRENT_TXID
+
+
+def committed_after(query, txid, key, position: Position):
+    """Narrow `query` to committed rows after `position`, in (txid, key) order."""
+    query = query.filter(tuple_(txid, key) > tuple_(*position)).order_by(txid, key)
+    if query.session.get_bind().dialect.name == "postgresql":
+        query = query.filter(txid < COMMIT_HORIZON)
+    return query
+
+
+def last_position(db, txid, key) -> Position:
+    """Position of the newest committed row; a cursor that starts at the tail."""
+    query = db.query(txid, key).order_by(txid.desc(), key.desc())
+    if db.get_bind().dialect.name == "postgresql":
+        query = query.filter(txid < COMMIT_HORIZON)
+    row = query.first()
+    return (row[0] or 0, row[1]) if row is not None else (0, 0)
+
+
+def format_position(position: Position) -> str:
+    """`id` alone while txid is 0 (SQLite, rows from before txids), else `txid:id`."""
+    txid, key = position
+    return f"{txid}:{key}" if txid else str(key)
+
+
+def parse_position(raw: str) -> Position:
+    """Inverse of `format_position`; raises ValueError on anything else."""
+    txid, _, key = raw.strip().rpartition(":")
+    return (int(txid) if txid else 0, int(key))
+
+
+REVENUE_EVENT_SEQ = Sequence("revenue_events_seq", metadata=Base.metadata)  # Postgres only
+
+
+@event.listens_for(Session, "before_flush")
+def _assign_revenue_event_seq(session, flush_context, instances):
+    """Number new revenue events so that (txid, seq) order is commit order.
+
+    On Postgres seq comes from `revenue_events_seq` and readers stop at the
+    commit horizon, so writers never wait on each other. On SQLite the
+    INSERT takes max(seq) + 1 while holding the database write lock, which
+    it keeps until commit, so seq alone is commit order there.
+    """
+    new = [obj for obj in session.new if isinstance(obj, RevenueEvent) and obj.seq is None]
+    if not new:
+        return
+    if session.connection().dialect.name == "postgresql":
+        for record in new:
+            record.seq = REVENUE_EVENT_SEQ.next_value()
+        stamp_txid(session, new)
+        return
+    next_seq = (
+        select(func.coalesce(func.max(RevenueEvent.seq), 0) + 1)
+        .where(RevenueEvent.seq > 0)  # legacy rows are numbered below zero
+        .scalar_subquery()
+    )
+    for record in new:
+        record.seq = next_seq
+
+
+# The full-text index lives outside the ORM metadata; follow the table's lifecycle.
+event.listen(RevenueEvent.__table__, "after_create", lambda target, conn, **kw: ensure_search_index(conn))
+event.listen(RevenueEvent.__table__, "after_drop", lambda target, conn, **kw: drop_search_index(conn))
+
+
 def init_db():
     """Initialize database tables."""
     Base.metadata.create_all(bind=engine)
+    ensure_columns(engine)
+    backfill_revenue_event_links(engine)
+    backfill_revenue_event_seq(engine)
+    backfill_txids(engine)
+    ensure_indexes(engine)
+    ensure_search_index(engine)
+
+
+def ensure_columns(bind):
+    """Add nullable columns added to models after their tables already existed.
+
+    Like indexes, `create_all` never alters existing tables. Only nullable
+    columns without server defaults are handled, which covers every
+    promoted/optional column so far.
+    """
+    existing_tables = set(inspect(bind).get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        present = {column["name"] for column in inspect(bind).get_columns(table.name)}
+        for column in table.columns:
+            if column.name in present:
+                continue
+            if not column.nullable:
+                raise RuntimeError(f"Cannot add NOT NULL column {table.name}.{column.name} automatically")
+            column_type = column.type.compile(dialect=bind.dialect)
+            with bind.begin() as conn:
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+
+
+LINKS_BACKFILL = "revenue_event_links_backfill"  # JobWatermark row: backfill done
+
+
+def backfill_revenue_event_links(bind, batch_size=1000):
+    """Copy po/invoice/payment ids out of event_metadata for older PO payments.
+
+    New PO payments are written with their links, so this only has to run
+    once; completion is recorded as a `JobWatermark` row and later boots
+    return after reading it.
+    """
+    last_id = ""
+    with Session(bind=bind) as db:
+        if db.get(JobWatermark, LINKS_BACKFILL) is not None:
+            return
+        while True:
+            events = (
+                db.query(RevenueEvent)
+                .filter(
+                    RevenueEvent.event_type == "po_payment",
+                    RevenueEvent.payment_id.is_(None),
+                    RevenueEvent.id > last_id,
+                )
+                .order_by(RevenueEvent.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not events:
+                db.add(JobWatermark(name=LINKS_BACKFILL, processed_at=datetime.utcnow()))
+                db.commit()
+                return
+            for record in events:
+                metadata = record.event_metadata or {}
+                record.po_id = metadata.get("po_id")
+                record.invoice_id = metadata.get("invoice_id")
+                record.payment_id = metadata.get("payment_id")
+            last_id = events[-1].id
+            db.commit()
+
+
+def backfill_revenue_event_seq(bind, batch_size=1000):
+    """Number events recorded before `seq` existed, and move job watermarks onto it.
+
+    Older rows get negative numbers in (processed_at, id) order, below
+    everything numbered since. A watermark still on (processed_at, id)
+    moves to the seq of the last event it had covered. On Postgres,
+    `revenue_events_seq` is moved past every seq already handed out.
+    """
+    if bind.dialect.name == "postgresql":
+        with bind.begin() as conn:
+            conn.execute(text(
+                "SELECT setval('revenue_events_seq', GREATEST("
+                "(SELECT coalesce(max(seq), 0) FROM revenue_events),"
+                " (SELECT last_value FROM revenue_events_seq)))"
+            ))
+    with Session(bind=bind) as db:
+        pending = db.query(RevenueEvent).filter(RevenueEvent.seq.is_(None)).count()
+        next_seq = -pending
+        while pending:
+            events = (
+                db.query(RevenueEvent)
+                .filter(RevenueEvent.seq.is_(None))
+                .order_by(RevenueEvent.processed_at, RevenueEvent.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not events:
+                break
+            for record in events:
+                record.seq = next_seq
+                next_seq += 1
+            db.commit()
+
+        watermarks = (
+            db.query(JobWatermark)
+            .filter(JobWatermark.seq.is_(None), JobWatermark.event_id.isnot(None))
+            .all()
+        )
+        for watermark in watermarks:
+            covered = db.query(RevenueEvent.seq).filter(RevenueEvent.id == watermark.event_id).scalar()
+            if covered is None:
+                covered = (
+                    db.query(func.max(RevenueEvent.seq))
+                    .filter(RevenueEvent.processed_at <= watermark.processed_at)
+                    .scalar()
+                )
+            watermark.seq = covered
+        db.commit()
+
+
+def backfill_txids(bind):
+    """Put rows written before `txid` existed at txid 0, ahead of everything newer."""
+    with bind.begin() as conn:
+        for table in (RevenueEvent.__table__, OutboxEvent.__table__):
+            conn.execute(table.update().where(table.c.txid.is_(None)).values(txid=0))
+
+
+def ensure_indexes(bind):
+    """Create indexes added to models after their tables already existed.
+
+    `create_all` only emits indexes for tables it creates, so existing
+    deployments would otherwise never pick up new indexes.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
 
 
 def get_db():
@@ -0,0 +1,74 @@
+"""One SQLAlchemy statement-timing hook shared by metrics, profiling and tracing.
+
+Every statement on every engine is timed once, by a single pair of engine
+events, and each finished statement is handed to the callbacks registered
+with `subscribe`. `metrics`, `query_profiler` and `tracing` all read their
+timings from here instead of keeping their own listeners and start stacks.
+
+Start times are kept on a per-connection stack, so a subscriber may run SQL
+of its own on the connection (the profiler's EXPLAIN does) without mixing
+up the timings.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine
+
+_QUERY_START = "db_timing_query_start"
+
+
+@dataclass(frozen=True)
+class StatementTiming:
+    conn: Connection
+    statement: str
+    parameters: Any
+    executemany: bool
+    started: float  # perf_counter
+    seconds: float
+
+
+Subscriber = Callable[[StatementTiming], None]
+
+_subscribers: tuple[Subscriber, ...] = ()
+
+
+def subscribe(callback: Subscriber) -> None:
+    """Call `callback` after every statement on every engine (idempotent)."""
+    global _subscribers
+    if callback not in _subscribers:
+        _subscribers = (*_subscribers, callback)
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+
+
+def unsubscribe(callback: Subscriber) -> None:
+    global _subscribers
+    _subscribers = tuple(subscriber for subscriber in _subscribers if subscriber is not callback)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(_QUERY_START, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get(_QUERY_START)
+    if not starts:
+        return
+    started = starts.pop()
+    timing = StatementTiming(conn, statement, parameters, executemany, started, time.perf_counter() - started)
+    for subscriber in _subscribers:
+        subscriber(timing)
+
+
+def _handle_error(context):
+    connection = context.connection
+    starts = connection.info.get(_QUERY_START) if connection is not None else None
+    if starts:
+        starts.pop()
@@ -0,0 +1,228 @@
+"""Idempotency-Key support for retried write requests.
+
+A client that retries `POST /po` (or an invoice/payment write) after a
+timeout sends the same `Idempotency-Key` header. The first request runs
+normally and its response is stored; repeats replay the stored response
+without touching validation, the database or the audit log.
+
+The store is in-process with TTL eviction. Each replica keeps its own, which
+covers the common case of a client retrying through a sticky connection; the
+DB uniqueness constraints remain the backstop across replicas.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional, Union
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+REPLAYED_HEADER = b"idempotent-replayed"
+MAX_KEY_LENGTH = 255
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    status: int
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+
+
+@dataclass
+class _Entry:
+    fingerprint: str
+    expires_at: float
+    response: Optional[StoredResponse] = None
+
+
+# Sentinels returned by `IdempotencyStore.begin`.
+IN_PROGRESS = "in_progress"
+MISMATCH = "mismatch"
+
+
+class IdempotencyStore:
+    """Bounded key -> response store with TTL eviction.
+
+    Entries are kept in insertion order; since every entry gets the same TTL
+    that is also expiry order, so eviction only ever looks at the oldest
+    entries.
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl_seconds: float = 24 * 60 * 60,
+        max_entries: int = 10_000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._ttl = ttl_seconds
+        self._max_entries = max_entries
+        self._clock = clock
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._evict(self._clock())
+            return len(self._entries)
+
+    def _evict(self, now: float) -> None:
+        while self._entries:
+            oldest = next(iter(self._entries.values()))
+            if oldest.expires_at > now and len(self._entries) <= self._max_entries:
+                break
+            self._entries.popitem(last=False)
+
+    def begin(self, key: str, fingerprint: str) -> Union[StoredResponse, str, None]:
+        """Claim `key` for a new request.
+
+        Returns the stored response for a completed repeat, `IN_PROGRESS` or
+        `MISMATCH` for conflicting repeats, or None if the caller should run
+        the request and then call `complete` or `release`.
+        """
+
+        with self._lock:
+            now = self._clock()
+            self._evict(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.fingerprint != fingerprint:
+                    return MISMATCH
+                return entry.response or IN_PROGRESS
+            self._entries[key] = _Entry(fingerprint=fingerprint, expires_at=now + self._ttl)
+            self._evict(now)
+            return None
+
+    def complete(self, key: str, response: StoredResponse) -> None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.response = response
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+def _json_response(status: int, detail: str) -> StoredResponse:
+    body = json.dumps({"detail": detail}).encode("utf-8")
+    return StoredResponse(
+        status=status,
+        headers=[
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+        ],
+        body=body,
+    )
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware applying `IdempotencyStore` to selected POST routes.
+
+    Responses with status < 500 are stored; server errors release the key so
+    the client can retry for real.
+    """
+
+    def __init__(self, app, *, store: IdempotencyStore, paths: Iterable[str]):
+        self.app = app
+        self.store = store
+        self._paths = [re.compile(pattern) for pattern in paths]
+
+    def _idempotency_key(self, scope) -> Optional[str]:
+        if scope["type"] != "http" or scope["method"] != "POST":
+            return None
+        if not any(pattern.fullmatch(scope["path"]) for pattern in self._paths):
+            return None
+        for name, value in scope["headers"]:
+            if name == IDEMPOTENCY_HEADER:
+                return value.decode("latin-1").strip() or None
+        return None
+
+    async def __call__(self, scope, receive, send):
+        key = self._idempotency_key(scope)
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+
+        if len(key) > MAX_KEY_LENGTH:
+            await self._send(send, _json_response(400, "Idempotency-Key is too long."))
+            return
+
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        body = b"".join(chunks)
+
+        fingerprint = hashlib.sha256(body).hexdigest()
+        store_key = f"{scope['path']}\n{key}"
+        state = self.store.begin(store_key, fingerprint)
+        if isinstance(state, StoredResponse):
+            await self._send(send, state, replayed=True)
+            return
+        if state == MISMATCH:
+            await self._send(
+                send,
+                _json_response(422, "Idempotency-Key was already used with a different request body."),
+            )
+            return
+        if state == IN_PROGRESS:
+            await self._send(
+                send,
+                _json_response(409, "A request with this Idempotency-Key is still in progress."),
+            )
+            return
+
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if body_sent:
+                return await receive()
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        captured = {"status": 500, "headers": [], "body": []}
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                captured["status"] = message["status"]
+                captured["headers"] = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                captured["body"].append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        except BaseException:
+            self.store.release(store_key)
+            raise
+
+        if captured["status"] >= 500:
+            self.store.release(store_key)
+            return
+        self.store.complete(
+            store_key,
+            StoredResponse(
+                status=captured["status"],
+                headers=captured["headers"],
+                body=b"".join(captured["body"]),
+            ),
+        )
+
+    @staticmethod
+    async def _send(send, response: StoredResponse, *, replayed: bool = False) -> None:
+        headers = list(response.headers)
+        if replayed:
+            headers.append((REPLAYED_HEADER, b"true"))
+        await send({"type": "http.response.start", "status": response.status, "headers": headers})
+        await send({"type": "http.response.body", "body": response.body})
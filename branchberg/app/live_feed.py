@@ -0,0 +1,219 @@
+"""Live revenue feed over Server-Sent Events.
+
+The feed is read from the transactional outbox (`branchberg.app.outbox`), so
+viewers see exactly what committed: new `RevenueEvent`s, payments and PO
+status transitions. SSE event ids are outbox commit positions
+(`database.format_position`), and a reconnecting browser resumes with
+`Last-Event-ID`.
+
+One `LiveFeed` per process polls the outbox for all viewers, so DB load
+does not grow with the audience. Each event is encoded once and the same
+frame goes to every viewer's queue. Resumes are served from an in-memory
+buffer of recent frames, falling back to the outbox table for older
+cursors. A viewer that cannot keep up is disconnected instead of buffered
+without bound; its browser reconnects and resumes from its last id.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+
+from .database import OutboxEvent, Position, committed_after, format_position, last_position
+from .outbox import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_FRAME = b": keepalive\n\n"
+
+
+@dataclass(frozen=True)
+class Frame:
+    id: int
+    position: Position
+    topic: str
+    data: bytes  # fully encoded SSE frame
+
+    @classmethod
+    def from_row(cls, row: OutboxEvent) -> "Frame":
+        message = OutboxMessage.from_row(row)
+        position = (row.txid or 0, row.id)
+        body = json.dumps(message.as_dict(), separators=(",", ":"), default=str)
+        return cls(
+            id=message.id,
+            position=position,
+            topic=message.topic,
+            data=(
+                f"id: {format_position(position)}\nevent: {message.topic}\ndata: {body}\n\n"
+            ).encode(),
+        )
+
+
+@dataclass(eq=False)
+class Viewer:
+    topics: Optional[frozenset[str]]
+    queue: asyncio.Queue
+    backlog: list[Frame] = field(default_factory=list)
+    dropped: bool = False
+
+    def wants(self, frame: Frame) -> bool:
+        return self.topics is None or frame.topic in self.topics
+
+
+class LiveFeed:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        *,
+        poll_seconds: float = 0.5,
+        buffer_size: int = 1000,
+        batch_size: int = 500,
+        queue_size: int = 1000,
+        max_backlog: int = 5000,
+    ):
+        self.session_factory = session_factory
+        self.poll_seconds = poll_seconds
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.max_backlog = max_backlog
+        self._buffer: deque[Frame] = deque(maxlen=buffer_size)
+        self._viewers: set[Viewer] = set()
+        self._last: Position = (0, 0)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def viewer_count(self) -> int:
+        return len(self._viewers)
+
+    async def subscribe(
+        self, *, after: Optional[Position] = None, topics: Optional[frozenset[str]] = None
+    ) -> Viewer:
+        """Register a viewer; `backlog` holds what it missed after `after`."""
+
+        if self._task is None or self._task.done():
+            # Nobody was watching: start from the current tail.
+            self._last = await asyncio.to_thread(self._read_tail)
+            self._buffer.clear()
+            self._task = asyncio.create_task(self._poll_forever(), name="live-feed")
+
+        viewer = Viewer(topics=topics, queue=asyncio.Queue(maxsize=self.queue_size))
+        # Everything up to `upto` is backlog; later frames reach the queue.
+        upto = self._last
+        self._viewers.add(viewer)
+        if after is None or after >= upto:
+            return viewer
+
+        if self._buffer and self._buffer[0].position <= after:
+            frames = [frame for frame in self._buffer if after < frame.position <= upto]
+        else:
+            frames = await asyncio.to_thread(self._read_range, after, upto)
+        viewer.backlog = [frame for frame in frames if viewer.wants(frame)]
+        return viewer
+
+    def unsubscribe(self, viewer: Viewer) -> None:
+        self._viewers.discard(viewer)
+
+    def publish(self, frames: list[Frame]) -> None:
+        """Fan frames out to every viewer (runs on the event loop)."""
+        for frame in frames:
+            if frame.position <= self._last:
+                continue  # already published by an overlapping poll
+            self._buffer.append(frame)
+            self._last = frame.position
+            for viewer in list(self._viewers):
+                if viewer.dropped or not viewer.wants(frame):
+                    continue
+                try:
+                    viewer.queue.put_nowait(frame)
+                except asyncio.QueueFull:
+                    viewer.dropped = True
+                    self._viewers.discard(viewer)
+                    # Wake the viewer's stream so it can close.
+                    viewer.queue.get_nowait()
+                    viewer.queue.put_nowait(None)
+
+    def _read_tail(self) -> Position:
+        db = self.session_factory()
+        try:
+            return last_position(db, OutboxEvent.txid, OutboxEvent.id)
+        finally:
+            db.close()
+
+    def _read_new(self, after: Position) -> list[Frame]:
+        db = self.session_factory()
+        try:
+            rows = (
+                committed_after(db.query(OutboxEvent), OutboxEvent.txid, OutboxEvent.id, after)
+                .limit(self.batch_size)
+                .all()
+            )
+            return [Frame.from_row(row) for row in rows]
+        finally:
+            db.close()
+
+    def _read_range(self, after: Position, upto: Position) -> list[Frame]:
+        db = self.session_factory()
+        try:
+            position = tuple_(OutboxEvent.txid, OutboxEvent.id)
+            rows = (
+                db.query(OutboxEvent)
+                .filter(position > tuple_(*after), position <= tuple_(*upto))
+                .order_by(OutboxEvent.txid.desc(), OutboxEvent.id.desc())
+                .limit(self.max_backlog)
+                .all()
+            )
+            return [Frame.from_row(row) for row in reversed(rows)]
+        finally:
+            db.close()
+
+    async def poll_once(self) -> int:
+        frames = await asyncio.to_thread(self._read_new, self._last)
+        self.publish(frames)
+        return len(frames)
+
+    async def _poll_forever(self) -> None:
+        while self._viewers:
+            try:
+                if await self.poll_once() >= self.batch_size:
+                    continue  # catching up; poll again right away
+            except Exception:  # noqa: BLE001 - keep serving viewers
+                logger.exception("live feed poll failed")
+            await asyncio.sleep(self.poll_seconds)
+
+    async def close(self) -> None:
+        for viewer in list(self._viewers):
+            self.unsubscribe(viewer)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+async def stream_frames(feed: LiveFeed, viewer: Viewer, *, heartbeat_seconds: float = 15.0):
+    """Async iterator of SSE bytes for one viewer; unsubscribes when done."""
+    try:
+        yield b"retry: 3000\n\n"
+        for frame in viewer.backlog:
+            yield frame.data
+        viewer.backlog = []
+        while True:
+            try:
+                frame = await asyncio.wait_for(viewer.queue.get(), timeout=heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield HEARTBEAT_FRAME
+                continue
+            if frame is None:
+                return
+            yield frame.data
+    finally:
+        feed.unsubscribe(viewer)
@@ -1,35 +1,77 @@
 """FastAPI backend with Stripe & Gumroad webhooks and Universal Income Ingest."""
+import csv
+import hashlib
 import importlib.util
+import json
 import os
+import tempfile
+import time
 import uuid
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import List, Optional
-from io import StringIO
+from io import StringIO, TextIOWrapper
 from contextlib import asynccontextmanager
 from pathlib import Path
 
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, status, Request
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, Query, status, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field, field_validator
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, load_only
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import func
-import pandas as pd
-
+from sqlalchemy import and_, func, or_
+
+from .columnar import (
+    MEDIA_TYPES as COLUMNAR_MEDIA_TYPES,
+    ColumnarUnavailable,
+    encode_batches,
+    iter_record_batches,
+    load_pyarrow,
+    parse_columns,
+    revenue_events_select,
+)
+from .csv_import import CsvColumnMapping, CsvImportError, CsvImportInterrupted, import_revenue_csv
 from .database import (
     init_db,
     get_db,
+    engine,
+    SessionLocal,
     RevenueEvent,
     PurchaseOrder,
     Invoice,
     Payment,
     AuditLog,
+    Position,
+    committed_after,
+    format_position,
+    last_position,
+    parse_position,
 )
 
+from .idempotency import IdempotencyMiddleware, IdempotencyStore
+from .live_feed import LiveFeed, stream_frames
+from . import metrics, query_profiler, tracing
+from .outbox import (
+    TOPIC_PAYMENT,
+    TOPIC_PO_TRANSITION,
+    TOPIC_REVENUE_EVENT,
+    NotifierSubscriber,
+    OutboxDispatcher,
+    enqueue_payment,
+    enqueue_po_transition,
+    enqueue_revenue_event,
+    parse_subscribers,
+)
+from .reconciliation import InvoiceIndex, OpenInvoice, StatementFormatError, parse_statement
 from .revenue_agent.config import AgentSettings
+from .revenue_agent.repository import PENDING_ALERTS, set_rules_engine
+from .revenue_agent.scheduler import JobScheduler, make_leader_lease, recent_job_runs
+from .revenue_agent.service import RevenueTrackingAgent
 from .revenue_agent.webhooks.stripe import handle_stripe_webhook, StripeWebhookResponse
 from .revenue_agent.webhooks.gumroad import handle_gumroad_webhook, GumroadWebhookResponse
+from .search import MIN_TERM_LENGTH, SearchQueryError, SearchUnavailable, search_event_ids
+from .serialization import FastJSONResponse, dumps
 
 APP_NAME = "BranchOS Revenue API"
 DEFAULT_VERSION = "0.0.0"
@@ -80,17 +122,63 @@ def resolve_git_sha() -> str:
     return "unknown"
 
 
+# Resolved once per process; neither can change without a redeploy.
+BUILD_INFO = {"name": APP_NAME, "version": resolve_version(), "git_sha": resolve_git_sha()}
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Initialize database on startup."""
+    """Initialize database on startup; run the outbox dispatcher, the alert digest
+    flush, the threshold alert writer and, if enabled, the job scheduler."""
     init_db()
-    yield
+    scheduler = None
+    if AGENT_SETTINGS.scheduler_enabled:
+        scheduler = JobScheduler(
+            SessionLocal,
+            REVENUE_AGENT.scheduled_jobs(),
+            lease=make_leader_lease(engine, SessionLocal),
+        )
+        scheduler.start()
+    app.state.scheduler = scheduler
+    outbox_dispatcher = OutboxDispatcher(SessionLocal, _outbox_subscribers())
+    outbox_dispatcher.start()
+    app.state.outbox_dispatcher = outbox_dispatcher
+    REVENUE_AGENT.notifier.start()
+    PENDING_ALERTS.start()
+    try:
+        yield
+    finally:
+        await LIVE_FEED.close()
+        await outbox_dispatcher.stop()
+        if scheduler is not None:
+            await scheduler.stop()
+        # Last: the scheduler's jobs may still have queued alerts.
+        await REVENUE_AGENT.notifier.stop()
+        await PENDING_ALERTS.stop()
+        await run_in_threadpool(REVENUE_AGENT.slack.close)
 
 
-app = FastAPI(title=APP_NAME, lifespan=lifespan)
+def _outbox_subscribers():
+    """HTTP subscribers from `OUTBOX_SUBSCRIBERS`, plus Slack when configured."""
+    subscribers = parse_subscribers(os.getenv("OUTBOX_SUBSCRIBERS"))
+    if AGENT_SETTINGS.slack_webhook_url and not AGENT_SETTINGS.safe_mode:
+        subscribers.append(NotifierSubscriber(REVENUE_AGENT.notifier))
+    return subscribers
+
+
+app = FastAPI(title=APP_NAME, version=BUILD_INFO["version"], lifespan=lifespan)
 
 # Revenue Tracking Agent settings (AGENTS.md)
 AGENT_SETTINGS = AgentSettings.from_env()
+REVENUE_AGENT = RevenueTrackingAgent(AGENT_SETTINGS)
+
+# Threshold rules run inline on every webhook insert.
+set_rules_engine(REVENUE_AGENT.rules_engine)
+
+# One outbox poller shared by every live feed viewer in this process
+LIVE_FEED = LiveFeed(SessionLocal)
+LIVE_FEED_TOPICS = frozenset({TOPIC_REVENUE_EVENT, TOPIC_PAYMENT, TOPIC_PO_TRANSITION})
+LIVE_FEED_DEFAULT_TOPICS = frozenset({TOPIC_REVENUE_EVENT, TOPIC_PO_TRANSITION})
 
 # CORS middleware for Streamlit
 app.add_middleware(
@@ -99,8 +187,39 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Events-Cursor"],
+)
+
+# Retried PO/invoice/payment writes replay the first response (Idempotency-Key)
+IDEMPOTENCY_STORE = IdempotencyStore(
+    ttl_seconds=float(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 60 * 60))),
+)
+app.add_middleware(
+    IdempotencyMiddleware,
+    store=IDEMPOTENCY_STORE,
+    paths=[
+        r"/po",
+        r"/po/[^/]+/invoice",
+        r"/invoice/[^/]+/payment",
+        r"/reconcile/confirm",
+    ],
 )
 
+# Per-route latency and per-request DB work, scraped from GET /metrics
+metrics.instrument_engines()
+metrics.register_pool_gauges(engine)
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Opt-in (QUERY_PROFILER=1): slow-query plans and N+1 shapes in the log
+QUERY_PROFILER_SETTINGS = query_profiler.settings_from_env()
+if QUERY_PROFILER_SETTINGS is not None:
+    app.add_middleware(query_profiler.QueryProfilerMiddleware, settings=QUERY_PROFILER_SETTINGS)
+
+# Sampled per-stage spans (TRACE_SAMPLE_RATE), browsable at /debug/traces
+TRACER, TRACE_BUFFER = tracing.tracer_from_env()
+tracing.instrument_engines()
+app.add_middleware(tracing.TracingMiddleware, tracer=TRACER)
+
 
 # Pydantic models
 def _normalize_currency(value: str) -> str:
@@ -145,28 +264,68 @@ class RevenueEventResponse(BaseModel):
     created_at: datetime
     processed_at: datetime
     metadata: dict
+    po_id: Optional[str] = None
+    invoice_id: Optional[str] = None
+    payment_id: Optional[str] = None
 
     class Config:
         from_attributes = True
 
     @classmethod
     def from_orm(cls, obj):
-        data = {
-            "id": obj.id,
-            "event_id": obj.event_id,
-            "provider": obj.provider,
-            "event_type": obj.event_type,
-            "amount_cents": obj.amount_cents,
-            "amount_dollars": obj.amount_cents / 100.0,
-            "currency": obj.currency,
-            "customer_email": obj.customer_email,
-            "customer_id": obj.customer_id,
-            "entity": obj.entity,
-            "created_at": obj.created_at,
-            "processed_at": obj.processed_at,
-            "metadata": obj.event_metadata or {}
-        }
-        return cls(**data)
+        return cls(**_revenue_event_dict(obj))
+
+
+# Response field -> (model columns it needs, getter). Drives `fields=`
+# projections: only the listed columns are loaded and only these keys emitted.
+REVENUE_EVENT_FIELDS = {
+    "id": (("id",), lambda obj: obj.id),
+    "event_id": (("event_id",), lambda obj: obj.event_id),
+    "provider": (("provider",), lambda obj: obj.provider),
+    "event_type": (("event_type",), lambda obj: obj.event_type),
+    "amount_cents": (("amount_cents",), lambda obj: obj.amount_cents),
+    "amount_dollars": (("amount_cents",), lambda obj: obj.amount_cents / 100.0),
+    "currency": (("currency",), lambda obj: obj.currency),
+    "customer_email": (("customer_email",), lambda obj: obj.customer_email),
+    "customer_id": (("customer_id",), lambda obj: obj.customer_id),
+    "entity": (("entity",), lambda obj: obj.entity),
+    "created_at": (("created_at",), lambda obj: obj.created_at),
+    "processed_at": (("processed_at",), lambda obj: obj.processed_at),
+    "metadata": (("event_metadata",), lambda obj: obj.event_metadata or {}),
+    "po_id": (("po_id",), lambda obj: obj.po_id),
+    "invoice_id": (("invoice_id",), lambda obj: obj.invoice_id),
+    "payment_id": (("payment_id",), lambda obj: obj.payment_id),
+}
+
+
+def _revenue_event_dict(obj, fields=REVENUE_EVENT_FIELDS) -> dict:
+    """`RevenueEventResponse` fields as a plain dict, for `FastJSONResponse`."""
+    return {name: REVENUE_EVENT_FIELDS[name][1](obj) for name in fields}
+
+
+def _parse_event_fields(fields: Optional[str]) -> Optional[tuple[str, ...]]:
+    """`"id,amount_cents"` -> field names; None means every field."""
+    if fields is None:
+        return None
+    names = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in REVENUE_EVENT_FIELDS]
+    if unknown or not names:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Unknown fields: {', '.join(unknown) or '(none given)'}. "
+            f"Choose from {', '.join(REVENUE_EVENT_FIELDS)}.",
+        )
+    return names
+
+
+def _event_load_options(fields: Optional[tuple[str, ...]], *always: str) -> list:
+    """`load_only` for the columns behind `fields`; anything else raises if touched."""
+    if fields is None:
+        return []
+    columns = dict.fromkeys(always)
+    for name in fields:
+        columns.update(dict.fromkeys(REVENUE_EVENT_FIELDS[name][0]))
+    return [load_only(*(getattr(RevenueEvent, column) for column in columns), raiseload=True)]
 
 
 class RevenueSummary(BaseModel):
@@ -177,6 +336,30 @@ class RevenueSummary(BaseModel):
     currency: str = "USD"
 
 
+class RevenueBreakdownRow(BaseModel):
+    """Revenue totals for one provider/entity pair."""
+    provider: str
+    entity: Optional[str]
+    total_cents: int
+    count: int
+
+
+class RevenueDailyPoint(BaseModel):
+    """Revenue totals for one UTC day."""
+    day: date
+    total_cents: int
+    count: int
+
+
+class DashboardSnapshot(BaseModel):
+    """Everything a dashboard page renders, from one request."""
+    generated_at: datetime
+    totals: RevenueSummary
+    breakdown: List[RevenueBreakdownRow]
+    timeseries: List[RevenueDailyPoint]
+    recent_events: List[RevenueEventResponse]
+
+
 class PurchaseOrderCreate(BaseModel):
     """Purchase order creation model."""
     po_number: str = Field(..., min_length=1)
@@ -316,6 +499,55 @@ class PaymentResponse(BaseModel):
     metadata: dict
 
 
+class ReconciledPaymentCreate(PaymentCreate):
+    """Payment confirmed from a bank statement match."""
+    invoice_id: str = Field(..., min_length=1)
+
+
+class ReconciliationConfirm(BaseModel):
+    """Batch of confirmed statement matches to post together."""
+    payments: List[ReconciledPaymentCreate] = Field(..., min_length=1)
+    actor: Optional[str] = None
+    reason: Optional[str] = None
+
+
+class AuditLogEntryResponse(BaseModel):
+    """Audit log entry response model."""
+    id: str
+    entity: str
+    actor: str
+    action: str
+    po_id: Optional[str]
+    invoice_id: Optional[str]
+    payment_id: Optional[str]
+    from_state: Optional[str]
+    to_state: Optional[str]
+    reason: Optional[str]
+    created_at: datetime
+    metadata: dict
+
+
+class AuditLogPage(BaseModel):
+    """Page of audit log entries with a keyset cursor for the next page."""
+    entries: List[AuditLogEntryResponse]
+    next_cursor: Optional[str] = None
+
+
+class JobRunResponse(BaseModel):
+    """Scheduled job run response model."""
+    job_name: str
+    scheduled_for: datetime
+    started_at: datetime
+    finished_at: Optional[datetime]
+    duration_ms: Optional[float]
+    status: str
+    error: Optional[str]
+    holder: Optional[str]
+
+    class Config:
+        from_attributes = True
+
+
 def _record_audit_log(
     db: Session,
     *,
@@ -352,6 +584,251 @@ def _record_audit_log(
     db.add(audit_entry)
 
 
+def _validate_payment(invoice: Invoice, purchase_order: PurchaseOrder, payload: PaymentCreate) -> tuple[int, str]:
+    """Check a payment against its invoice/PO; return (amount_cents, currency)."""
+    if not invoice.entity or not purchase_order.entity:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Invoice and purchase order must include an entity before recording payment.",
+        )
+
+    if invoice.status == "void":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Cannot record payment against a void invoice.",
+        )
+
+    if invoice.status == "paid":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Invoice is already marked as paid.",
+        )
+
+    if invoice.status == "draft":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Cannot record payment against a draft invoice.",
+        )
+
+    if not payload.artifact_uri:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Payment artifact is required to mark invoice/PO as paid.",
+        )
+
+    amount_cents = int(payload.amount * 100)
+    if amount_cents < invoice.amount_cents:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Payment amount must cover the invoice total.",
+        )
+    if amount_cents > invoice.amount_cents:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Payment amount cannot exceed invoice total without credit memo handling.",
+        )
+
+    invoice_currency = (invoice.currency or "").strip().upper()
+    payment_currency = payload.currency.strip().upper()
+    if payment_currency != invoice_currency:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Payment currency must match invoice currency.",
+        )
+
+    return amount_cents, invoice_currency
+
+
+def _apply_payment(
+    db: Session,
+    *,
+    invoice: Invoice,
+    purchase_order: PurchaseOrder,
+    payload: PaymentCreate,
+    amount_cents: int,
+    currency: str,
+) -> Payment:
+    """Stage a validated payment plus its invoice/PO, revenue and audit side effects."""
+    actor = payload.actor or "system"
+    paid_at = payload.paid_at or datetime.utcnow()
+    now = datetime.utcnow()
+    payment = Payment(
+        id=str(uuid.uuid4()),
+        invoice_id=invoice.id,
+        payment_reference=payload.payment_reference,
+        amount_cents=amount_cents,
+        currency=currency,
+        paid_at=paid_at,
+        method=payload.method,
+        artifact_uri=payload.artifact_uri,
+        entity=invoice.entity,
+        created_at=now,
+        record_metadata=payload.metadata,
+    )
+    db.add(payment)
+
+    invoice.status = "paid"
+    invoice.updated_at = now
+
+    previous_po_status = purchase_order.status
+    purchase_order.status = "paid"
+    purchase_order.updated_at = now
+
+    revenue_event = RevenueEvent(
+        id=str(uuid.uuid4()),
+        event_id=f"payment_{uuid.uuid4().hex[:16]}",
+        provider="manual",
+        event_type="po_payment",
+        amount_cents=amount_cents,
+        currency=currency,
+        customer_email=None,
+        customer_id=purchase_order.customer_id,
+        entity=purchase_order.entity,
+        po_id=purchase_order.id,
+        invoice_id=invoice.id,
+        payment_id=payment.id,
+        event_metadata={
+            "po_id": purchase_order.id,
+            "invoice_id": invoice.id,
+            "payment_id": payment.id,
+            "payment_reference": payload.payment_reference,
+        },
+        created_at=now,
+        processed_at=now,
+    )
+    db.add(revenue_event)
+    enqueue_revenue_event(db, revenue_event)
+    enqueue_payment(db, payment, purchase_order=purchase_order)
+
+    _record_audit_log(
+        db,
+        entity=purchase_order.entity,
+        actor=actor,
+        action="payment_recorded",
+        po_id=purchase_order.id,
+        invoice_id=invoice.id,
+        payment_id=payment.id,
+        from_state=previous_po_status,
+        to_state=purchase_order.status,
+        reason=payload.reason,
+        metadata={"payment_reference": payload.payment_reference},
+    )
+    enqueue_po_transition(
+        db,
+        purchase_order,
+        from_state=previous_po_status,
+        action="payment_recorded",
+        actor=actor,
+        invoice_id=invoice.id,
+        payment_id=payment.id,
+    )
+    return payment
+
+
+AUDIT_EXPORT_COLUMNS = [
+    "id",
+    "created_at",
+    "entity",
+    "actor",
+    "action",
+    "po_id",
+    "invoice_id",
+    "payment_id",
+    "from_state",
+    "to_state",
+    "reason",
+    "metadata",
+]
+
+
+def _audit_log_dict(entry: AuditLog) -> dict:
+    return {
+        "id": entry.id,
+        "entity": entry.entity,
+        "actor": entry.actor,
+        "action": entry.action,
+        "po_id": entry.po_id,
+        "invoice_id": entry.invoice_id,
+        "payment_id": entry.payment_id,
+        "from_state": entry.from_state,
+        "to_state": entry.to_state,
+        "reason": entry.reason,
+        "created_at": entry.created_at,
+        "metadata": entry.record_metadata or {},
+    }
+
+
+def _audit_log_query(
+    db: Session,
+    *,
+    po_id: Optional[str],
+    invoice_id: Optional[str],
+    payment_id: Optional[str],
+    entity: Optional[str],
+    actor: Optional[str],
+    since: Optional[datetime],
+    until: Optional[datetime],
+):
+    """Filter the audit log; at least one indexed key filter is required."""
+    key_filters = {
+        AuditLog.po_id: po_id,
+        AuditLog.invoice_id: invoice_id,
+        AuditLog.payment_id: payment_id,
+        AuditLog.entity: entity,
+        AuditLog.actor: actor,
+    }
+    if not any(key_filters.values()):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Filter by at least one of po_id, invoice_id, payment_id, entity or actor.",
+        )
+    query = db.query(AuditLog)
+    for column, value in key_filters.items():
+        if value:
+            query = query.filter(column == value)
+    if since:
+        query = query.filter(AuditLog.created_at >= since)
+    if until:
+        query = query.filter(AuditLog.created_at < until)
+    return query.order_by(AuditLog.created_at, AuditLog.id)
+
+
+def _encode_audit_cursor(entry: AuditLog) -> str:
+    return f"{entry.created_at.isoformat()}|{entry.id}"
+
+
+def _decode_audit_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        created_at, entry_id = cursor.split("|", 1)
+        return datetime.fromisoformat(created_at), entry_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid audit cursor.") from None
+
+
+def _decode_events_cursor(cursor: str) -> Position:
+    """Events cursors are (`RevenueEvent.txid`, `seq`) positions (commit order)."""
+    try:
+        return parse_position(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid events cursor.") from None
+
+
+def _payment_response(payment: Payment) -> PaymentResponse:
+    return PaymentResponse(
+        id=payment.id,
+        invoice_id=payment.invoice_id,
+        payment_reference=payment.payment_reference,
+        amount_cents=payment.amount_cents,
+        amount_dollars=payment.amount_cents / 100.0,
+        currency=payment.currency,
+        paid_at=payment.paid_at,
+        method=payment.method,
+        artifact_uri=payment.artifact_uri,
+        created_at=payment.created_at,
+        metadata=payment.record_metadata or {},
+    )
+
+
 # Endpoints
 @app.get("/")
 def read_root():
@@ -368,11 +845,28 @@ def health():
 @app.get("/version")
 def version():
     """Version information endpoint."""
-    return {
-        "name": APP_NAME,
-        "version": resolve_version(),
-        "git_sha": resolve_git_sha(),
-    }
+    return BUILD_INFO
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    """Prometheus scrape endpoint (text exposition format)."""
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/debug/traces", include_in_schema=False)
+def debug_traces(
+    limit: int = Query(20, ge=1, le=200),
+    name: Optional[str] = Query(None, description='Root span, e.g. "POST /webhooks/stripe"'),
+):
+    """Most recent sampled traces, newest first."""
+    return {"sample_rate": TRACER.sample_rate, "traces": TRACE_BUFFER.recent(limit, name)}
+
+
+@app.get("/debug/traces/stages", include_in_schema=False)
+def debug_trace_stages(name: Optional[str] = Query(None)):
+    """Per-stage latency (p50/p95/max) across the buffered traces."""
+    return {"sample_rate": TRACER.sample_rate, "stages": TRACE_BUFFER.stages(name)}
 
 
 @app.post("/ingest/manual", response_model=RevenueEventResponse)
@@ -410,12 +904,53 @@ def ingest_manual_transaction(
     )
 
     db.add(revenue_event)
+    enqueue_revenue_event(db, revenue_event)
     db.commit()
     db.refresh(revenue_event)
 
     return RevenueEventResponse.from_orm(revenue_event)
 
 
+CSV_SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+
+def _csv_mapping(
+    amount_column: str,
+    currency_column: Optional[str],
+    email_column: Optional[str],
+    entity_column: Optional[str],
+    description_column: Optional[str],
+) -> CsvColumnMapping:
+    return CsvColumnMapping(
+        amount=amount_column,
+        currency=currency_column or None,
+        email=email_column or None,
+        entity=entity_column or None,
+        description=description_column or None,
+    )
+
+
+def _import_csv_file(
+    db: Session, binary_file, mapping: CsvColumnMapping, *, commit_batches: bool = False
+) -> dict:
+    stream = TextIOWrapper(binary_file, encoding="utf-8-sig", newline="")
+    started = time.perf_counter()
+    try:
+        result = import_revenue_csv(db, stream, mapping, commit_batches=commit_batches)
+        metrics.record_csv_import(result.created_count, result.error_count, time.perf_counter() - started)
+        return result.as_dict()
+    except CsvImportError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except CsvImportInterrupted as exc:
+        bad_input = isinstance(exc.__cause__, UnicodeDecodeError)
+        raise HTTPException(status_code=400 if bad_input else 500, detail=exc.as_dict()) from exc
+    except UnicodeDecodeError as exc:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Error processing CSV: {exc}") from exc
+    finally:
+        stream.detach()
+
+
 @app.post("/ingest/csv")
 def ingest_csv_transactions(
     file: UploadFile = File(...),
@@ -430,86 +965,44 @@ def ingest_csv_transactions(
     Upload CSV file and ingest transactions with column mapping.
 
     The CSV file should have headers. You specify which columns contain
-    the relevant data.
+    the relevant data. The file is imported in one transaction: on error
+    nothing is imported.
     """
+    mapping = _csv_mapping(amount_column, currency_column, email_column, entity_column, description_column)
     try:
-        # Read CSV file
-        contents = file.file.read().decode("utf-8")
-        df = pd.read_csv(StringIO(contents))
+        return _import_csv_file(db, file.file, mapping)
+    finally:
+        file.file.close()
 
-        # Validate required column exists
-        if amount_column not in df.columns:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Amount column '{amount_column}' not found in CSV"
-            )
 
-        # Process each row
-        created_count = 0
-        errors = []
-
-        for idx, row in df.iterrows():
-            try:
-                # Extract amount (handle both float and string formats)
-                amount_str = str(row[amount_column]).replace("$", "").replace(",", "").strip()
-                amount = float(amount_str)
-                amount_cents = int(amount * 100)
-
-                # Extract other fields if columns are specified
-                currency = row[currency_column] if currency_column and currency_column in df.columns else "USD"
-                email = row[email_column] if email_column and email_column in df.columns else None
-                entity = row[entity_column] if entity_column and entity_column in df.columns else None
-                description = row[description_column] if description_column and description_column in df.columns else None
-
-                # Convert to string and handle NaN
-                if pd.isna(email):
-                    email = None
-                if pd.isna(entity):
-                    entity = None
-                if pd.isna(description):
-                    description = None
-
-                # Create unique IDs
-                event_id = f"csv_{uuid.uuid4().hex[:16]}"
-                record_id = str(uuid.uuid4())
-
-                # Create revenue event
-                revenue_event = RevenueEvent(
-                    id=record_id,
-                    event_id=event_id,
-                    provider="manual",
-                    event_type="csv_import",
-                    amount_cents=amount_cents,
-                    currency=currency,
-                    customer_email=email,
-                    entity=entity,
-                    event_metadata={"description": description, "csv_row": idx + 1} if description else {"csv_row": idx + 1},
-                    created_at=datetime.utcnow(),
-                    processed_at=datetime.utcnow()
-                )
-
-                db.add(revenue_event)
-                created_count += 1
-
-            except Exception as e:
-                errors.append(f"Row {idx + 1}: {str(e)}")
-
-        # Commit all transactions
-        db.commit()
+@app.post("/ingest/csv/stream")
+async def ingest_csv_stream(
+    request: Request,
+    amount_column: str = Query(...),
+    currency_column: Optional[str] = Query(None),
+    email_column: Optional[str] = Query(None),
+    entity_column: Optional[str] = Query(None),
+    description_column: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+):
+    """
+    Ingest a CSV sent as the raw request body (`Content-Type: text/csv`).
 
-        return {
-            "success": True,
-            "created_count": created_count,
-            "total_rows": len(df),
-            "errors": errors if errors else None
-        }
+    Same column mapping as `POST /ingest/csv`, passed as query parameters.
+    Clients can send the body with chunked transfer encoding; it is spooled
+    to a temporary file and never held in memory as a whole.
 
-    except pd.errors.EmptyDataError:
-        raise HTTPException(status_code=400, detail="CSV file is empty") from None
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Error processing CSV: {str(e)}") from e
-    finally:
-        file.file.close()
+    Batches are committed as they go, so a large file is not one long
+    transaction. If the import fails part-way, the error detail carries
+    `committed_count` and `committed_through_row` so the client can resume
+    after that row.
+    """
+    mapping = _csv_mapping(amount_column, currency_column, email_column, entity_column, description_column)
+    with tempfile.SpooledTemporaryFile(max_size=CSV_SPOOL_MAX_BYTES) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        return await run_in_threadpool(_import_csv_file, db, spool, mapping, commit_batches=True)
 
 
 @app.get("/revenue/summary", response_model=RevenueSummary)
@@ -526,18 +1019,160 @@ def get_revenue_summary(db: Session = Depends(get_db)):
     total_cents = result.total_cents if result.total_cents else 0
     count = result.count if result.count else 0
 
-    return RevenueSummary(
-        total_cents=total_cents,
-        total_dollars=total_cents / 100.0,
-        count=count
-    )
+    return FastJSONResponse({
+        "total_cents": total_cents,
+        "total_dollars": total_cents / 100.0,
+        "count": count,
+        "currency": "USD",
+    })
 
 
-@app.get("/revenue/events", response_model=List[RevenueEventResponse])
-def get_revenue_events(
-    limit: int = 50,
-    offset: int = 0,
-    db: Session = Depends(get_db)
+DASHBOARD_SNAPSHOT_MAX_AGE = int(os.getenv("DASHBOARD_SNAPSHOT_MAX_AGE", "15"))
+
+
+@app.get("/dashboard/snapshot", response_model=DashboardSnapshot)
+def get_dashboard_snapshot(
+    request: Request,
+    events_limit: int = Query(50, ge=1, le=500),
+    days: int = Query(30, ge=1, le=366),
+    db: Session = Depends(get_db),
+):
+    """
+    Get totals, provider/entity breakdown, daily series and recent events at once.
+
+    Totals are derived from the breakdown, so the whole snapshot costs three
+    queries in one session. `timeseries` covers the last `days` UTC days
+    (days without revenue are omitted). The response carries an ETag and a
+    short `Cache-Control` max-age so clients and proxies can cache it whole.
+    """
+    breakdown_rows = (
+        db.query(
+            RevenueEvent.provider,
+            RevenueEvent.entity,
+            func.coalesce(func.sum(RevenueEvent.amount_cents), 0).label("total_cents"),
+            func.count(RevenueEvent.id).label("count"),
+        )
+        .group_by(RevenueEvent.provider, RevenueEvent.entity)
+        .all()
+    )
+    breakdown = sorted(
+        (
+            RevenueBreakdownRow(
+                provider=row.provider,
+                entity=row.entity,
+                total_cents=row.total_cents,
+                count=row.count,
+            )
+            for row in breakdown_rows
+        ),
+        key=lambda row: (-row.total_cents, row.provider, row.entity or ""),
+    )
+    total_cents = sum(row.total_cents for row in breakdown)
+
+    now = datetime.utcnow()
+    since = datetime.combine(now.date() - timedelta(days=days - 1), datetime.min.time())
+    event_day = func.date(RevenueEvent.created_at)
+    series_rows = (
+        db.query(
+            event_day.label("day"),
+            func.coalesce(func.sum(RevenueEvent.amount_cents), 0).label("total_cents"),
+            func.count(RevenueEvent.id).label("count"),
+        )
+        .filter(RevenueEvent.created_at >= since)
+        .group_by(event_day)
+        .order_by(event_day)
+        .all()
+    )
+    timeseries = [
+        RevenueDailyPoint(
+            day=row.day if isinstance(row.day, date) else date.fromisoformat(str(row.day)),
+            total_cents=row.total_cents,
+            count=row.count,
+        )
+        for row in series_rows
+    ]
+
+    events = (
+        db.query(RevenueEvent)
+        .order_by(RevenueEvent.created_at.desc())
+        .limit(events_limit)
+        .all()
+    )
+
+    snapshot = DashboardSnapshot(
+        generated_at=now,
+        totals=RevenueSummary(
+            total_cents=total_cents,
+            total_dollars=total_cents / 100.0,
+            count=sum(row.count for row in breakdown),
+        ),
+        breakdown=breakdown,
+        timeseries=timeseries,
+        recent_events=[RevenueEventResponse.from_orm(event) for event in events],
+    )
+
+    content = snapshot.model_dump()
+    generated_at = content.pop("generated_at")
+    etag = '"' + hashlib.sha256(dumps(content, sort_keys=True)).hexdigest()[:32] + '"'
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={DASHBOARD_SNAPSHOT_MAX_AGE}"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return FastJSONResponse({"generated_at": generated_at, **content}, headers=headers)
+
+
+@app.get("/live/revenue")
+async def live_revenue_feed(
+    request: Request,
+    topics: Optional[str] = None,
+    last_event_id: Optional[str] = None,
+):
+    """
+    Stream new revenue events and PO transitions as Server-Sent Events.
+
+    Each SSE `id` is a feed cursor. Browsers resume automatically by sending
+    `Last-Event-ID`; other clients can pass `last_event_id`. Without either,
+    the stream starts with the next change. `topics` is a comma-separated
+    subset of revenue_event.created, payment.recorded and
+    purchase_order.transitioned (default: revenue events and PO transitions).
+    """
+    if topics:
+        selected = frozenset(topic.strip() for topic in topics.split(",") if topic.strip())
+        unknown = selected - LIVE_FEED_TOPICS
+        if unknown:
+            raise HTTPException(status_code=422, detail=f"Unknown topics: {', '.join(sorted(unknown))}")
+    else:
+        selected = LIVE_FEED_DEFAULT_TOPICS
+
+    cursor = request.headers.get("last-event-id", last_event_id)
+    after = None
+    if cursor is not None:
+        try:
+            after = parse_position(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=400, detail="Last-Event-ID must be a feed cursor"
+            ) from None
+
+    viewer = await LIVE_FEED.subscribe(after=after, topics=selected)
+    return StreamingResponse(
+        stream_frames(LIVE_FEED, viewer),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# Cursors are commit positions (`RevenueEvent.txid`, `seq`), so a delta never skips an
+# event that was still committing when the previous one was served.
+EVENTS_CURSOR_HEADER = "X-Events-Cursor"
+
+
+@app.get("/revenue/events", response_model=List[RevenueEventResponse])
+def get_revenue_events(
+    limit: int = 50,
+    offset: int = 0,
+    since: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db)
 ):
     """
     Get recent revenue transactions.
@@ -545,12 +1180,179 @@ def get_revenue_events(
     Parameters:
     - limit: Maximum number of events to return (default: 50)
     - offset: Number of events to skip for pagination (default: 0)
+    - since: Cursor from a previous `X-Events-Cursor` header; only events
+      recorded after it are returned, oldest first. Follow the new header
+      until fewer than `limit` rows come back.
+    - fields: Comma-separated subset of response fields (e.g.
+      `id,amount_cents,created_at`). Only the columns behind them are read
+      from the database, so skipping `metadata` avoids loading its JSON.
+
+    Every response carries an `X-Events-Cursor` header for the next delta.
     """
-    events = db.query(RevenueEvent).order_by(
-        RevenueEvent.created_at.desc()
-    ).limit(limit).offset(offset).all()
+    selected = _parse_event_fields(fields)
+    if since:
+        cursor = _decode_events_cursor(since)
+        events = (
+            committed_after(
+                # The next cursor is read from the last row.
+                db.query(RevenueEvent).options(*_event_load_options(selected, "id", "seq", "txid")),
+                RevenueEvent.txid,
+                RevenueEvent.seq,
+                cursor,
+            )
+            .limit(limit)
+            .all()
+        )
+        next_cursor = format_position((events[-1].txid or 0, events[-1].seq)) if events else since
+    else:
+        # Read the cursor first: anything committed after it is in the next delta.
+        latest = last_position(db, RevenueEvent.txid, RevenueEvent.seq)
+        events = db.query(RevenueEvent).options(*_event_load_options(selected, "id")).order_by(
+            RevenueEvent.created_at.desc()
+        ).limit(limit).offset(offset).all()
+        next_cursor = format_position(latest)
+
+    return FastJSONResponse(
+        [_revenue_event_dict(event, selected or REVENUE_EVENT_FIELDS) for event in events],
+        headers={EVENTS_CURSOR_HEADER: next_cursor},
+    )
+
+
+@app.get("/revenue/events/linked", response_model=List[RevenueEventResponse])
+def get_linked_revenue_events(
+    po_id: Optional[str] = None,
+    invoice_id: Optional[str] = None,
+    payment_id: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Find the revenue events recorded for a PO, invoice or payment.
+
+    Each key is an indexed column, so this is an index probe rather than a
+    scan of event metadata. Combine keys to narrow the match.
+    """
+    key_filters = {
+        RevenueEvent.po_id: po_id,
+        RevenueEvent.invoice_id: invoice_id,
+        RevenueEvent.payment_id: payment_id,
+    }
+    if not any(key_filters.values()):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Filter by at least one of po_id, invoice_id or payment_id.",
+        )
+    selected = _parse_event_fields(fields)
+    query = db.query(RevenueEvent).options(*_event_load_options(selected, "id"))
+    for column, value in key_filters.items():
+        if value:
+            query = query.filter(column == value)
+    events = query.order_by(RevenueEvent.created_at, RevenueEvent.id).all()
+    return FastJSONResponse(
+        [_revenue_event_dict(event, selected or REVENUE_EVENT_FIELDS) for event in events]
+    )
 
-    return [RevenueEventResponse.from_orm(event) for event in events]
+
+@app.get("/revenue/events/search")
+def search_revenue_events(
+    q: str = Query(..., min_length=MIN_TERM_LENGTH, max_length=200),
+    limit: int = Query(25, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Full-text search over descriptions, customer emails and reference ids.
+
+    Every whitespace-separated term (3+ characters) must match. On SQLite a
+    term matches anywhere, so fragments of a Gumroad product id work; on
+    Postgres terms match word prefixes. Results are ranked best first and
+    carry a `score`; `fields` projects them like `GET /revenue/events`.
+    Returns 503 when the database has no full-text index.
+    """
+    selected = _parse_event_fields(fields)
+    try:
+        hits = search_event_ids(db, q, limit=limit, offset=offset)
+    except SearchQueryError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)) from exc
+    except SearchUnavailable as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc)) from exc
+
+    events = {}
+    if hits:
+        events = {
+            event.id: event
+            for event in db.query(RevenueEvent)
+            .options(*_event_load_options(selected, "id"))
+            .filter(RevenueEvent.id.in_([event_id for event_id, _ in hits]))
+        }
+    return FastJSONResponse(
+        [
+            {**_revenue_event_dict(events[event_id], selected or REVENUE_EVENT_FIELDS), "score": score}
+            for event_id, score in hits
+            if event_id in events
+        ]
+    )
+
+
+@app.get("/revenue/events/columnar")
+def export_revenue_events_columnar(
+    format: str = Query("arrow", pattern="^(arrow|parquet)$"),
+    columns: Optional[str] = None,
+    provider: Optional[str] = None,
+    entity: Optional[str] = None,
+    event_type: Optional[str] = None,
+    currency: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    db: Session = Depends(get_db),
+):
+    """
+    Bulk read of revenue events as an Arrow IPC stream or a Parquet file.
+
+    `columns` is a comma-separated projection (default: every column but
+    `metadata`); `since`/`until` bound `created_at`. Rows are ordered by
+    `created_at` and streamed in record batches, e.g. for
+    `pyarrow.ipc.open_stream(body).read_pandas()`.
+
+    pyarrow is an optional dependency, not in requirements.txt: install
+    it with `pip install -r requirements-columnar.txt`. Without it this
+    endpoint returns 501.
+    """
+    try:
+        load_pyarrow()
+        selected = parse_columns(columns)
+    except ColumnarUnavailable as exc:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=str(exc)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)) from exc
+    stmt = revenue_events_select(
+        selected,
+        provider=provider,
+        entity=entity,
+        event_type=event_type,
+        currency=currency,
+        since=since,
+        until=until,
+        limit=limit,
+    )
+    bind = db.get_bind()
+
+    def generate():
+        # Like the audit export, read through a session owned by the stream.
+        export_db = Session(bind=bind)
+        try:
+            yield from encode_batches(iter_record_batches(export_db, stmt, selected), selected, format)
+        finally:
+            export_db.close()
+
+    extension = "arrows" if format == "arrow" else "parquet"
+    return StreamingResponse(
+        generate(),
+        media_type=COLUMNAR_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="revenue_events.{extension}"'},
+    )
 
 
 @app.post("/po", response_model=PurchaseOrderResponse)
@@ -605,15 +1407,18 @@ def create_purchase_order(
         reason=payload.reason,
         metadata={"po_number": payload.po_number},
     )
+    enqueue_po_transition(db, purchase_order, from_state=None, action="po_created", actor=actor)
     try:
-        db.commit()
+        with tracing.span("po.commit"):
+            db.commit()
     except IntegrityError as exc:
         db.rollback()
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Purchase order violates uniqueness constraints.",
         ) from exc
-    db.refresh(purchase_order)
+    with tracing.span("po.refresh"):
+        db.refresh(purchase_order)
 
     return PurchaseOrderResponse(
         id=purchase_order.id,
@@ -639,7 +1444,8 @@ def create_invoice(
     db: Session = Depends(get_db),
 ):
     """Create an invoice linked to a purchase order."""
-    purchase_order = db.query(PurchaseOrder).filter(PurchaseOrder.id == po_id).first()
+    with tracing.span("po.load"):
+        purchase_order = db.query(PurchaseOrder).filter(PurchaseOrder.id == po_id).first()
     if not purchase_order:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="PO not found.")
 
@@ -728,8 +1534,17 @@ def create_invoice(
         reason=payload.reason,
         metadata={"invoice_number": payload.invoice_number},
     )
+    enqueue_po_transition(
+        db,
+        purchase_order,
+        from_state=previous_status,
+        action="invoice_created",
+        actor=actor,
+        invoice_id=invoice.id,
+    )
     try:
-        db.commit()
+        with tracing.span("po.commit"):
+            db.commit()
     except IntegrityError as exc:
         db.rollback()
         raise HTTPException(
@@ -737,7 +1552,8 @@ def create_invoice(
             detail="Invoice violates uniqueness constraints.",
         ) from exc
 
-    db.refresh(invoice)
+    with tracing.span("po.refresh"):
+        db.refresh(invoice)
 
     return InvoiceResponse(
         id=invoice.id,
@@ -766,124 +1582,171 @@ def record_payment(
     db: Session = Depends(get_db),
 ):
     """Record a payment tied to an invoice and mark PO paid."""
-    invoice = db.query(Invoice).filter(Invoice.id == invoice_id).first()
-    if not invoice:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invoice not found.")
-
-    purchase_order = db.query(PurchaseOrder).filter(PurchaseOrder.id == invoice.po_id).first()
-    if not purchase_order:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="PO not found for invoice.")
-
-    if not invoice.entity or not purchase_order.entity:
-        raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail="Invoice and purchase order must include an entity before recording payment.",
+    with tracing.span("po.load"):
+        invoice = db.query(Invoice).filter(Invoice.id == invoice_id).first()
+        if not invoice:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invoice not found.")
+
+        purchase_order = db.query(PurchaseOrder).filter(PurchaseOrder.id == invoice.po_id).first()
+        if not purchase_order:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="PO not found for invoice.")
+
+    amount_cents, invoice_currency = _validate_payment(invoice, purchase_order, payload)
+    with tracing.span("po.apply_payment"):
+        payment = _apply_payment(
+            db,
+            invoice=invoice,
+            purchase_order=purchase_order,
+            payload=payload,
+            amount_cents=amount_cents,
+            currency=invoice_currency,
         )
 
-    if invoice.status == "void":
+    try:
+        with tracing.span("po.commit"):
+            db.commit()
+    except IntegrityError as exc:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
-            detail="Cannot record payment against a void invoice.",
-        )
+            detail="Payment violates uniqueness constraints.",
+        ) from exc
 
-    if invoice.status == "paid":
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="Invoice is already marked as paid.",
-        )
+    with tracing.span("po.refresh"):
+        db.refresh(payment)
 
-    if invoice.status == "draft":
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="Cannot record payment against a draft invoice.",
-        )
+    return _payment_response(payment)
 
-    if not payload.artifact_uri:
-        raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail="Payment artifact is required to mark invoice/PO as paid.",
-        )
 
-    amount_cents = int(payload.amount * 100)
-    if amount_cents < invoice.amount_cents:
-        raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail="Payment amount must cover the invoice total.",
-        )
-    if amount_cents > invoice.amount_cents:
-        raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail="Payment amount cannot exceed invoice total without credit memo handling.",
-        )
+@app.post("/reconcile/statement")
+def reconcile_bank_statement(
+    file: UploadFile = File(...),
+    amount_column: str = Form(...),
+    reference_column: str = Form(...),
+    currency_column: Optional[str] = Form(None),
+    date_column: Optional[str] = Form(None),
+    entity: Optional[str] = Form(None),
+    include_unmatched: bool = Form(True),
+    db: Session = Depends(get_db),
+):
+    """
+    Match bank statement lines (ACH/wire credits) to open invoices.
 
-    invoice_currency = (invoice.currency or "").strip().upper()
-    payment_currency = payload.currency.strip().upper()
-    if payment_currency != invoice_currency:
-        raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail="Payment currency must match invoice currency.",
-        )
+    Nothing is written: the response lists proposed matches with a
+    confidence score. Post the ones you accept via `POST /reconcile/confirm`.
+    """
+    try:
+        stream = TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+        try:
+            lines, errors = parse_statement(
+                stream,
+                amount_column=amount_column,
+                reference_column=reference_column,
+                currency_column=currency_column or None,
+                date_column=date_column or None,
+            )
+        except StatementFormatError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        finally:
+            stream.detach()
+    finally:
+        file.file.close()
 
-    actor = payload.actor or "system"
-    paid_at = payload.paid_at or datetime.utcnow()
-    now = datetime.utcnow()
-    payment = Payment(
-        id=str(uuid.uuid4()),
-        invoice_id=invoice.id,
-        payment_reference=payload.payment_reference,
-        amount_cents=amount_cents,
-        currency=invoice_currency,
-        paid_at=paid_at,
-        method=payload.method,
-        artifact_uri=payload.artifact_uri,
-        entity=invoice.entity,
-        created_at=now,
-        record_metadata=payload.metadata,
-    )
-    db.add(payment)
+    query = db.query(
+        Invoice.id,
+        Invoice.invoice_number,
+        Invoice.amount_cents,
+        Invoice.currency,
+    ).filter(Invoice.status == "sent")
+    if entity:
+        query = query.filter(Invoice.entity == entity.strip())
+    index = InvoiceIndex(OpenInvoice(*row) for row in query.yield_per(5000))
 
-    previous_invoice_status = invoice.status
-    invoice.status = "paid"
-    invoice.updated_at = now
+    proposals = index.match(lines)
+    matched = sum(1 for proposal in proposals if proposal.invoice_id)
 
-    previous_po_status = purchase_order.status
-    purchase_order.status = "paid"
-    purchase_order.updated_at = now
+    return {
+        "total_lines": len(lines),
+        "open_invoices": len(index),
+        "matched_count": matched,
+        "unmatched_count": len(proposals) - matched,
+        "proposals": [
+            proposal.as_dict()
+            for proposal in proposals
+            if include_unmatched or proposal.invoice_id
+        ],
+        "errors": errors if errors else None,
+    }
 
-    revenue_event = RevenueEvent(
-        id=str(uuid.uuid4()),
-        event_id=f"payment_{uuid.uuid4().hex[:16]}",
-        provider="manual",
-        event_type="po_payment",
-        amount_cents=amount_cents,
-        currency=invoice_currency,
-        customer_email=None,
-        customer_id=purchase_order.customer_id,
-        entity=purchase_order.entity,
-        event_metadata={
-            "po_id": purchase_order.id,
-            "invoice_id": invoice.id,
-            "payment_id": payment.id,
-            "payment_reference": payload.payment_reference,
-        },
-        created_at=now,
-        processed_at=now,
-    )
-    db.add(revenue_event)
 
-    _record_audit_log(
-        db,
-        entity=purchase_order.entity,
-        actor=actor,
-        action="payment_recorded",
-        po_id=purchase_order.id,
-        invoice_id=invoice.id,
-        payment_id=payment.id,
-        from_state=previous_po_status,
-        to_state=purchase_order.status,
-        reason=payload.reason,
-        metadata={"payment_reference": payload.payment_reference},
-    )
+@app.post("/reconcile/confirm", response_model=List[PaymentResponse])
+def confirm_reconciled_payments(
+    payload: ReconciliationConfirm,
+    db: Session = Depends(get_db),
+):
+    """
+    Post confirmed statement matches as payments in a single transaction.
+
+    Each payment goes through the same validation and side effects as
+    `POST /invoice/{invoice_id}/payment` (payment row, invoice/PO marked paid,
+    `po_payment` revenue event, audit entry). Either all payments are posted
+    or none are.
+    """
+    invoice_ids = [item.invoice_id for item in payload.payments]
+    if len(set(invoice_ids)) != len(invoice_ids):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Each invoice may only appear once per reconciliation.",
+        )
+
+    invoices = {
+        invoice.id: invoice
+        for invoice in db.query(Invoice).filter(Invoice.id.in_(invoice_ids)).all()
+    }
+    po_ids = {invoice.po_id for invoice in invoices.values()}
+    purchase_orders = {
+        purchase_order.id: purchase_order
+        for purchase_order in db.query(PurchaseOrder).filter(PurchaseOrder.id.in_(po_ids)).all()
+    }
+
+    payments = []
+    for item in payload.payments:
+        invoice = invoices.get(item.invoice_id)
+        if not invoice:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Invoice {item.invoice_id}: Invoice not found.",
+            )
+        purchase_order = purchase_orders.get(invoice.po_id)
+        if not purchase_order:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Invoice {item.invoice_id}: PO not found for invoice.",
+            )
+        if item.actor is None:
+            item.actor = payload.actor
+        if item.reason is None:
+            item.reason = payload.reason
+        try:
+            amount_cents, invoice_currency = _validate_payment(invoice, purchase_order, item)
+        except HTTPException as exc:
+            db.rollback()
+            raise HTTPException(
+                status_code=exc.status_code,
+                detail=f"Invoice {item.invoice_id}: {exc.detail}",
+            ) from exc
+        payments.append(
+            _apply_payment(
+                db,
+                invoice=invoice,
+                purchase_order=purchase_order,
+                payload=item,
+                amount_cents=amount_cents,
+                currency=invoice_currency,
+            )
+        )
 
     try:
         db.commit()
@@ -891,24 +1754,133 @@ def record_payment(
         db.rollback()
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
-            detail="Payment violates uniqueness constraints.",
+            detail="Reconciled payments violate uniqueness constraints.",
         ) from exc
 
-    db.refresh(payment)
+    return [_payment_response(payment) for payment in payments]
 
-    return PaymentResponse(
-        id=payment.id,
-        invoice_id=payment.invoice_id,
-        payment_reference=payment.payment_reference,
-        amount_cents=payment.amount_cents,
-        amount_dollars=payment.amount_cents / 100.0,
-        currency=payment.currency,
-        paid_at=payment.paid_at,
-        method=payment.method,
-        artifact_uri=payment.artifact_uri,
-        created_at=payment.created_at,
-        metadata=payment.record_metadata or {},
+
+@app.get("/audit", response_model=AuditLogPage)
+def get_audit_log(
+    po_id: Optional[str] = None,
+    invoice_id: Optional[str] = None,
+    payment_id: Optional[str] = None,
+    entity: Optional[str] = None,
+    actor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Get the audit trail for a PO, invoice, payment, entity or actor.
+
+    Entries are returned oldest first. Pass `next_cursor` from the previous
+    page as `cursor` to continue; `since`/`until` bound `created_at`.
+    """
+    query = _audit_log_query(
+        db,
+        po_id=po_id,
+        invoice_id=invoice_id,
+        payment_id=payment_id,
+        entity=entity,
+        actor=actor,
+        since=since,
+        until=until,
     )
+    if cursor:
+        cursor_created_at, cursor_id = _decode_audit_cursor(cursor)
+        query = query.filter(
+            or_(
+                AuditLog.created_at > cursor_created_at,
+                and_(AuditLog.created_at == cursor_created_at, AuditLog.id > cursor_id),
+            )
+        )
+    entries = query.limit(limit + 1).all()
+    next_cursor = _encode_audit_cursor(entries[limit - 1]) if len(entries) > limit else None
+
+    return AuditLogPage(
+        entries=[AuditLogEntryResponse(**_audit_log_dict(entry)) for entry in entries[:limit]],
+        next_cursor=next_cursor,
+    )
+
+
+@app.get("/audit/export")
+def export_audit_log(
+    po_id: Optional[str] = None,
+    invoice_id: Optional[str] = None,
+    payment_id: Optional[str] = None,
+    entity: Optional[str] = None,
+    actor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    db: Session = Depends(get_db),
+):
+    """
+    Stream a full audit trail for auditors as NDJSON or CSV.
+
+    Rows are fetched in batches while the response is written, so exports
+    of any size run in constant memory.
+    """
+    filters = dict(
+        po_id=po_id,
+        invoice_id=invoice_id,
+        payment_id=payment_id,
+        entity=entity,
+        actor=actor,
+        since=since,
+        until=until,
+    )
+    # Validate filters up front so bad requests fail before streaming starts.
+    _audit_log_query(db, **filters)
+    bind = db.get_bind()
+
+    def generate():
+        # The request session may be closed before the body finishes
+        # streaming, so the export reads through its own session.
+        export_db = Session(bind=bind)
+        try:
+            rows = _audit_log_query(export_db, **filters).yield_per(1000)
+            if format == "csv":
+                buffer = StringIO()
+                writer = csv.writer(buffer)
+                writer.writerow(AUDIT_EXPORT_COLUMNS)
+                for entry in rows:
+                    record = _audit_log_dict(entry)
+                    record["created_at"] = entry.created_at.isoformat()
+                    record["metadata"] = json.dumps(record["metadata"], sort_keys=True)
+                    writer.writerow([record[column] for column in AUDIT_EXPORT_COLUMNS])
+                    if buffer.tell() > 64 * 1024:
+                        yield buffer.getvalue()
+                        buffer.seek(0)
+                        buffer.truncate()
+                yield buffer.getvalue()
+            else:
+                for entry in rows:
+                    yield dumps(_audit_log_dict(entry)) + b"\n"
+        finally:
+            export_db.close()
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        generate(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="audit_log.{format}"'},
+    )
+
+
+@app.get("/scheduler/runs", response_model=List[JobRunResponse])
+def get_scheduler_runs(
+    job: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+):
+    """
+    Get recent scheduled job runs (newest first) with their durations.
+    """
+    return recent_job_runs(db, job_name=job, limit=limit)
 
 
 # Webhook endpoints (placeholders for future Stripe/Gumroad integration)
@@ -922,6 +1894,7 @@ async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
     """
 
     body, status_code = await handle_stripe_webhook(request, db, AGENT_SETTINGS)
+    metrics.record_webhook("stripe", body.status, body.created)
     return JSONResponse(status_code=status_code, content=body.model_dump())
 
 
@@ -934,4 +1907,5 @@ async def gumroad_webhook(request: Request, db: Session = Depends(get_db)):
     """
 
     body, status_code = await handle_gumroad_webhook(request, db, AGENT_SETTINGS)
+    metrics.record_webhook("gumroad", body.status, body.created)
     return JSONResponse(status_code=status_code, content=body.model_dump())
@@ -0,0 +1,329 @@
+"""In-process metrics in the Prometheus text format, served at `/metrics`.
+
+A small dependency-free implementation of counters, gauges and histograms.
+Recording is a dict lookup plus a bisect and two adds under a per-metric
+lock, so it is cheap enough to leave on under load. Each replica exposes its
+own numbers; Prometheus aggregates across replicas.
+
+What is recorded:
+- `http_request_duration_seconds{method,route,status}`: by `MetricsMiddleware`,
+  labelled with the route template (`/po/{po_id}`), never the raw path
+- `http_request_db_queries` / `http_request_db_seconds{route}`: DB work per
+  request, accumulated from `db_timing` in a context variable
+- `db_query_duration_seconds`: every statement, in or out of a request
+- `webhook_events_total{provider,status,outcome}`
+- `csv_import_rows_total`, `csv_import_rows_per_second`
+- `db_pool_*` gauges, read from the engine pool at scrape time
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Iterable, Optional, Sequence
+
+from sqlalchemy.engine import Engine
+
+from . import db_timing
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+RATE_BUCKETS = (10, 100, 1000, 5000, 10000, 50000, 100000)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge(_Metric):
+    """A settable gauge, or one read from `callback` at scrape time."""
+
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        callback: Optional[Callable[[], Optional[float]]] = None,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+        self.callback = callback
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def value(self, **labels: str) -> Optional[float]:
+        if self.callback is not None:
+            return self.callback()
+        return self._values.get(self._key(labels))
+
+    def samples(self) -> Iterable[str]:
+        if self.callback is not None:
+            value = self.callback()
+            if value is not None:
+                yield f"{self.name} {_format_value(value)}"
+            return
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts..., +Inf count, sum]
+        self._series: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(self._key(labels))
+        return int(sum(series[:-1])) if series else 0
+
+    def sum(self, **labels: str) -> float:
+        series = self._series.get(self._key(labels))
+        return series[-1] if series else 0.0
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in items:
+            cumulative = 0.0
+            for bound, count in zip((*self.buckets, float("inf")), series[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {_format_value(cumulative)}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(series[-1])}"
+            yield f"{self.name}_count{labels} {_format_value(cumulative)}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (), callback=None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> _Metric:
+        return self._metrics[name]
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_DURATION = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template and status.",
+    ("method", "route", "status"),
+)
+REQUEST_DB_QUERIES = REGISTRY.histogram(
+    "http_request_db_queries", "DB statements executed per HTTP request.", ("route",), COUNT_BUCKETS
+)
+REQUEST_DB_SECONDS = REGISTRY.histogram(
+    "http_request_db_seconds", "Time spent in DB statements per HTTP request.", ("route",), DB_BUCKETS
+)
+DB_QUERY_DURATION = REGISTRY.histogram(
+    "db_query_duration_seconds", "Duration of every DB statement.", (), DB_BUCKETS
+)
+WEBHOOK_EVENTS = REGISTRY.counter(
+    "webhook_events_total",
+    "Webhook deliveries by provider, handler status and outcome (created/duplicate/status).",
+    ("provider", "status", "outcome"),
+)
+CSV_ROWS = REGISTRY.counter("csv_import_rows_total", "CSV rows processed by result.", ("result",))
+CSV_ROWS_PER_SECOND = REGISTRY.histogram(
+    "csv_import_rows_per_second", "Throughput of each CSV import.", (), RATE_BUCKETS
+)
+
+
+class _RequestDbStats:
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+_request_db: ContextVar[Optional[_RequestDbStats]] = ContextVar("request_db_stats", default=None)
+
+
+def _on_statement(timing: db_timing.StatementTiming) -> None:
+    DB_QUERY_DURATION.observe(timing.seconds)
+    stats = _request_db.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.seconds += timing.seconds
+
+
+def instrument_engines() -> None:
+    """Time every statement on every engine (idempotent)."""
+    db_timing.subscribe(_on_statement)
+
+
+def register_pool_gauges(engine: Engine) -> None:
+    """Expose the engine's connection pool usage (QueuePool only)."""
+    pool = engine.pool
+
+    def read(attribute: str) -> Callable[[], Optional[float]]:
+        def callback() -> Optional[float]:
+            method = getattr(pool, attribute, None)
+            # QueuePool.overflow() counts down from -pool_size until the pool fills.
+            return float(max(method(), 0)) if callable(method) else None
+
+        return callback
+
+    REGISTRY.gauge("db_pool_size", "Configured pool size.", callback=read("size"))
+    REGISTRY.gauge("db_pool_checked_out", "Connections currently in use.", callback=read("checkedout"))
+    REGISTRY.gauge("db_pool_overflow", "Connections open beyond pool size.", callback=read("overflow"))
+
+
+def record_webhook(provider: str, status: str, created: Optional[bool]) -> None:
+    if status == "ok":
+        outcome = "created" if created else "duplicate"
+    else:
+        outcome = status
+    WEBHOOK_EVENTS.inc(provider=provider, status=status, outcome=outcome)
+
+
+def record_csv_import(created: int, errors: int, seconds: float) -> None:
+    CSV_ROWS.inc(created, result="created")
+    CSV_ROWS.inc(errors, result="error")
+    rows = created + errors
+    if rows and seconds > 0:
+        CSV_ROWS_PER_SECOND.observe(rows / seconds)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and per-request DB work."""
+
+    def __init__(self, app, *, exclude_paths: Iterable[str] = ("/metrics",)):
+        self.app = app
+        self.exclude_paths = frozenset(exclude_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        stats = _RequestDbStats()
+        token = _request_db.set(stats)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_db.reset(token)
+            route = scope.get("route")
+            route_label = getattr(route, "path", None) or "unmatched"
+            REQUEST_DURATION.observe(
+                elapsed, method=scope["method"], route=route_label, status=str(status_code)
+            )
+            REQUEST_DB_QUERIES.observe(stats.queries, route=route_label)
+            REQUEST_DB_SECONDS.observe(stats.seconds, route=route_label)
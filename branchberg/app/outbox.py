@@ -0,0 +1,480 @@
+"""Transactional outbox for downstream revenue notifications.
+
+Write paths add an `OutboxEvent` row in the same transaction as the
+`RevenueEvent`/`Payment` it describes, so a change is published if and only
+if it commits, and the request never waits on anything external.
+
+`OutboxDispatcher` drains the table in id order, in batches, to each
+subscriber (the Slack notifier, HTTP endpoints from `OUTBOX_SUBSCRIBERS`).
+Every subscriber has its own cursor in `outbox_cursors`:
+- a batch is delivered, then the cursor advances past it; a crash in
+  between re-delivers the batch, so delivery is at-least-once and receivers
+  should dedupe on the event `id`
+- a failing subscriber backs off exponentially without holding up the others
+
+Cursors are commit positions, `(txid, id)` (see `database.committed_after`):
+on Postgres the dispatcher only reads rows whose writing transaction is
+older than every transaction still in flight, so a cursor never moves past
+a row that is still committing, and outbox writers never wait on each
+other. Gaps left by rolled-back inserts are simply never filled.
+
+On Postgres the cursor row is locked (`SKIP LOCKED`) while its batch is
+delivered, so replicas running the dispatcher never send the same batch
+concurrently. Events every subscriber has received are pruned once older
+than the retention period.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Optional, Protocol
+
+from sqlalchemy import event, func, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .database import OutboxCursor, OutboxEvent, committed_after, stamp_txid
+from .revenue_agent.notifications.base import AlertMessage, Notifier
+
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger(__name__)
+
+TOPIC_REVENUE_EVENT = "revenue_event.created"
+TOPIC_PAYMENT = "payment.recorded"
+TOPIC_PO_TRANSITION = "purchase_order.transitioned"
+SIGNATURE_HEADER = "X-Outbox-Signature"
+
+
+class OutboxConfigError(ValueError):
+    """Raised when `OUTBOX_SUBSCRIBERS` cannot be parsed."""
+
+
+class DeliveryError(RuntimeError):
+    """Raised by a subscriber that could not accept a batch."""
+
+
+def enqueue(db: Session, topic: str, payload: dict[str, Any], *, key: Optional[str] = None) -> OutboxEvent:
+    """Add an outbox row to the caller's transaction (the caller commits)."""
+    event = OutboxEvent(topic=topic, key=key, payload=payload, created_at=datetime.utcnow())
+    db.add(event)
+    return event
+
+
+@event.listens_for(Session, "before_flush")
+def _stamp_outbox_txids(session: Session, flush_context, instances) -> None:
+    """Record the writing transaction on new outbox rows (see module docstring)."""
+    stamp_txid(session, [obj for obj in session.new if isinstance(obj, OutboxEvent)])
+
+
+def enqueue_revenue_event(db: Session, record: Any) -> OutboxEvent:
+    return enqueue(
+        db,
+        TOPIC_REVENUE_EVENT,
+        {
+            "id": record.id,
+            "event_id": record.event_id,
+            "provider": record.provider,
+            "event_type": record.event_type,
+            "amount_cents": record.amount_cents,
+            "currency": record.currency,
+            "customer_id": record.customer_id,
+            "entity": record.entity,
+            "created_at": record.created_at.isoformat() if record.created_at else None,
+        },
+        key=record.id,
+    )
+
+
+def enqueue_payment(db: Session, payment: Any, *, purchase_order: Any) -> OutboxEvent:
+    return enqueue(
+        db,
+        TOPIC_PAYMENT,
+        {
+            "payment_id": payment.id,
+            "invoice_id": payment.invoice_id,
+            "po_id": purchase_order.id,
+            "entity": purchase_order.entity,
+            "amount_cents": payment.amount_cents,
+            "currency": payment.currency,
+            "payment_reference": payment.payment_reference,
+            "paid_at": payment.paid_at.isoformat() if payment.paid_at else None,
+        },
+        key=payment.id,
+    )
+
+
+def enqueue_po_transition(
+    db: Session,
+    purchase_order: Any,
+    *,
+    from_state: Optional[str],
+    action: str,
+    actor: str,
+    invoice_id: Optional[str] = None,
+    payment_id: Optional[str] = None,
+) -> Optional[OutboxEvent]:
+    """Publish a PO status change; no-op when the status did not change."""
+    if from_state == purchase_order.status:
+        return None
+    return enqueue(
+        db,
+        TOPIC_PO_TRANSITION,
+        {
+            "po_id": purchase_order.id,
+            "po_number": purchase_order.po_number,
+            "entity": purchase_order.entity,
+            "amount_cents": purchase_order.amount_cents,
+            "currency": purchase_order.currency,
+            "from_state": from_state,
+            "to_state": purchase_order.status,
+            "action": action,
+            "actor": actor,
+            "invoice_id": invoice_id,
+            "payment_id": payment_id,
+        },
+        key=purchase_order.id,
+    )
+
+
+def latest_outbox_id(db: Session) -> int:
+    return db.query(func.max(OutboxEvent.id)).scalar() or 0
+
+
+@dataclass(frozen=True)
+class OutboxMessage:
+    id: int
+    topic: str
+    key: Optional[str]
+    payload: dict[str, Any]
+    created_at: datetime
+
+    @classmethod
+    def from_row(cls, row: OutboxEvent) -> "OutboxMessage":
+        return cls(
+            id=row.id,
+            topic=row.topic,
+            key=row.key,
+            payload=dict(row.payload or {}),
+            created_at=row.created_at,
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "topic": self.topic,
+            "key": self.key,
+            "created_at": self.created_at.isoformat(),
+            "payload": self.payload,
+        }
+
+
+class Subscriber(Protocol):
+    name: str
+    topics: Optional[frozenset[str]]  # None: every topic
+
+    def deliver(self, messages: list[OutboxMessage]) -> None:
+        """Deliver a batch or raise; a raised batch is retried later."""
+
+
+class NotifierSubscriber:
+    """Announces new revenue through a `Notifier` (coalesced like any alert)."""
+
+    def __init__(self, notifier: Notifier, *, name: str = "notifier"):
+        self.notifier = notifier
+        self.name = name
+        self.topics = frozenset({TOPIC_REVENUE_EVENT})
+
+    def deliver(self, messages: list[OutboxMessage]) -> None:
+        for message in messages:
+            payload = message.payload
+            amount = (payload.get("amount_cents") or 0) / 100
+            self.notifier.notify_alert(
+                AlertMessage(
+                    alert_type="revenue",
+                    severity="info",
+                    message=(
+                        f"New revenue: {amount:,.2f} {payload.get('currency') or 'USD'} "
+                        f"via {payload.get('provider')} ({payload.get('entity') or 'unassigned'})"
+                    ),
+                    metadata=payload,
+                    key=message.topic,
+                )
+            )
+
+
+class HttpSubscriber:
+    """POSTs batches as JSON to a URL; any non-2xx response is a failure.
+
+    Body: `{"subscriber": name, "events": [{"id", "topic", "key",
+    "created_at", "payload"}, ...]}`. With a `secret`, the body is signed
+    with HMAC-SHA256 in `X-Outbox-Signature`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        url: str,
+        *,
+        topics: Optional[Iterable[str]] = None,
+        secret: Optional[str] = None,
+        timeout: float = 5.0,
+        session: Optional[requests.Session] = None,
+    ):
+        self.name = name
+        self.url = url
+        self.topics = frozenset(topics) if topics else None
+        self.secret = secret
+        self.timeout = timeout
+        self._session = session
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            import requests  # deferred: only HTTP subscribers need it
+
+            self._session = requests.Session()
+        return self._session
+
+    def deliver(self, messages: list[OutboxMessage]) -> None:
+        body = json.dumps(
+            {"subscriber": self.name, "events": [message.as_dict() for message in messages]},
+            separators=(",", ":"),
+        ).encode()
+        headers = {"Content-Type": "application/json"}
+        if self.secret:
+            headers[SIGNATURE_HEADER] = hmac.new(self.secret.encode(), body, hashlib.sha256).hexdigest()
+        import requests
+
+        try:
+            response = self.session.post(self.url, data=body, headers=headers, timeout=self.timeout)
+        except requests.RequestException as exc:
+            raise DeliveryError(f"{self.name}: {exc}") from exc
+        if not 200 <= response.status_code < 300:
+            raise DeliveryError(f"{self.name}: HTTP {response.status_code}")
+
+
+def parse_subscribers(raw: Optional[str]) -> list[HttpSubscriber]:
+    """Parse `OUTBOX_SUBSCRIBERS`: `[{"name", "url", "topics"?, "secret"?}]`."""
+    if not raw or not raw.strip():
+        return []
+    try:
+        items = json.loads(raw)
+    except json.JSONDecodeError as exc:
+        raise OutboxConfigError(f"OUTBOX_SUBSCRIBERS is not valid JSON: {exc}") from exc
+    if not isinstance(items, list):
+        raise OutboxConfigError("OUTBOX_SUBSCRIBERS must be a JSON list")
+
+    subscribers = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not item.get("url"):
+            raise OutboxConfigError(f"subscriber #{index} needs a url")
+        subscribers.append(
+            HttpSubscriber(
+                str(item.get("name") or f"http_{index}"),
+                str(item["url"]),
+                topics=item.get("topics"),
+                secret=item.get("secret"),
+                timeout=float(item.get("timeout", 5.0)),
+            )
+        )
+    names = [subscriber.name for subscriber in subscribers]
+    if len(set(names)) != len(names):
+        raise OutboxConfigError("subscriber names must be unique")
+    return subscribers
+
+
+class OutboxDispatcher:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        subscribers: list[Subscriber],
+        *,
+        batch_size: int = 200,
+        max_batches_per_run: int = 50,
+        backoff_seconds: float = 1.0,
+        max_backoff_seconds: float = 300.0,
+        retention: timedelta = timedelta(days=7),
+        prune_interval: timedelta = timedelta(minutes=10),
+        poll_seconds: float = 1.0,
+        clock: Callable[[], datetime] = datetime.utcnow,
+    ):
+        self.session_factory = session_factory
+        self.subscribers = list(subscribers)
+        self.batch_size = batch_size
+        self.max_batches_per_run = max_batches_per_run
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.retention = retention
+        self.prune_interval = prune_interval
+        self.poll_seconds = poll_seconds
+        self.clock = clock
+        self._last_prune: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+
+    def dispatch_once(self, now: Optional[datetime] = None) -> dict[str, int]:
+        """Deliver pending events to every subscriber; return counts sent."""
+
+        now = now or self.clock()
+        delivered = {}
+        for subscriber in self.subscribers:
+            db = self.session_factory()
+            try:
+                delivered[subscriber.name] = self._dispatch_subscriber(db, subscriber, now)
+            finally:
+                db.close()
+        if self._last_prune is None or now - self._last_prune >= self.prune_interval:
+            self.prune(now)
+        return delivered
+
+    def _lock_cursor(self, db: Session, name: str) -> Optional[OutboxCursor]:
+        if db.get(OutboxCursor, name) is None:
+            db.add(OutboxCursor(subscriber=name, last_event_id=0, last_txid=0, attempts=0))
+            try:
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+        return (
+            db.query(OutboxCursor)
+            .filter(OutboxCursor.subscriber == name)
+            .with_for_update(skip_locked=True)
+            .one_or_none()
+        )
+
+    def _dispatch_subscriber(self, db: Session, subscriber: Subscriber, now: datetime) -> int:
+        delivered = 0
+        for _ in range(self.max_batches_per_run):
+            cursor = self._lock_cursor(db, subscriber.name)
+            if cursor is None:
+                return delivered  # another replica is delivering
+            if cursor.next_attempt_at is not None and cursor.next_attempt_at > now:
+                db.rollback()
+                return delivered
+
+            rows = (
+                committed_after(
+                    db.query(OutboxEvent),
+                    OutboxEvent.txid,
+                    OutboxEvent.id,
+                    (cursor.last_txid or 0, cursor.last_event_id),
+                )
+                .limit(self.batch_size)
+                .all()
+            )
+            if not rows:
+                db.rollback()
+                return delivered
+
+            messages = [
+                OutboxMessage.from_row(row)
+                for row in rows
+                if subscriber.topics is None or row.topic in subscriber.topics
+            ]
+            try:
+                if messages:
+                    subscriber.deliver(messages)
+            except Exception as exc:  # noqa: BLE001 - any failure means retry later
+                cursor.attempts += 1
+                delay = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** (cursor.attempts - 1))
+                cursor.next_attempt_at = now + timedelta(seconds=delay)
+                cursor.last_error = str(exc)[:1000]
+                cursor.updated_at = now
+                db.commit()
+                logger.warning(
+                    "outbox delivery to %s failed (attempt %s): %s",
+                    subscriber.name,
+                    cursor.attempts,
+                    exc,
+                )
+                return delivered
+
+            cursor.last_txid = rows[-1].txid
+            cursor.last_event_id = rows[-1].id
+            cursor.attempts = 0
+            cursor.next_attempt_at = None
+            cursor.last_error = None
+            cursor.updated_at = now
+            db.commit()
+            delivered += len(messages)
+            if len(rows) < self.batch_size:
+                return delivered
+        return delivered
+
+    def prune(self, now: Optional[datetime] = None) -> int:
+        """Delete events every subscriber has received and that are past retention."""
+
+        now = now or self.clock()
+        self._last_prune = now
+        db = self.session_factory()
+        try:
+            query = db.query(OutboxEvent).filter(
+                OutboxEvent.created_at < now - self.retention,
+                # SQLite hands out max(id) + 1, so the newest row must stay or
+                # ids would be reused below every cursor.
+                OutboxEvent.id < latest_outbox_id(db),
+            )
+            names = [subscriber.name for subscriber in self.subscribers]
+            if names:
+                cursors = {
+                    cursor.subscriber: (cursor.last_txid or 0, cursor.last_event_id)
+                    for cursor in db.query(OutboxCursor).filter(OutboxCursor.subscriber.in_(names))
+                }
+                delivered_up_to = min(cursors.get(name, (0, 0)) for name in names)
+                query = query.filter(
+                    tuple_(OutboxEvent.txid, OutboxEvent.id) <= tuple_(*delivered_up_to)
+                )
+            deleted = query.delete(synchronize_session=False)
+            db.commit()
+            return deleted
+        finally:
+            db.close()
+
+    def backlog(self, db: Session) -> dict[str, int]:
+        """Events each subscriber has not been sent yet (topic filters ignored)."""
+        cursors = {
+            cursor.subscriber: (cursor.last_txid or 0, cursor.last_event_id)
+            for cursor in db.query(OutboxCursor)
+        }
+        return {
+            subscriber.name: committed_after(
+                db.query(OutboxEvent.id),
+                OutboxEvent.txid,
+                OutboxEvent.id,
+                cursors.get(subscriber.name, (0, 0)),
+            ).count()
+            for subscriber in self.subscribers
+        }
+
+    def start(self) -> asyncio.Task:
+        """Start draining on the running event loop (call from `lifespan`)."""
+
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._run_forever(), name="outbox-dispatcher")
+        return self._task
+
+    async def stop(self) -> None:
+        if self._task is None or self._stopping is None:
+            return
+        self._stopping.set()
+        await self._task
+        self._task = None
+
+    async def _run_forever(self) -> None:
+        assert self._stopping is not None
+        while not self._stopping.is_set():
+            try:
+                await asyncio.to_thread(self.dispatch_once)
+            except Exception:  # noqa: BLE001 - keep the loop alive
+                logger.exception("outbox dispatch failed")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,209 @@
+"""Opt-in SQL profiler: every statement per request, slow queries, N+1 shapes.
+
+Enabled with `QUERY_PROFILER=1`. `QueryProfilerMiddleware` opens a
+`RequestProfile` per HTTP request; the shared `db_timing` hook appends each
+statement to it with its duration and normalized shape (literals and
+`IN (...)` lists collapsed to `?`). Then:
+
+- a statement slower than `slow_query_ms` is logged with its EXPLAIN plan
+  (`EXPLAIN QUERY PLAN` on SQLite, `EXPLAIN` on Postgres; SELECTs only),
+  run on the same connection right after the statement. On Postgres it runs
+  inside a savepoint, so a failing EXPLAIN cannot abort the request's
+  transaction
+- at the end of the request, a shape executed `n_plus_one_threshold` or
+  more times is logged as a suspected N+1
+- every response carries `X-Query-Count` and `Server-Timing: db;dur=...`
+
+Statements outside a request (background workers) are not recorded.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from starlette.datastructures import MutableHeaders
+
+from . import db_timing
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SLOW_QUERY_MS = 100.0
+DEFAULT_N_PLUS_ONE_THRESHOLD = 5
+EXPLAIN_SAVEPOINT = "query_profiler_explain"
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"\?|%\(\w+\)s|%s|(?<!:):\w+|\$\d+")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(statement: str) -> str:
+    """Reduce a statement to its shape, so repeats with other values compare equal."""
+    shape = _STRING_LITERAL.sub("?", statement)
+    shape = _PLACEHOLDER.sub("?", shape)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _IN_LIST.sub("IN (?)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+@dataclass
+class QueryRecord:
+    statement: str
+    shape: str
+    duration_ms: float
+    executemany: bool = False
+    plan: Optional[list[str]] = None
+
+
+@dataclass
+class RequestProfile:
+    method: str
+    path: str
+    queries: list[QueryRecord] = field(default_factory=list)
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    @property
+    def total_ms(self) -> float:
+        return sum(query.duration_ms for query in self.queries)
+
+    def repeated_shapes(self, threshold: int) -> list[tuple[str, int]]:
+        """Statement shapes run at least `threshold` times, most frequent first."""
+        counts = Counter(query.shape for query in self.queries if not query.executemany)
+        return [(shape, count) for shape, count in counts.most_common() if count >= threshold]
+
+
+@dataclass(frozen=True)
+class ProfilerSettings:
+    slow_query_ms: float = DEFAULT_SLOW_QUERY_MS
+    n_plus_one_threshold: int = DEFAULT_N_PLUS_ONE_THRESHOLD
+    explain: bool = True
+
+
+_current: ContextVar[Optional[tuple[RequestProfile, ProfilerSettings]]] = ContextVar(
+    "query_profile", default=None
+)
+
+
+def current_profile() -> Optional[RequestProfile]:
+    active = _current.get()
+    return active[0] if active else None
+
+
+def explain(conn, statement: str, parameters: Any) -> Optional[list[str]]:
+    """Plan of a SELECT on this connection, one line per plan row."""
+    if not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        return None
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    elif dialect == "postgresql":
+        prefix = "EXPLAIN "
+    else:
+        return None
+    # A failed statement aborts a Postgres transaction; contain it.
+    savepoint = dialect == "postgresql" and conn.in_transaction()
+    cursor = conn.connection.cursor()
+    try:
+        if savepoint:
+            cursor.execute(f"SAVEPOINT {EXPLAIN_SAVEPOINT}")
+        try:
+            cursor.execute(prefix + statement, parameters)
+            plan = [" ".join(str(value) for value in row) for row in cursor.fetchall()]
+        except Exception:
+            if savepoint:
+                cursor.execute(f"ROLLBACK TO SAVEPOINT {EXPLAIN_SAVEPOINT}")
+                cursor.execute(f"RELEASE SAVEPOINT {EXPLAIN_SAVEPOINT}")
+            raise
+        if savepoint:
+            cursor.execute(f"RELEASE SAVEPOINT {EXPLAIN_SAVEPOINT}")
+        return plan
+    except Exception as exc:  # the plan is best-effort diagnostics
+        return [f"EXPLAIN failed: {exc}"]
+    finally:
+        cursor.close()
+
+
+def _on_statement(timing: db_timing.StatementTiming) -> None:
+    active = _current.get()
+    if active is None:
+        return
+    duration_ms = timing.seconds * 1000
+    profile, settings = active
+    record = QueryRecord(timing.statement, normalize_sql(timing.statement), duration_ms, timing.executemany)
+    profile.queries.append(record)
+    if duration_ms >= settings.slow_query_ms:
+        if settings.explain and not timing.executemany:
+            record.plan = explain(timing.conn, timing.statement, timing.parameters)
+        logger.warning(
+            "slow query (%.1fms) in %s %s: %s%s",
+            duration_ms,
+            profile.method,
+            profile.path,
+            record.shape,
+            "".join(f"\n  {line}" for line in record.plan or ()),
+        )
+
+
+def instrument_engines() -> None:
+    """Record statements on every engine while a profile is active (idempotent)."""
+    db_timing.subscribe(_on_statement)
+
+
+def settings_from_env() -> Optional[ProfilerSettings]:
+    """Profiler settings, or None unless `QUERY_PROFILER` is switched on."""
+    if (os.getenv("QUERY_PROFILER") or "").strip().lower() not in {"1", "true", "yes", "y", "on"}:
+        return None
+    return ProfilerSettings(
+        slow_query_ms=float(os.getenv("QUERY_PROFILER_SLOW_MS") or DEFAULT_SLOW_QUERY_MS),
+        n_plus_one_threshold=int(os.getenv("QUERY_PROFILER_N_PLUS_ONE") or DEFAULT_N_PLUS_ONE_THRESHOLD),
+    )
+
+
+class QueryProfilerMiddleware:
+    """ASGI middleware profiling the SQL each HTTP request issues."""
+
+    def __init__(self, app, *, settings: ProfilerSettings = ProfilerSettings()):
+        self.app = app
+        self.settings = settings
+        instrument_engines()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"])
+        token = _current.set((profile, self.settings))
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-Query-Count"] = str(profile.count)
+                headers.append("Server-Timing", f"db;dur={profile.total_ms:.1f}")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            self.report(profile, scope)
+
+    def report(self, profile: RequestProfile, scope) -> None:
+        route = getattr(scope.get("route"), "path", profile.path)
+        for shape, count in profile.repeated_shapes(self.settings.n_plus_one_threshold):
+            logger.warning(
+                "suspected N+1 in %s %s: %d x %s", profile.method, route, count, shape
+            )
+        logger.debug(
+            "%s %s: %d queries in %.1fms", profile.method, route, profile.count, profile.total_ms
+        )
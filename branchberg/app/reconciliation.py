@@ -0,0 +1,239 @@
+"""Bank statement reconciliation for open invoices.
+
+Statement lines (ACH/wire credits) are matched against open invoices using
+in-memory hash indexes built once per request:
+- invoice number (normalized), probed with every token of the line reference;
+  a number shared by several invoices only matches through the one whose
+  amount and currency agree with the line
+- (amount_cents, currency), used when the reference names no invoice
+
+Matching is a single pass over the statement, so cost grows with the number
+of lines and invoices rather than their product. Nothing here touches the
+database; callers load the open invoices and post confirmed matches.
+"""
+
+from __future__ import annotations
+
+import csv
+import re
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import Any, Iterable, Optional, TextIO
+
+# Confidence scores per match type. Only `reference_and_amount` and
+# `amount_unique` are exact enough to post without a human looking at them.
+CONFIDENCE = {
+    "reference_and_amount": 0.99,
+    "amount_unique": 0.7,
+    "reference_only": 0.4,
+    "amount_ambiguous": 0.2,
+    "unmatched": 0.0,
+}
+
+_TOKEN_SPLIT = re.compile(r"[\s,;:/|#()\[\]]+")
+_NON_ALNUM = re.compile(r"[^A-Z0-9]")
+
+
+class StatementFormatError(ValueError):
+    """Raised when a statement file cannot be parsed at all."""
+
+
+@dataclass(frozen=True)
+class StatementLine:
+    line_number: int
+    amount_cents: int
+    currency: str
+    reference: str
+    posted_at: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class OpenInvoice:
+    id: str
+    invoice_number: str
+    amount_cents: int
+    currency: Optional[str]
+
+
+@dataclass
+class MatchProposal:
+    line: StatementLine
+    match_type: str
+    invoice_id: Optional[str] = None
+    invoice_number: Optional[str] = None
+    candidate_invoice_ids: list[str] = field(default_factory=list)
+
+    @property
+    def confidence(self) -> float:
+        return CONFIDENCE[self.match_type]
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "line_number": self.line.line_number,
+            "reference": self.line.reference,
+            "posted_at": self.line.posted_at,
+            "amount_cents": self.line.amount_cents,
+            "amount_dollars": self.line.amount_cents / 100.0,
+            "currency": self.line.currency,
+            "invoice_id": self.invoice_id,
+            "invoice_number": self.invoice_number,
+            "match_type": self.match_type,
+            "confidence": self.confidence,
+            "candidate_invoice_ids": self.candidate_invoice_ids or None,
+        }
+
+
+def normalize_reference(value: str) -> str:
+    """Uppercase and drop punctuation so `inv-00123` and `INV00123` collide."""
+    return _NON_ALNUM.sub("", (value or "").upper())
+
+
+def parse_amount_cents(value: Any) -> int:
+    """Parse `$1,234.56` / `1234.56` / `(12.00)` into integer cents."""
+    text = str(value or "").strip().replace("$", "").replace(",", "")
+    negative = text.startswith("(") and text.endswith(")")
+    if negative:
+        text = text[1:-1]
+    try:
+        cents = int((Decimal(text) * 100).to_integral_value(rounding=ROUND_HALF_UP))
+    except InvalidOperation:
+        raise ValueError(f"invalid amount {value!r}") from None
+    return -cents if negative else cents
+
+
+def parse_statement(
+    stream: TextIO,
+    *,
+    amount_column: str,
+    reference_column: str,
+    currency_column: Optional[str] = None,
+    date_column: Optional[str] = None,
+    default_currency: str = "USD",
+) -> tuple[list[StatementLine], list[str]]:
+    """Read credit lines from a CSV statement; return (lines, row errors).
+
+    Debits (zero or negative amounts) are skipped silently since they can
+    never settle an invoice.
+    """
+
+    reader = csv.DictReader(stream)
+    columns = reader.fieldnames or []
+    if not columns:
+        raise StatementFormatError("Statement file is empty")
+    for column in (amount_column, reference_column, currency_column, date_column):
+        if column and column not in columns:
+            raise StatementFormatError(f"Column '{column}' not found in statement")
+
+    lines: list[StatementLine] = []
+    errors: list[str] = []
+    default_currency = default_currency.upper()
+    for line_number, row in enumerate(reader, start=1):
+        try:
+            amount_cents = parse_amount_cents(row[amount_column])
+        except ValueError as exc:
+            errors.append(f"Line {line_number}: {exc}")
+            continue
+        if amount_cents <= 0:
+            continue
+        currency = default_currency
+        if currency_column:
+            currency = (row[currency_column] or "").strip().upper() or default_currency
+        posted_at = None
+        if date_column:
+            posted_at = (row[date_column] or "").strip() or None
+        lines.append(
+            StatementLine(
+                line_number=line_number,
+                amount_cents=amount_cents,
+                currency=currency,
+                reference=(row[reference_column] or "").strip(),
+                posted_at=posted_at,
+            )
+        )
+    return lines, errors
+
+
+class InvoiceIndex:
+    """Hash indexes over open invoices for single-pass statement matching."""
+
+    def __init__(self, invoices: Iterable[OpenInvoice]):
+        self._by_number: dict[str, list[OpenInvoice]] = {}
+        self._by_amount: dict[tuple[int, str], list[OpenInvoice]] = {}
+        self._count = 0
+        for invoice in invoices:
+            self._count += 1
+            key = normalize_reference(invoice.invoice_number)
+            if key:
+                self._by_number.setdefault(key, []).append(invoice)
+            currency = (invoice.currency or "USD").strip().upper()
+            self._by_amount.setdefault((invoice.amount_cents, currency), []).append(invoice)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _lookup_reference(self, reference: str) -> list[OpenInvoice]:
+        whole = normalize_reference(reference)
+        if whole in self._by_number:
+            return self._by_number[whole]
+        for token in _TOKEN_SPLIT.split(reference):
+            invoices = self._by_number.get(normalize_reference(token))
+            if invoices:
+                return invoices
+        return []
+
+    def match(self, lines: Iterable[StatementLine]) -> list[MatchProposal]:
+        """Propose at most one statement line per invoice.
+
+        When two lines claim the same invoice, the higher-confidence claim
+        wins and the other is downgraded to `unmatched` (earlier line wins
+        ties).
+        """
+
+        proposals: list[MatchProposal] = []
+        claims: dict[str, MatchProposal] = {}
+
+        for line in lines:
+            proposal = self._propose(line)
+            invoice_id = proposal.invoice_id
+            if invoice_id is not None:
+                current = claims.get(invoice_id)
+                if current is not None and current.confidence >= proposal.confidence:
+                    proposal = MatchProposal(line=line, match_type="unmatched",
+                                             candidate_invoice_ids=[invoice_id])
+                else:
+                    if current is not None:
+                        current.candidate_invoice_ids = [invoice_id]
+                        current.match_type = "unmatched"
+                        current.invoice_id = None
+                        current.invoice_number = None
+                    claims[invoice_id] = proposal
+            proposals.append(proposal)
+        return proposals
+
+    def _propose(self, line: StatementLine) -> MatchProposal:
+        named = self._lookup_reference(line.reference) if line.reference else []
+        if named:
+            same_amount = [
+                invoice
+                for invoice in named
+                if invoice.amount_cents == line.amount_cents
+                and (invoice.currency or "USD").strip().upper() == line.currency
+            ]
+            if len(same_amount) == 1:
+                invoice = same_amount[0]
+                return MatchProposal(line=line, match_type="reference_and_amount",
+                                     invoice_id=invoice.id, invoice_number=invoice.invoice_number)
+            # Wrong amount, or several invoices fit: surface them but never auto-post.
+            candidates = same_amount or named
+            return MatchProposal(line=line, match_type="reference_only",
+                                 candidate_invoice_ids=[invoice.id for invoice in candidates[:10]])
+
+        candidates = self._by_amount.get((line.amount_cents, line.currency), [])
+        if len(candidates) == 1:
+            return MatchProposal(line=line, match_type="amount_unique",
+                                 invoice_id=candidates[0].id,
+                                 invoice_number=candidates[0].invoice_number)
+        if candidates:
+            return MatchProposal(line=line, match_type="amount_ambiguous",
+                                 candidate_invoice_ids=[candidate.id for candidate in candidates[:10]])
+        return MatchProposal(line=line, match_type="unmatched")
@@ -4,7 +4,7 @@ This package turns the agent specification in AGENTS.md into concrete modules:
 - webhook handlers (Stripe/Gumroad)
 - repository (DB interface)
 - notifications (Slack/email)
-- scheduled jobs (summaries/alerts) – TODO
+- scheduled jobs (summaries/alerts) and their scheduler
 
 Business logic is intentionally minimal and marked with TODOs.
 """
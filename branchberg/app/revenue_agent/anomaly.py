@@ -0,0 +1,219 @@
+"""Streaming anomaly detection for revenue alerts.
+
+Each (entity, provider) series keeps a row in `revenue_series_stats`: the
+open time bucket (event count and amount) and an EWMA mean/variance of the
+closed buckets. A run
+1. folds events recorded since its watermark into their series' open bucket
+2. closes every bucket that has ended, comparing it with the baseline before
+   folding it in
+
+Work per event and per closed bucket is constant, so a run costs
+O(new events + series) no matter how much history exists.
+
+Buckets are keyed by ingest time (`processed_at`): the detector watches the
+feed as operators see it, so a large CSV backfill shows up as a volume spike.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from branchberg.app.database import RevenueEvent, RevenueSeriesStats
+from branchberg.app.revenue_agent.notifications.base import AlertMessage
+from branchberg.app.revenue_agent.repository import (
+    advance_watermark,
+    get_watermark,
+    iter_events_after,
+    record_alert,
+)
+
+WATERMARK_NAME = "anomaly_detector"
+UNASSIGNED_ENTITY = "unassigned"
+
+
+@dataclass(frozen=True)
+class AnomalySettings:
+    bucket_seconds: int = 3600
+    alpha: float = 0.1  # EWMA weight of the newest bucket
+    z_threshold: float = 4.0
+    min_samples: int = 24  # closed buckets before a series may alert
+    min_mean_for_drop: float = 5.0  # only flag drops on series that are normally busy
+    max_gap_buckets: int = 24 * 7  # idle buckets replayed after a long gap
+    min_count_std: float = 1.0
+    min_amount_std_cents: float = 100.0
+    settle_seconds: int = 60  # buckets close this long after they end, for stragglers
+
+
+def ewma_update(mean: float, var: float, value: float, alpha: float) -> tuple[float, float]:
+    """Exponentially weighted mean/variance update (West/Finch form)."""
+    diff = value - mean
+    increment = alpha * diff
+    return mean + increment, (1 - alpha) * (var + diff * increment)
+
+
+def _bucket_floor(timestamp: datetime, bucket_seconds: int) -> datetime:
+    epoch = datetime(1970, 1, 1)
+    seconds = int((timestamp - epoch).total_seconds())
+    return epoch + timedelta(seconds=seconds - seconds % bucket_seconds)
+
+
+class AnomalyDetector:
+    def __init__(self, settings: Optional[AnomalySettings] = None):
+        self.settings = settings or AnomalySettings()
+
+    def run(self, db: Session, *, now: Optional[datetime] = None) -> list[AlertMessage]:
+        """Fold new events, close ended buckets, persist state and alerts."""
+
+        cutoff = (now or datetime.utcnow()) - timedelta(seconds=self.settings.settle_seconds)
+        watermark = get_watermark(db, WATERMARK_NAME)
+        series = {(stats.entity, stats.provider): stats for stats in db.query(RevenueSeriesStats)}
+        alerts: list[AlertMessage] = []
+        bucket = timedelta(seconds=self.settings.bucket_seconds)
+
+        last_row = None
+        rows = iter_events_after(
+            db,
+            watermark,
+            columns=(
+                RevenueEvent.id,
+                RevenueEvent.seq,
+                RevenueEvent.txid,
+                RevenueEvent.processed_at,
+                RevenueEvent.entity,
+                RevenueEvent.provider,
+                RevenueEvent.amount_cents,
+            ),
+        )
+        for row in rows:
+            key = (row.entity or UNASSIGNED_ENTITY, row.provider)
+            stats = series.get(key)
+            if stats is None:
+                stats = RevenueSeriesStats(
+                    entity=key[0],
+                    provider=key[1],
+                    bucket_start=_bucket_floor(row.processed_at, self.settings.bucket_seconds),
+                    bucket_count=0,
+                    bucket_amount_cents=0,
+                    samples=0,
+                    count_mean=0.0,
+                    count_var=0.0,
+                    amount_mean=0.0,
+                    amount_var=0.0,
+                )
+                db.add(stats)
+                series[key] = stats
+            elif row.processed_at >= stats.bucket_start + bucket:
+                alerts.extend(self._close_buckets(stats, until=row.processed_at))
+            stats.bucket_count += 1
+            stats.bucket_amount_cents += row.amount_cents or 0
+            last_row = row
+
+        for stats in series.values():
+            alerts.extend(self._close_buckets(stats, until=cutoff))
+            stats.updated_at = datetime.utcnow()
+
+        for alert in alerts:
+            record_alert(db, alert)
+        if last_row is not None:
+            advance_watermark(
+                db,
+                WATERMARK_NAME,
+                watermark,
+                processed_at=last_row.processed_at,
+                event_id=last_row.id,
+                seq=last_row.seq,
+                txid=last_row.txid,
+            )
+        db.commit()
+        return alerts
+
+    def _close_buckets(self, stats: RevenueSeriesStats, *, until: datetime) -> list[AlertMessage]:
+        """Close every bucket of `stats` that ended at or before `until`."""
+
+        settings = self.settings
+        bucket = timedelta(seconds=settings.bucket_seconds)
+        ended = int((until - stats.bucket_start) / bucket)
+        if ended <= 0:
+            return []
+
+        alerts = []
+        alert = self._evaluate(stats, stats.bucket_start, stats.bucket_count, stats.bucket_amount_cents)
+        if alert is not None:
+            alerts.append(alert)
+        self._fold(stats, stats.bucket_count, stats.bucket_amount_cents)
+
+        # Idle buckets count as zeros; after a very long gap only the most
+        # recent ones matter to the baseline anyway.
+        idle = min(ended - 1, settings.max_gap_buckets)
+        for index in range(idle):
+            if index == 0:
+                alert = self._evaluate(stats, stats.bucket_start + bucket, 0, 0)
+                if alert is not None:
+                    alerts.append(alert)
+            self._fold(stats, 0, 0)
+
+        stats.bucket_start += bucket * ended
+        stats.bucket_count = 0
+        stats.bucket_amount_cents = 0
+        return alerts
+
+    def _fold(self, stats: RevenueSeriesStats, count: int, amount_cents: int) -> None:
+        alpha = self.settings.alpha
+        if stats.samples == 0:
+            stats.count_mean, stats.count_var = float(count), 0.0
+            stats.amount_mean, stats.amount_var = float(amount_cents), 0.0
+        else:
+            stats.count_mean, stats.count_var = ewma_update(stats.count_mean, stats.count_var, count, alpha)
+            stats.amount_mean, stats.amount_var = ewma_update(
+                stats.amount_mean, stats.amount_var, amount_cents, alpha
+            )
+        stats.samples += 1
+
+    def _evaluate(
+        self, stats: RevenueSeriesStats, bucket_start: datetime, count: int, amount_cents: int
+    ) -> Optional[AlertMessage]:
+        settings = self.settings
+        if stats.samples < settings.min_samples:
+            return None
+
+        count_std = max(math.sqrt(stats.count_var), settings.min_count_std)
+        amount_std = max(math.sqrt(stats.amount_var), settings.min_amount_std_cents)
+        count_z = (count - stats.count_mean) / count_std
+        amount_z = (amount_cents - stats.amount_mean) / amount_std
+
+        candidates = [("volume", count_z), ("amount", amount_z)]
+        metric, z_score = max(candidates, key=lambda candidate: abs(candidate[1]))
+        if abs(z_score) < settings.z_threshold:
+            return None
+        if z_score < 0 and stats.count_mean < settings.min_mean_for_drop:
+            return None
+
+        direction = "spike" if z_score > 0 else "drop"
+        severity = "critical" if abs(z_score) >= 2 * settings.z_threshold else "warning"
+        return AlertMessage(
+            alert_type="anomaly",
+            severity=severity,
+            key=f"{stats.entity}:{stats.provider}",
+            message=(
+                f"{stats.entity} / {stats.provider}: {metric} {direction} "
+                f"({count} events, {amount_cents / 100:,.2f} in bucket starting "
+                f"{bucket_start.isoformat()}; z={z_score:.1f})"
+            ),
+            metadata={
+                "entity": stats.entity,
+                "provider": stats.provider,
+                "metric": metric,
+                "direction": direction,
+                "z_score": round(z_score, 2),
+                "bucket_start": bucket_start.isoformat(),
+                "bucket_count": count,
+                "bucket_amount_cents": amount_cents,
+                "baseline_count_mean": round(stats.count_mean, 3),
+                "baseline_amount_mean_cents": round(stats.amount_mean, 1),
+            },
+        )
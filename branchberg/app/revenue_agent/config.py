@@ -24,6 +24,11 @@ class AgentSettings:
     stripe_webhook_secret: str | None
     gumroad_webhook_secret: str | None
     slack_webhook_url: str | None
+    alert_rules: str | None = None  # JSON list, see revenue_agent/rules.py
+    scheduler_enabled: bool = False
+    summary_cron: str = "*/15 * * * *"
+    alerts_cron: str = "2 * * * *"
+    scheduler_jitter_seconds: float = 30.0
 
     @staticmethod
     def from_env() -> "AgentSettings":
@@ -32,4 +37,9 @@ class AgentSettings:
             stripe_webhook_secret=(os.getenv("STRIPE_WEBHOOK_SECRET") or "").strip() or None,
             gumroad_webhook_secret=(os.getenv("GUMROAD_WEBHOOK_SECRET") or "").strip() or None,
             slack_webhook_url=(os.getenv("SLACK_WEBHOOK_URL") or "").strip() or None,
+            alert_rules=(os.getenv("REVENUE_ALERT_RULES") or "").strip() or None,
+            scheduler_enabled=_env_bool("SCHEDULER_ENABLED", False),
+            summary_cron=(os.getenv("SCHEDULER_SUMMARY_CRON") or "").strip() or "*/15 * * * *",
+            alerts_cron=(os.getenv("SCHEDULER_ALERTS_CRON") or "").strip() or "2 * * * *",
+            scheduler_jitter_seconds=float(os.getenv("SCHEDULER_JITTER_SECONDS") or 30),
         )
@@ -16,6 +16,7 @@ class AlertMessage:
     severity: str  # info|warning|critical
     message: str
     metadata: dict[str, Any] | None = None
+    key: str | None = None  # dedupe key for coalescing, e.g. event_id or entity
 
 
 class Notifier(Protocol):
@@ -0,0 +1,199 @@
+"""Alert coalescing in front of a `Notifier`.
+
+A burst of identical alerts (e.g. `duplicate` alerts from webhook retries)
+must not turn into one Slack message per occurrence. `CoalescingNotifier`
+groups alerts by `(alert_type, severity, key)` within a time window:
+- the first alert of a group is forwarded immediately
+- later ones are counted, keeping a few example messages
+- when the window closes, a single digest alert reports the rest
+
+Everything forwarded to the wrapped notifier passes through a token bucket,
+so volume per channel stays bounded however bursty ingest is. Wrap each
+channel's notifier separately to give each its own limit. Groups waiting on
+the rate limit keep accumulating instead of being dropped.
+
+Windows are closed on the next `notify_alert` call and by `flush()`. The app
+runs `start()` from its lifespan, which flushes on a short interval whether
+or not the job scheduler is enabled, and `stop()` on shutdown, which sends
+every open digest so none is lost with the process.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+from .base import AlertMessage, Notifier
+
+GroupKey = tuple[str, str, str]
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    def __init__(self, *, rate_per_second: float, capacity: float, clock: Callable[[], float]):
+        self._rate = rate_per_second
+        self._capacity = capacity
+        self._tokens = capacity
+        self._clock = clock
+        self._updated_at = clock()
+
+    def take(self) -> bool:
+        now = self._clock()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated_at) * self._rate)
+        self._updated_at = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+
+@dataclass
+class _Group:
+    opened_at: float
+    alert: AlertMessage
+    suppressed: int = 0
+    examples: list[str] = field(default_factory=list)
+
+
+class CoalescingNotifier:
+    def __init__(
+        self,
+        inner: Notifier,
+        *,
+        window_seconds: float = 60.0,
+        max_examples: int = 3,
+        rate_per_minute: float = 20.0,
+        burst: int = 5,
+        max_groups: int = 500,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.inner = inner
+        self._window = window_seconds
+        self._max_examples = max_examples
+        self._max_groups = max_groups
+        self._clock = clock
+        self._bucket = TokenBucket(rate_per_second=rate_per_minute / 60.0, capacity=burst, clock=clock)
+        self._groups: dict[GroupKey, _Group] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self.forwarded = 0
+        self.coalesced = 0
+
+    def notify_alert(self, alert: AlertMessage) -> None:
+        with self._lock:
+            outgoing = self._due_digests(force=False)
+            group_key: GroupKey = (alert.alert_type, alert.severity, alert.key or "")
+            if group_key not in self._groups and len(self._groups) >= self._max_groups:
+                # Too many distinct keys: fold the long tail into one group per type.
+                group_key = (alert.alert_type, alert.severity, "*")
+            group = self._groups.get(group_key)
+            if group is None:
+                group = _Group(opened_at=self._clock(), alert=alert)
+                self._groups[group_key] = group
+                if self._bucket.take():
+                    outgoing.append(alert)
+                else:
+                    self._suppress(group, alert)
+            else:
+                self._suppress(group, alert)
+        self._forward(outgoing)
+
+    def notify_summary(self, *, text: str, metadata: Optional[dict[str, Any]] = None) -> None:
+        # Summaries are scheduled and low-volume; they bypass coalescing.
+        self.inner.notify_summary(text=text, metadata=metadata)
+
+    def flush(self, *, force: bool = False) -> int:
+        """Emit digests for closed windows (all open groups if `force`)."""
+        with self._lock:
+            outgoing = self._due_digests(force=force)
+        self._forward(outgoing)
+        return len(outgoing)
+
+    def start(self, *, interval_seconds: float = 5.0) -> asyncio.Task:
+        """Flush closed windows periodically on the running event loop (call from `lifespan`)."""
+
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._flush_forever(interval_seconds), name="alert-digests")
+        return self._task
+
+    async def stop(self) -> None:
+        """Stop the periodic flush and send every open digest."""
+
+        if self._task is not None and self._stopping is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+        await asyncio.to_thread(self.flush, force=True)
+
+    async def _flush_forever(self, interval_seconds: float) -> None:
+        assert self._stopping is not None
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            else:
+                return
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception:  # noqa: BLE001 - keep the loop alive
+                logger.exception("alert digest flush failed")
+
+    @property
+    def pending_groups(self) -> int:
+        with self._lock:
+            return len(self._groups)
+
+    def _suppress(self, group: _Group, alert: AlertMessage) -> None:
+        group.suppressed += 1
+        self.coalesced += 1
+        if len(group.examples) < self._max_examples:
+            group.examples.append(alert.message)
+
+    def _due_digests(self, *, force: bool) -> list[AlertMessage]:
+        now = self._clock()
+        digests = []
+        for group_key, group in list(self._groups.items()):
+            if not force and now - group.opened_at < self._window:
+                continue
+            if group.suppressed == 0:
+                del self._groups[group_key]
+                continue
+            if not force and not self._bucket.take():
+                # Rate limited: keep counting into this group until a token frees up.
+                continue
+            del self._groups[group_key]
+            digests.append(self._digest(group_key, group, now))
+        return digests
+
+    def _digest(self, group_key: GroupKey, group: _Group, now: float) -> AlertMessage:
+        alert_type, severity, key = group_key
+        label = f" ({key})" if key else ""
+        examples = "; ".join(group.examples)
+        return AlertMessage(
+            alert_type=alert_type,
+            severity=severity,
+            key=key or None,
+            message=(
+                f"{group.suppressed} more {alert_type} alerts{label} "
+                f"in the last {int(now - group.opened_at)}s. e.g. {examples}"
+            ),
+            metadata={
+                "coalesced": True,
+                "count": group.suppressed,
+                "examples": list(group.examples),
+                "window_seconds": self._window,
+            },
+        )
+
+    def _forward(self, alerts: list[AlertMessage]) -> None:
+        with self._lock:
+            self.forwarded += len(alerts)
+        for alert in alerts:
+            self.inner.notify_alert(alert)
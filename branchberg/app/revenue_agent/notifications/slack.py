@@ -1,20 +1,67 @@
 """Slack notifier.
 
 Uses `SLACK_WEBHOOK_URL` if configured; otherwise behaves as a no-op.
+
+Messages are queued and delivered by a background thread over a keep-alive
+`requests.Session`, so callers on a request path never wait on Slack. When
+the queue is full the overflow policy decides what to give up:
+- `drop_oldest` (default): evict the oldest queued message
+- `drop_newest`: discard the incoming message
+- `spill`: append the incoming message to a JSON-lines file for replay
 """
 
 from __future__ import annotations
 
-from typing import Any, Optional
-
-import requests
+import json
+import logging
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Optional
 
 from .base import AlertMessage
 
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = {"drop_oldest", "drop_newest", "spill"}
+
+_STOP = object()
+
 
 class SlackWebhookNotifier:
-    def __init__(self, webhook_url: str | None):
+    def __init__(
+        self,
+        webhook_url: str | None,
+        *,
+        max_queue: int = 1000,
+        max_retries: int = 3,
+        backoff_seconds: float = 0.5,
+        max_backoff_seconds: float = 30.0,
+        timeout: float = 10,
+        overflow: str = "drop_oldest",
+        spill_path: str | None = None,
+        session: requests.Session | None = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {sorted(OVERFLOW_POLICIES)}")
         self._webhook_url = (webhook_url or "").strip() or None
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._max_retries = max_retries
+        self._backoff = backoff_seconds
+        self._max_backoff = max_backoff_seconds
+        self._timeout = timeout
+        self._overflow = overflow
+        self._spill_path = spill_path
+        self._session = session
+        self._sleep = sleep
+        self._worker: threading.Thread | None = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._counters = {"sent": 0, "failed": 0, "dropped": 0, "spilled": 0, "retried": 0}
 
     def notify_alert(self, alert: AlertMessage) -> None:
         if not self._webhook_url:
@@ -24,18 +71,139 @@ class SlackWebhookNotifier:
         payload = {
             "text": f"[{alert.severity.upper()}] {alert.alert_type}: {alert.message}",
         }
-        try:
-            requests.post(self._webhook_url, json=payload, timeout=10)
-        except Exception:
-            # TODO: add structured logging; do not raise to avoid breaking ingest.
-            return
+        self._enqueue(payload)
 
     def notify_summary(self, *, text: str, metadata: Optional[dict[str, Any]] = None) -> None:
         if not self._webhook_url:
             return
 
         payload = {"text": text}
+        self._enqueue(payload)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """Delivery counters plus the current queue depth."""
+        with self._lock:
+            counters = dict(self._counters)
+        counters["queued"] = self._queue.qsize()
+        return counters
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait until every queued message was delivered or given up on."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout: float | None = 5.0) -> None:
+        """Drain the queue and stop the delivery thread, within `timeout` overall.
+
+        Messages still queued when the time is up are not delivered.
+        """
+        worker = self._worker
+        if worker is None:
+            return
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self.flush(timeout)
+        self._stopping.set()
         try:
-            requests.post(self._webhook_url, json=payload, timeout=10)
-        except Exception:
+            self._queue.put_nowait(_STOP)  # wakes the worker if it waits on an empty queue
+        except queue.Full:
+            pass  # the worker is busy and checks `_stopping` before the next message
+        worker.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        undelivered = self._queue.qsize()
+        if undelivered:
+            logger.warning("slack notifier closed with %s undelivered messages", undelivered)
+        with self._lock:
+            self._worker = None
+        if self._session is not None:
+            self._session.close()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                if self._session is None:
+                    import requests  # deferred: keeps it off the API's cold start
+
+                    self._session = requests.Session()
+                self._stopping = threading.Event()
+                self._worker = threading.Thread(
+                    target=self._run, args=(self._stopping,), name="slack-notifier", daemon=True
+                )
+                self._worker.start()
+
+    def _enqueue(self, payload: dict[str, Any]) -> None:
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(payload)
             return
+        except queue.Full:
+            pass
+
+        if self._overflow == "spill" and self._spill(payload):
+            return
+        if self._overflow == "drop_oldest":
+            try:
+                self._queue.get_nowait()
+                self._queue.task_done()
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(payload)
+            except queue.Full:
+                pass
+        self._count("dropped")
+
+    def _spill(self, payload: dict[str, Any]) -> bool:
+        if not self._spill_path:
+            return False
+        try:
+            with self._lock, open(self._spill_path, "a", encoding="utf-8") as handle:
+                handle.write(json.dumps(payload) + "\n")
+                self._counters["spilled"] += 1
+            return True
+        except OSError:
+            logger.warning("slack notifier could not spill to %s", self._spill_path)
+            return False
+
+    def _run(self, stopping: threading.Event) -> None:
+        while not stopping.is_set():
+            payload = self._queue.get()
+            try:
+                if stopping.is_set():
+                    return
+                if payload is not _STOP:  # a wake-up left over from an earlier worker
+                    self._deliver(payload)
+            finally:
+                self._queue.task_done()
+
+    def _deliver(self, payload: dict[str, Any]) -> None:
+        for attempt in range(self._max_retries + 1):
+            delay = min(self._backoff * (2 ** attempt), self._max_backoff)
+            try:
+                response = self._session.post(self._webhook_url, json=payload, timeout=self._timeout)
+                if response.status_code < 400:
+                    self._count("sent")
+                    return
+                if response.status_code != 429 and response.status_code < 500:
+                    # Client errors (bad URL, revoked webhook) will not fix themselves.
+                    break
+                retry_after = response.headers.get("Retry-After")
+                if retry_after and retry_after.isdigit():
+                    delay = min(float(retry_after), self._max_backoff)
+            except Exception as exc:  # never let a bad delivery kill the worker
+                logger.debug("slack delivery attempt %s failed: %s", attempt + 1, exc)
+            if attempt < self._max_retries:
+                self._count("retried")
+                self._sleep(delay)
+        self._count("failed")
@@ -3,21 +3,49 @@
 This wraps SQLAlchemy operations with:
 - idempotent insert semantics (dedupe via event_id)
 - a narrow interface used by webhook handlers and jobs
-
-TODO: expand with summaries/alerts tables once models exist.
+- high-water marks for incremental jobs over `revenue_events`
+- an outbox row per new event, committed with it (see `branchberg.app.outbox`)
+- threshold rules run over every new event once its transaction commits,
+  whichever code path inserted it; their hits are written to
+  `revenue_alerts` in batches by `PENDING_ALERTS`, off the request path
 """
 
 from __future__ import annotations
 
+import asyncio
+import logging
+import threading
 import uuid
+from collections import deque
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Optional
+from typing import TYPE_CHECKING, Any, Iterator, Optional
 
+from sqlalchemy import event, func
+from sqlalchemy.engine import Engine
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from branchberg.app.database import RevenueEvent
+from branchberg.app import tracing
+from branchberg.app.database import (
+    BEFORE_ALL,
+    JobWatermark,
+    RevenueAlert,
+    RevenueEvent,
+    committed_after,
+)
+from branchberg.app.outbox import enqueue_revenue_event
+from branchberg.app.revenue_agent.notifications.base import AlertMessage
+
+if TYPE_CHECKING:
+    from branchberg.app.revenue_agent.rules import RulesEngine, ThresholdRule
+
+# Threshold rules evaluated inline on every newly created event; installed by
+# the app at startup (see `set_rules_engine`).
+_RULES_ENGINE: Optional["RulesEngine"] = None
+_PENDING_RULE_EVENTS = "pending_rule_events"  # Session.info key
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass(frozen=True)
@@ -42,6 +70,14 @@ def insert_revenue_event_idempotent(db: Session, payload: RevenueEventIngest) ->
     TODO: also record dedupe collisions in `revenue_alerts` as `duplicate`.
     """
 
+    with tracing.span("repository.insert_revenue_event", provider=payload.provider) as span:
+        record, created = _insert_revenue_event(db, payload)
+        if span is not None:
+            span.set(created=created)
+    return record, created
+
+
+def _insert_revenue_event(db: Session, payload: RevenueEventIngest) -> tuple[RevenueEvent, bool]:
     now = datetime.utcnow()
     record = RevenueEvent(
         id=str(uuid.uuid4()),
@@ -59,15 +95,249 @@ def insert_revenue_event_idempotent(db: Session, payload: RevenueEventIngest) ->
     )
 
     db.add(record)
+    enqueue_revenue_event(db, record)
     try:
-        db.commit()
-        db.refresh(record)
-        return record, True
+        with tracing.span("repository.commit"):
+            db.commit()
     except IntegrityError:
-        db.rollback()
-        existing = db.query(RevenueEvent).filter(RevenueEvent.event_id == payload.event_id).first()
+        with tracing.span("repository.rollback"):
+            db.rollback()
+        with tracing.span("repository.requery"):
+            existing = db.query(RevenueEvent).filter(RevenueEvent.event_id == payload.event_id).first()
         # Existing should be present if the unique constraint triggered.
         if existing is None:
             # Extremely rare edge case; surface as a generic error for now.
             raise
         return existing, False
+
+    with tracing.span("repository.refresh"):
+        db.refresh(record)
+    return record, True
+
+
+def set_rules_engine(engine: Optional["RulesEngine"]) -> None:
+    """Install (or clear, with None) the inline threshold rules engine."""
+
+    global _RULES_ENGINE
+    _RULES_ENGINE = engine
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_new_events(session: Session, flush_context) -> None:
+    engine = _RULES_ENGINE
+    if not engine:
+        return
+    facts = [engine.facts(obj) for obj in session.new if isinstance(obj, RevenueEvent)]
+    if facts:
+        session.info.setdefault(_PENDING_RULE_EVENTS, []).extend(facts)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_new_events(session: Session) -> None:
+    session.info.pop(_PENDING_RULE_EVENTS, None)
+
+
+@event.listens_for(Session, "after_commit")
+def _evaluate_committed_events(session: Session) -> None:
+    facts = session.info.pop(_PENDING_RULE_EVENTS, None)
+    engine = _RULES_ENGINE
+    if facts and engine:
+        with tracing.span("repository.rules"):
+            _evaluate_rules(session.get_bind(), engine, facts)
+
+
+def _evaluate_rules(bind: Engine, engine: "RulesEngine", facts: list[dict[str, Any]]) -> None:
+    # The committing session cannot emit SQL from here. The seed query only
+    # runs for a rule/entity/currency/day this process has not seen yet.
+    with Session(bind=bind) as db:
+        engine.seed_daily_totals(facts, lambda *key: committed_daily_total(db, *key))
+    alerts = [alert for event_facts in facts for alert in engine.evaluate(**event_facts)]
+    if alerts:
+        PENDING_ALERTS.add(bind, alerts)
+
+
+class PendingAlerts:
+    """Threshold hits waiting to be written to `revenue_alerts`.
+
+    Rules run in `after_commit` on the request path, where writing a hit
+    would cost a second transaction. Hits are queued here instead and
+    written in batches by the loop `start()` runs from the app lifespan;
+    `stop()` writes whatever is left. The queue is bounded; past
+    `max_pending` the oldest hits are dropped (they were already notified).
+    """
+
+    def __init__(self, *, max_pending: int = 10_000):
+        self._pending: deque[tuple[Engine, AlertMessage]] = deque(maxlen=max_pending)
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def add(self, bind: Engine, alerts: list[AlertMessage]) -> None:
+        with self._lock:
+            if len(self._pending) + len(alerts) > (self._pending.maxlen or 0):
+                logger.warning("pending threshold alerts full; dropping the oldest")
+            self._pending.extend((bind, alert) for alert in alerts)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pending.clear()
+
+    def write(self) -> int:
+        """Write every queued hit, one transaction per database; return the count."""
+
+        with self._lock:
+            batch = list(self._pending)
+            self._pending.clear()
+        by_bind: dict[Engine, list[AlertMessage]] = {}
+        for bind, alert in batch:
+            by_bind.setdefault(bind, []).append(alert)
+        written = 0
+        for bind, alerts in by_bind.items():
+            try:
+                with Session(bind=bind) as db:
+                    for alert in alerts:
+                        record_alert(db, alert)
+                    db.commit()
+            except Exception:
+                with self._lock:
+                    self._pending.extendleft((bind, alert) for alert in reversed(alerts))
+                raise
+            written += len(alerts)
+        return written
+
+    def start(self, *, interval_seconds: float = 1.0) -> asyncio.Task:
+        """Write queued hits periodically on the running event loop (call from `lifespan`)."""
+
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(
+            self._write_forever(interval_seconds), name="threshold-alerts"
+        )
+        return self._task
+
+    async def stop(self) -> None:
+        if self._task is not None and self._stopping is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+        await asyncio.to_thread(self.write)
+
+    async def _write_forever(self, interval_seconds: float) -> None:
+        assert self._stopping is not None
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            else:
+                return
+            if not len(self):
+                continue
+            try:
+                await asyncio.to_thread(self.write)
+            except Exception:  # noqa: BLE001 - keep the loop alive
+                logger.exception("writing threshold alerts failed")
+
+
+PENDING_ALERTS = PendingAlerts()
+
+
+def committed_daily_total(
+    db: Session,
+    rule: "ThresholdRule",
+    entity: Optional[str],
+    currency: str,
+    start: datetime,
+    end: datetime,
+) -> int:
+    """Sum of the events a daily-total rule counts for `entity` and `currency` in [start, end).
+
+    Filters match `ix_revenue_events_entity_currency_created_at`, so this is
+    an index range scan. Currencies are compared as stored, upper- or
+    lower-case (Stripe sends `usd`), rather than through `upper()`, which
+    would bypass the index.
+    """
+
+    query = db.query(func.coalesce(func.sum(RevenueEvent.amount_cents), 0)).filter(
+        RevenueEvent.entity == entity if entity is not None else RevenueEvent.entity.is_(None),
+        RevenueEvent.currency.in_([currency, currency.lower()]),
+        RevenueEvent.created_at >= start,
+        RevenueEvent.created_at < end,
+    )
+    if rule.provider is not None:
+        query = query.filter(RevenueEvent.provider == rule.provider)
+    return int(query.scalar())
+
+
+def get_watermark(db: Session, name: str) -> Optional[JobWatermark]:
+    """Return the named job watermark, locking it for update where supported."""
+
+    return db.query(JobWatermark).filter(JobWatermark.name == name).with_for_update().first()
+
+
+def iter_events_after(
+    db: Session,
+    watermark: Optional[JobWatermark],
+    *,
+    columns: tuple = (),
+    batch_size: int = 5000,
+    limit: Optional[int] = None,
+) -> Iterator[Any]:
+    """Yield events recorded after `watermark`, in commit (`txid`, `seq`) order.
+
+    Nothing can later commit below a position already seen, so the last row
+    yielded is the next watermark with no settle delay. `columns` narrows
+    the SELECT; it must include `RevenueEvent.txid`, `RevenueEvent.seq`,
+    `RevenueEvent.processed_at` and `RevenueEvent.id`.
+    """
+
+    position = BEFORE_ALL
+    if watermark is not None and watermark.seq is not None:
+        position = (watermark.txid or 0, watermark.seq)
+    query = db.query(*columns) if columns else db.query(RevenueEvent)
+    query = committed_after(query, RevenueEvent.txid, RevenueEvent.seq, position)
+    if limit is not None:
+        query = query.limit(limit)
+    yield from query.yield_per(batch_size)
+
+
+def advance_watermark(
+    db: Session,
+    name: str,
+    watermark: Optional[JobWatermark],
+    *,
+    processed_at: datetime,
+    event_id: Optional[str],
+    seq: Optional[int] = None,
+    txid: Optional[int] = None,
+) -> JobWatermark:
+    """Move (or create) a watermark; the caller commits with its own writes."""
+
+    if watermark is None:
+        watermark = JobWatermark(name=name)
+        db.add(watermark)
+    watermark.processed_at = processed_at
+    watermark.event_id = event_id
+    watermark.seq = seq
+    watermark.txid = txid
+    watermark.updated_at = datetime.utcnow()
+    return watermark
+
+
+def record_alert(db: Session, alert: AlertMessage) -> RevenueAlert:
+    """Stage a `revenue_alerts` row; the caller commits with its own writes."""
+
+    record = RevenueAlert(
+        id=str(uuid.uuid4()),
+        alert_type=alert.alert_type,
+        severity=alert.severity,
+        key=alert.key,
+        message=alert.message,
+        record_metadata=alert.metadata or {},
+        created_at=datetime.utcnow(),
+    )
+    db.add(record)
+    return record
@@ -0,0 +1,262 @@
+"""Inline threshold rules evaluated at ingest time.
+
+Rules come from `REVENUE_ALERT_RULES`, a JSON list such as:
+
+    [
+      {"name": "big_sale", "kind": "single", "threshold": 5000},
+      {"name": "aplus_daily", "kind": "daily_total", "threshold": 50000,
+       "entity": "A+ Enterprise LLC", "severity": "critical"}
+    ]
+
+- `single`: fires when one event's amount reaches the threshold
+- `daily_total`: fires once per Central-time day when the running total for
+  the rule (per entity and currency) crosses the threshold
+
+Thresholds are in dollars (`threshold`) or cents (`threshold_cents`).
+Optional `entity`, `provider` and `currency` fields narrow a rule.
+
+Rules run once a transaction that created revenue events commits, whichever
+path created them (webhooks, manual entries, CSV imports, PO payments; see
+`branchberg.app.revenue_agent.repository`). Hits are notified right away and
+written to `revenue_alerts` in batches, off the request path.
+
+Rules are compiled once into a dispatch table keyed by provider, so an event
+only touches rules that can match it; evaluation is a few dict lookups and
+integer compares. Daily totals live in process memory. The first time a
+process sees a rule/entity/currency/day it seeds the total from what is
+already in `revenue_events` (one indexed range scan), so a deploy does not
+reset it; replicas that ingest the same key concurrently can still each miss
+the other's events until their next restart, which suits "heads up" alerts,
+not accounting (that is what `revenue_summaries` is for).
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Optional
+
+from branchberg.app.revenue_agent.notifications.base import AlertMessage, Notifier
+from branchberg.app.revenue_agent.summaries import business_day, business_day_bounds
+
+RULE_KINDS = {"single", "daily_total"}
+SEVERITIES = {"info", "warning", "critical"}
+
+
+class RuleConfigError(ValueError):
+    """Raised when `REVENUE_ALERT_RULES` cannot be parsed."""
+
+
+@dataclass(frozen=True)
+class ThresholdRule:
+    name: str
+    kind: str
+    threshold_cents: int
+    severity: str = "warning"
+    entity: Optional[str] = None
+    provider: Optional[str] = None
+    currency: Optional[str] = None
+
+
+def parse_rules(raw: Optional[str]) -> list[ThresholdRule]:
+    if not raw or not raw.strip():
+        return []
+    try:
+        items = json.loads(raw)
+    except json.JSONDecodeError as exc:
+        raise RuleConfigError(f"REVENUE_ALERT_RULES is not valid JSON: {exc}") from exc
+    if not isinstance(items, list):
+        raise RuleConfigError("REVENUE_ALERT_RULES must be a JSON list")
+
+    rules = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise RuleConfigError(f"rule #{index} must be an object")
+        name = str(item.get("name") or f"rule_{index}")
+        kind = str(item.get("kind") or "single")
+        if kind not in RULE_KINDS:
+            raise RuleConfigError(f"rule {name}: kind must be one of {sorted(RULE_KINDS)}")
+        severity = str(item.get("severity") or "warning")
+        if severity not in SEVERITIES:
+            raise RuleConfigError(f"rule {name}: severity must be one of {sorted(SEVERITIES)}")
+        if "threshold_cents" in item:
+            threshold_cents = int(item["threshold_cents"])
+        elif "threshold" in item:
+            threshold_cents = int(round(float(item["threshold"]) * 100))
+        else:
+            raise RuleConfigError(f"rule {name}: threshold or threshold_cents is required")
+        currency = item.get("currency")
+        rules.append(
+            ThresholdRule(
+                name=name,
+                kind=kind,
+                threshold_cents=threshold_cents,
+                severity=severity,
+                entity=item.get("entity"),
+                provider=item.get("provider"),
+                currency=currency.upper() if currency else None,
+            )
+        )
+    return rules
+
+
+def _compile_matcher(rule: ThresholdRule) -> Callable[[Optional[str], str], bool]:
+    entity, currency = rule.entity, rule.currency
+    if entity is None and currency is None:
+        return lambda _entity, _currency: True
+    if currency is None:
+        return lambda event_entity, _currency: event_entity == entity
+    if entity is None:
+        return lambda _entity, event_currency: event_currency == currency
+    return lambda event_entity, event_currency: event_entity == entity and event_currency == currency
+
+
+class RulesEngine:
+    def __init__(self, rules: list[ThresholdRule], *, notifier: Optional[Notifier] = None):
+        self.rules = list(rules)
+        self.notifier = notifier
+        # provider (or None for "any provider") -> [(rule, matcher)]
+        self._by_provider: dict[Optional[str], list[tuple[ThresholdRule, Callable]]] = {}
+        for rule in self.rules:
+            self._by_provider.setdefault(rule.provider, []).append((rule, _compile_matcher(rule)))
+        self._wildcard = self._by_provider.get(None, [])
+        self._latest_day: Optional[date] = None
+        # (rule name, entity, currency, day) -> running total in cents
+        self._totals: dict[tuple[str, Optional[str], str, date], int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, raw: Optional[str], *, notifier: Optional[Notifier] = None) -> "RulesEngine":
+        return cls(parse_rules(raw), notifier=notifier)
+
+    def __bool__(self) -> bool:
+        return bool(self.rules)
+
+    @staticmethod
+    def facts(record: Any) -> dict[str, Any]:
+        """`evaluate` arguments for a `RevenueEvent` (day = its Central-time business day)."""
+        return {
+            "amount_cents": record.amount_cents,
+            "provider": record.provider,
+            "entity": record.entity,
+            "currency": (record.currency or "USD").upper(),
+            "day": business_day(record.created_at or datetime.utcnow()),
+            "event_id": record.event_id,
+        }
+
+    def evaluate_record(self, record: Any) -> list[AlertMessage]:
+        """Evaluate a stored `RevenueEvent`."""
+        return self.evaluate(**self.facts(record))
+
+    def seed_daily_totals(
+        self,
+        events: list[dict[str, Any]],
+        load: Callable[[ThresholdRule, Optional[str], str, datetime, datetime], int],
+    ) -> None:
+        """Start daily totals this process has not seen yet from the database.
+
+        `events` (`facts` dicts) have just committed and are about to be
+        evaluated. `load(rule, entity, currency, start, end)` returns the
+        committed sum of matching events in the naive UTC range [start, end),
+        which already includes `events`, so their share is taken back out.
+        """
+
+        pending: dict[tuple[str, Optional[str], str, date], tuple[ThresholdRule, int]] = {}
+        for facts in events:
+            candidates = self._by_provider.get(facts["provider"], ())
+            for rule, matches in itertools.chain(self._wildcard, candidates):
+                if rule.kind != "daily_total" or not matches(facts["entity"], facts["currency"]):
+                    continue
+                key = (rule.name, facts["entity"], facts["currency"], facts["day"])
+                if key in self._totals:
+                    continue
+                _, amount_cents = pending.get(key, (rule, 0))
+                pending[key] = (rule, amount_cents + facts["amount_cents"])
+
+        for (name, entity, currency, day), (rule, amount_cents) in pending.items():
+            start, end = business_day_bounds(day)
+            committed = load(rule, entity, currency, start, end)
+            with self._lock:
+                self._totals.setdefault((name, entity, currency, day), max(committed - amount_cents, 0))
+
+    def evaluate(
+        self,
+        *,
+        amount_cents: int,
+        provider: str,
+        entity: Optional[str],
+        currency: str,
+        day: date,
+        event_id: Optional[str] = None,
+    ) -> list[AlertMessage]:
+        """Run every applicable rule against one event; notify and return hits."""
+
+        candidates = self._by_provider.get(provider)
+        if not candidates and not self._wildcard:
+            return []
+
+        alerts = []
+        with self._lock:
+            if self._latest_day is None or day > self._latest_day:
+                self._latest_day = day
+                # Keep yesterday around for late arrivals; older days are done.
+                horizon = day - timedelta(days=1)
+                for key in [key for key in self._totals if key[3] < horizon]:
+                    del self._totals[key]
+            for rules in (self._wildcard, candidates or ()):
+                for rule, matches in rules:
+                    if not matches(entity, currency):
+                        continue
+                    if rule.kind == "single":
+                        if amount_cents >= rule.threshold_cents:
+                            alerts.append(self._alert(rule, amount_cents, entity, currency, day, event_id))
+                        continue
+                    key = (rule.name, entity, currency, day)
+                    before = self._totals.get(key, 0)
+                    after = before + amount_cents
+                    self._totals[key] = after
+                    if before < rule.threshold_cents <= after:
+                        alerts.append(self._alert(rule, after, entity, currency, day, event_id))
+
+        if self.notifier is not None:
+            for alert in alerts:
+                self.notifier.notify_alert(alert)
+        return alerts
+
+    @staticmethod
+    def _alert(
+        rule: ThresholdRule,
+        amount_cents: int,
+        entity: Optional[str],
+        currency: str,
+        day: date,
+        event_id: Optional[str],
+    ) -> AlertMessage:
+        scope = entity or "all entities"
+        if rule.kind == "single":
+            message = f"{rule.name}: single sale of {amount_cents / 100:,.2f} {currency} ({scope})"
+        else:
+            message = (
+                f"{rule.name}: {scope} daily total reached {amount_cents / 100:,.2f} {currency}"
+                f" on {day.isoformat()}"
+            )
+        metadata: dict[str, Any] = {
+            "rule": rule.name,
+            "kind": rule.kind,
+            "threshold_cents": rule.threshold_cents,
+            "amount_cents": amount_cents,
+            "currency": currency,
+            "entity": entity,
+            "day": day.isoformat(),
+            "event_id": event_id,
+        }
+        return AlertMessage(
+            alert_type="threshold",
+            severity=rule.severity,
+            message=message,
+            metadata=metadata,
+            key=f"{rule.name}:{entity or '*'}",
+        )
@@ -0,0 +1,461 @@
+"""Embedded asyncio job scheduler for the Revenue Tracking Agent.
+
+The app runs as several replicas, so every replica runs this loop but only
+the current leader executes cluster-wide jobs:
+- on Postgres the leader holds a session-level advisory lock on a dedicated
+  connection; the lock goes away with the connection if the replica dies
+- elsewhere (SQLite) the leader renews a row in `scheduler_leases`, which
+  another replica may take over once it expires
+
+Each run is also recorded in `job_runs` under a unique (job, cron slot)
+before it starts, so a run cannot happen twice even if two replicas briefly
+both think they lead. A new leader resumes from the last recorded slot;
+slots missed while nobody led are coalesced into a single run.
+
+Jobs are synchronous (they use SQLAlchemy sessions) and run in a worker
+thread so the event loop keeps serving requests.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import random
+import socket
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Optional, Protocol
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import func, text, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from branchberg.app.database import JobRun, SchedulerLease
+
+logger = logging.getLogger(__name__)
+
+UTC = ZoneInfo("UTC")
+LEASE_NAME = "revenue_agent_scheduler"
+
+_CRON_FIELDS = (
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day", 1, 31),
+    ("month", 1, 12),
+    ("weekday", 0, 6),  # 0 = Sunday, as in crontab
+)
+
+
+class CronError(ValueError):
+    """Raised for cron expressions this scheduler does not understand."""
+
+
+def _parse_cron_field(value: str, name: str, low: int, high: int) -> frozenset[int]:
+    values: set[int] = set()
+    for part in value.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            if not step_text.isdigit() or int(step_text) == 0:
+                raise CronError(f"bad step in {name} field: {value!r}")
+            step = int(step_text)
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start_text, end_text = part.split("-", 1)
+            if not (start_text.isdigit() and end_text.isdigit()):
+                raise CronError(f"bad range in {name} field: {value!r}")
+            start, end = int(start_text), int(end_text)
+        elif part.isdigit():
+            start = int(part)
+            end = high if step > 1 else start
+        else:
+            raise CronError(f"bad {name} field: {value!r}")
+        if name == "weekday" and end == 7:
+            # crontab allows 7 for Sunday
+            values.add(0)
+            end = 6
+        if start < low or end > high or start > end:
+            raise CronError(f"{name} field out of range: {value!r}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+@dataclass(frozen=True)
+class CronSchedule:
+    """Five-field crontab schedule (`*`, lists, ranges and steps)."""
+
+    expression: str
+    minutes: frozenset[int]
+    hours: frozenset[int]
+    days: frozenset[int]
+    months: frozenset[int]
+    weekdays: frozenset[int]
+    day_restricted: bool
+    weekday_restricted: bool
+
+    @classmethod
+    def parse(cls, expression: str) -> "CronSchedule":
+        parts = expression.split()
+        if len(parts) != 5:
+            raise CronError(f"cron expression needs 5 fields: {expression!r}")
+        fields = [
+            _parse_cron_field(part, name, low, high)
+            for part, (name, low, high) in zip(parts, _CRON_FIELDS)
+        ]
+        return cls(
+            expression=expression,
+            minutes=fields[0],
+            hours=fields[1],
+            days=fields[2],
+            months=fields[3],
+            weekdays=fields[4],
+            day_restricted=parts[2] != "*",
+            weekday_restricted=parts[4] != "*",
+        )
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.isoweekday() % 7) in self.weekdays
+        if self.day_restricted and self.weekday_restricted:
+            return day_ok or weekday_ok  # crontab semantics
+        return day_ok and weekday_ok
+
+    def next_after(self, moment: datetime) -> datetime:
+        """Next matching wall-clock minute strictly after `moment`."""
+
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                month_start = candidate.replace(day=1, hour=0, minute=0)
+                candidate = (month_start + timedelta(days=32)).replace(day=1)
+                continue
+            if not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+                continue
+            if candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+                continue
+            return candidate
+        raise CronError(f"cron expression never matches: {self.expression!r}")
+
+
+@dataclass(frozen=True)
+class ScheduledJob:
+    name: str
+    schedule: CronSchedule
+    func: Callable[[Session, datetime], Any]
+    jitter_seconds: float = 0.0
+    timezone: ZoneInfo = UTC  # zone the cron fields are read in
+    leader_only: bool = True  # False: runs on every replica, not recorded
+
+    def next_slot(self, after: datetime) -> datetime:
+        """Next cron slot after the naive UTC time `after`, as naive UTC."""
+
+        local = after.replace(tzinfo=timezone.utc).astimezone(self.timezone).replace(tzinfo=None)
+        slot = self.schedule.next_after(local).replace(tzinfo=self.timezone)
+        return slot.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+class LeaderLease(Protocol):
+    holder: str
+
+    def acquire(self, now: datetime) -> bool:
+        """Take or renew leadership; True while this replica leads."""
+
+    def release(self) -> None:
+        ...
+
+
+class RowLease:
+    """Leader lease stored as a row with an expiry (works on any database)."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        *,
+        name: str = LEASE_NAME,
+        holder: Optional[str] = None,
+        ttl_seconds: float = 60.0,
+    ):
+        self.session_factory = session_factory
+        self.name = name
+        self.holder = holder or default_holder_id()
+        self.ttl = timedelta(seconds=ttl_seconds)
+
+    def acquire(self, now: datetime) -> bool:
+        db = self.session_factory()
+        try:
+            renewed = db.execute(
+                update(SchedulerLease)
+                .where(
+                    SchedulerLease.name == self.name,
+                    (SchedulerLease.holder == self.holder) | (SchedulerLease.expires_at < now),
+                )
+                .values(holder=self.holder, expires_at=now + self.ttl, updated_at=now)
+            )
+            if renewed.rowcount:
+                db.commit()
+                return True
+            if db.get(SchedulerLease, self.name) is not None:
+                db.rollback()
+                return False
+            db.add(
+                SchedulerLease(
+                    name=self.name,
+                    holder=self.holder,
+                    expires_at=now + self.ttl,
+                    updated_at=now,
+                )
+            )
+            db.commit()
+            return True
+        except IntegrityError:
+            db.rollback()
+            return False
+        finally:
+            db.close()
+
+    def release(self) -> None:
+        db = self.session_factory()
+        try:
+            db.query(SchedulerLease).filter(
+                SchedulerLease.name == self.name,
+                SchedulerLease.holder == self.holder,
+            ).delete()
+            db.commit()
+        finally:
+            db.close()
+
+
+class AdvisoryLockLease:
+    """Leader lease backed by a Postgres session-level advisory lock."""
+
+    def __init__(self, engine: Engine, *, name: str = LEASE_NAME, holder: Optional[str] = None):
+        self.engine = engine
+        self.holder = holder or default_holder_id()
+        digest = hashlib.blake2b(name.encode(), digest_size=8).digest()
+        self.key = int.from_bytes(digest, "big", signed=True)
+        self._connection: Optional[Connection] = None
+
+    def acquire(self, now: datetime) -> bool:
+        try:
+            if self._connection is not None:
+                # Still ours as long as the connection is alive.
+                self._connection.execute(text("SELECT 1"))
+                return True
+            connection = self.engine.connect()
+            locked = connection.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key}
+            ).scalar()
+            connection.commit()
+            if locked:
+                self._connection = connection
+                return True
+            connection.close()
+            return False
+        except SQLAlchemyError:
+            logger.warning("scheduler lost its advisory lock connection", exc_info=True)
+            self._drop_connection()
+            return False
+
+    def release(self) -> None:
+        if self._connection is None:
+            return
+        try:
+            self._connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.key})
+            self._connection.commit()
+        except SQLAlchemyError:
+            pass
+        self._drop_connection()
+
+    def _drop_connection(self) -> None:
+        if self._connection is not None:
+            try:
+                self._connection.invalidate()
+                self._connection.close()
+            except SQLAlchemyError:
+                pass
+        self._connection = None
+
+
+def default_holder_id() -> str:
+    return f"{socket.gethostname()}:{uuid.uuid4().hex[:8]}"
+
+
+def make_leader_lease(
+    engine: Engine,
+    session_factory: Callable[[], Session],
+    *,
+    name: str = LEASE_NAME,
+    ttl_seconds: float = 60.0,
+) -> LeaderLease:
+    if engine.dialect.name == "postgresql":
+        return AdvisoryLockLease(engine, name=name)
+    return RowLease(session_factory, name=name, ttl_seconds=ttl_seconds)
+
+
+class JobScheduler:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        jobs: list[ScheduledJob],
+        *,
+        lease: LeaderLease,
+        poll_seconds: float = 15.0,
+        clock: Callable[[], datetime] = datetime.utcnow,
+        rng: Optional[random.Random] = None,
+    ):
+        self.session_factory = session_factory
+        self.jobs = list(jobs)
+        self.lease = lease
+        self.poll_seconds = poll_seconds
+        self.clock = clock
+        self._rng = rng or random.Random()
+        self._is_leader = False
+        self._next: dict[str, tuple[datetime, datetime]] = {}  # name -> (slot, due incl. jitter)
+        self._started_at = clock()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._is_leader
+
+    def run_pending(self, now: Optional[datetime] = None) -> list[JobRun]:
+        """Run every job that is due at `now`; return the recorded runs."""
+
+        now = now or self.clock()
+        leader = self.lease.acquire(now)
+        if leader and not self._is_leader:
+            # Another replica may have run jobs while we were not leading.
+            self._load_next_slots(now)
+        self._is_leader = leader
+
+        runs = []
+        for job in self.jobs:
+            if job.leader_only and not leader:
+                continue
+            if job.name not in self._next:
+                self._schedule(job, job.next_slot(self._started_at))
+            slot, due = self._next[job.name]
+            if now < due:
+                continue
+            # Slots missed while nobody ran the job collapse into this run.
+            self._schedule(job, job.next_slot(max(slot, now)))
+            if job.leader_only:
+                run = self._execute_recorded(job, slot)
+                if run is not None:
+                    runs.append(run)
+            else:
+                self._execute_local(job, now)
+        return runs
+
+    def _schedule(self, job: ScheduledJob, slot: datetime) -> None:
+        jitter = self._rng.uniform(0, job.jitter_seconds) if job.jitter_seconds else 0.0
+        self._next[job.name] = (slot, slot + timedelta(seconds=jitter))
+
+    def _load_next_slots(self, now: datetime) -> None:
+        db = self.session_factory()
+        try:
+            last_slots = dict(
+                db.query(JobRun.job_name, func.max(JobRun.scheduled_for))
+                .group_by(JobRun.job_name)
+                .all()
+            )
+        finally:
+            db.close()
+        for job in self.jobs:
+            if not job.leader_only:
+                continue
+            last = last_slots.get(job.name)
+            self._schedule(job, job.next_slot(last if last is not None else self._started_at))
+
+    def _execute_recorded(self, job: ScheduledJob, slot: datetime) -> Optional[JobRun]:
+        db = self.session_factory()
+        try:
+            run = JobRun(
+                job_name=job.name,
+                scheduled_for=slot,
+                started_at=self.clock(),
+                status="running",
+                holder=self.lease.holder,
+            )
+            db.add(run)
+            try:
+                db.commit()
+            except IntegrityError:
+                # Another replica already claimed this slot.
+                db.rollback()
+                return None
+
+            started = time.perf_counter()
+            try:
+                job.func(db, self.clock())
+                run.status = "success"
+            except Exception as exc:  # noqa: BLE001 - recorded, then the loop moves on
+                db.rollback()
+                logger.exception("scheduled job %s failed", job.name)
+                run.status = "error"
+                run.error = f"{type(exc).__name__}: {exc}"[:1000]
+            run.duration_ms = round((time.perf_counter() - started) * 1000, 3)
+            run.finished_at = self.clock()
+            db.commit()
+            db.refresh(run)
+            db.expunge(run)
+            return run
+        finally:
+            db.close()
+
+    def _execute_local(self, job: ScheduledJob, now: datetime) -> None:
+        db = self.session_factory()
+        try:
+            job.func(db, now)
+        except Exception:  # noqa: BLE001
+            logger.exception("scheduled job %s failed", job.name)
+        finally:
+            db.close()
+
+    def start(self) -> asyncio.Task:
+        """Start the loop on the running event loop (call from `lifespan`)."""
+
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._run_forever(), name="revenue-agent-scheduler")
+        return self._task
+
+    async def stop(self) -> None:
+        if self._task is None or self._stopping is None:
+            return
+        self._stopping.set()
+        await self._task
+        self._task = None
+        await asyncio.to_thread(self.lease.release)
+        self._is_leader = False
+
+    async def _run_forever(self) -> None:
+        assert self._stopping is not None
+        while not self._stopping.is_set():
+            try:
+                await asyncio.to_thread(self.run_pending)
+            except Exception:  # noqa: BLE001 - keep the loop alive
+                logger.exception("scheduler tick failed")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+
+def recent_job_runs(db: Session, *, job_name: Optional[str] = None, limit: int = 50) -> list[JobRun]:
+    query = db.query(JobRun)
+    if job_name:
+        query = query.filter(JobRun.job_name == job_name)
+    return query.order_by(JobRun.started_at.desc(), JobRun.id.desc()).limit(limit).all()
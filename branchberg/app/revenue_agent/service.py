@@ -5,46 +5,120 @@ This is the orchestration point for:
 - scheduled jobs (summaries/alerts)
 - notifications
 
-Right now, jobs are TODO (the repo has no scheduler wired in yet).
+Threshold alerts run inline at ingest (`rules.py`); the periodic jobs are
+run by the embedded scheduler (`scheduler.py`) when `SCHEDULER_ENABLED` is set.
 """
 
 from __future__ import annotations
 
+from datetime import datetime
+from typing import Optional
+
 from sqlalchemy.orm import Session
 
+from branchberg.app.revenue_agent.anomaly import AnomalyDetector
 from branchberg.app.revenue_agent.config import AgentSettings
+from branchberg.app.revenue_agent.notifications.base import AlertMessage
+from branchberg.app.revenue_agent.notifications.coalescing import CoalescingNotifier
 from branchberg.app.revenue_agent.notifications.slack import SlackWebhookNotifier
+from branchberg.app.revenue_agent.repository import advance_watermark, get_watermark
+from branchberg.app.revenue_agent.rules import RulesEngine
+from branchberg.app.revenue_agent.scheduler import CronSchedule, ScheduledJob
+from branchberg.app.revenue_agent.summaries import (
+    CENTRAL,
+    SummaryRunResult,
+    fold_new_events,
+    format_daily_summary,
+    previous_business_day,
+    summaries_for_day,
+)
+
+# Watermark recording the last business day whose summary was sent.
+SUMMARY_NOTIFIED_WATERMARK = "daily_summary_notified"
 
 
 class RevenueTrackingAgent:
     def __init__(self, settings: AgentSettings):
         self.settings = settings
-        self.notifier = SlackWebhookNotifier(settings.slack_webhook_url)
+        self.slack = SlackWebhookNotifier(settings.slack_webhook_url)
+        self.notifier = CoalescingNotifier(self.slack)
+        self.anomaly_detector = AnomalyDetector()
+        # SAFE_MODE: threshold hits are still recorded, but nothing is sent.
+        self.rules_engine = RulesEngine.from_config(
+            settings.alert_rules, notifier=None if settings.safe_mode else self.notifier
+        )
 
-    def run_daily_summary_job(self, db: Session) -> None:
-        """Compute daily summary totals and send notifications.
+    def run_daily_summary_job(self, db: Session, *, now: Optional[datetime] = None) -> Optional[SummaryRunResult]:
+        """Fold new events into daily summaries and send yesterday's summary.
 
-        TODO:
-        - compute yesterday's totals (Central time) per AGENTS.md
-        - write to `revenue_summaries` table (model not yet implemented)
-        - send Slack/email if configured and SAFE_MODE is false
+        Incremental and idempotent (see `summaries.fold_new_events`), so it is
+        safe to run as often as the scheduler likes. Yesterday's (Central time)
+        summary is sent once, on the first run after the day closes.
         """
         if self.settings.safe_mode:
-            return
+            return None
+
+        now = now or datetime.utcnow()
+        result = fold_new_events(db)
+
+        day = previous_business_day(now)
+        day_start = datetime.combine(day, datetime.min.time())
+        notified = get_watermark(db, SUMMARY_NOTIFIED_WATERMARK)
+        if notified is None or notified.processed_at < day_start:
+            self.notifier.notify_summary(
+                text=format_daily_summary(day, summaries_for_day(db, day)),
+                metadata={"day": day.isoformat()},
+            )
+            advance_watermark(
+                db,
+                SUMMARY_NOTIFIED_WATERMARK,
+                notified,
+                processed_at=day_start,
+                event_id=None,
+            )
+            db.commit()
+        return result
 
-        # TODO: implement.
-        return
+    def run_alerts_job(self, db: Session, *, now: Optional[datetime] = None) -> list[AlertMessage]:
+        """Detect anomalies and notify.
 
-    def run_alerts_job(self, db: Session) -> None:
-        """Detect anomalies/thresholds/duplicates and notify.
+        Anomalies come from `AnomalyDetector`, which keeps O(1) streaming
+        state per (entity, provider) series; alerts are stored in
+        `revenue_alerts` and sent through the (coalescing) notifier.
 
-        TODO:
-        - implement threshold alerts
-        - implement anomaly detection (rolling baseline)
-        - write to `revenue_alerts` table (model not yet implemented)
+        Threshold alerts are not part of this job: `rules_engine` evaluates
+        them inline as events are inserted.
         """
         if self.settings.safe_mode:
-            return
+            return []
 
-        # TODO: implement.
-        return
+        alerts = self.anomaly_detector.run(db, now=now)
+        for alert in alerts:
+            self.notifier.notify_alert(alert)
+        return alerts
+
+    def scheduled_jobs(self) -> list[ScheduledJob]:
+        """Jobs for the embedded scheduler.
+
+        The summary and alert jobs are incremental, so they may run as often
+        as their cron allows; only the leader replica runs them. Alert
+        digests are flushed by `notifier.start()` from the app lifespan, so
+        they go out even when the scheduler is off.
+        """
+        jitter = self.settings.scheduler_jitter_seconds
+        return [
+            ScheduledJob(
+                name="daily_summary",
+                schedule=CronSchedule.parse(self.settings.summary_cron),
+                func=lambda db, now: self.run_daily_summary_job(db, now=now),
+                jitter_seconds=jitter,
+                timezone=CENTRAL,
+            ),
+            ScheduledJob(
+                name="alerts",
+                schedule=CronSchedule.parse(self.settings.alerts_cron),
+                func=lambda db, now: self.run_alerts_job(db, now=now),
+                jitter_seconds=jitter,
+                timezone=CENTRAL,
+            ),
+        ]
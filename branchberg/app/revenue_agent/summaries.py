@@ -0,0 +1,161 @@
+"""Incremental daily revenue summaries.
+
+`revenue_summaries` holds one row per (Central-time business day, entity,
+currency). Instead of re-summing a day from the raw table on every run, the
+job keeps a watermark on (`RevenueEvent.txid`, `seq`) (commit order) and folds only
+events recorded since the last run into their rows. This covers late arrivals for past days
+too, since an event lands in the day it occurred no matter when it was
+ingested.
+
+Each run commits the row updates and the new watermark in one transaction,
+so running it again right away (or concurrently on Postgres, where the
+watermark row is locked) folds nothing twice.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+from sqlalchemy.orm import Session
+
+from branchberg.app.database import RevenueDailySummary, RevenueEvent
+from branchberg.app.revenue_agent.repository import (
+    advance_watermark,
+    get_watermark,
+    iter_events_after,
+)
+
+CENTRAL = ZoneInfo("America/Chicago")
+UNASSIGNED_ENTITY = "unassigned"
+WATERMARK_NAME = "daily_summary"
+
+
+@dataclass(frozen=True)
+class SummaryRunResult:
+    events_folded: int
+    rows_touched: int
+    watermark: Optional[int]  # seq of the last folded event
+
+
+def business_day(timestamp: datetime) -> date:
+    """Map a naive UTC timestamp to its Central-time calendar day."""
+    return timestamp.replace(tzinfo=timezone.utc).astimezone(CENTRAL).date()
+
+
+def business_day_bounds(day: date) -> tuple[datetime, datetime]:
+    """The naive UTC range [start, end) covered by a Central-time calendar day."""
+    start, end = (
+        datetime.combine(boundary, time.min, tzinfo=CENTRAL).astimezone(timezone.utc).replace(tzinfo=None)
+        for boundary in (day, day + timedelta(days=1))
+    )
+    return start, end
+
+
+def previous_business_day(now: Optional[datetime] = None) -> date:
+    return business_day(now or datetime.utcnow()) - timedelta(days=1)
+
+
+def fold_new_events(
+    db: Session,
+    *,
+    max_events: Optional[int] = None,
+) -> SummaryRunResult:
+    """Fold events recorded since the watermark into `revenue_summaries`."""
+
+    watermark = get_watermark(db, WATERMARK_NAME)
+
+    deltas: dict[tuple[date, str, str], list[int]] = {}
+    last_row = None
+    folded = 0
+    rows = iter_events_after(
+        db,
+        watermark,
+        columns=(
+            RevenueEvent.id,
+            RevenueEvent.seq,
+            RevenueEvent.txid,
+            RevenueEvent.processed_at,
+            RevenueEvent.created_at,
+            RevenueEvent.entity,
+            RevenueEvent.currency,
+            RevenueEvent.amount_cents,
+        ),
+        limit=max_events,
+    )
+    for row in rows:
+        key = (
+            business_day(row.created_at or row.processed_at),
+            row.entity or UNASSIGNED_ENTITY,
+            (row.currency or "USD").upper(),
+        )
+        delta = deltas.setdefault(key, [0, 0])
+        delta[0] += row.amount_cents or 0
+        delta[1] += 1
+        folded += 1
+        last_row = row
+
+    if last_row is None:
+        db.rollback()
+        return SummaryRunResult(
+            events_folded=0,
+            rows_touched=0,
+            watermark=watermark.seq if watermark else None,
+        )
+
+    existing = {
+        (summary.day, summary.entity, summary.currency): summary
+        for summary in db.query(RevenueDailySummary).filter(
+            RevenueDailySummary.day.in_({key[0] for key in deltas})
+        )
+    }
+    now_utc = datetime.utcnow()
+    for key, (total_cents, count) in deltas.items():
+        summary = existing.get(key)
+        if summary is None:
+            summary = RevenueDailySummary(
+                day=key[0], entity=key[1], currency=key[2], total_cents=0, event_count=0
+            )
+            db.add(summary)
+        summary.total_cents += total_cents
+        summary.event_count += count
+        summary.updated_at = now_utc
+
+    advance_watermark(
+        db,
+        WATERMARK_NAME,
+        watermark,
+        processed_at=last_row.processed_at,
+        event_id=last_row.id,
+        seq=last_row.seq,
+        txid=last_row.txid,
+    )
+    db.commit()
+    return SummaryRunResult(
+        events_folded=folded,
+        rows_touched=len(deltas),
+        watermark=last_row.seq,
+    )
+
+
+def summaries_for_day(db: Session, day: date) -> list[RevenueDailySummary]:
+    return (
+        db.query(RevenueDailySummary)
+        .filter(RevenueDailySummary.day == day)
+        .order_by(RevenueDailySummary.entity, RevenueDailySummary.currency)
+        .all()
+    )
+
+
+def format_daily_summary(day: date, rows: list[RevenueDailySummary]) -> str:
+    if not rows:
+        return f"Revenue for {day.isoformat()}: no transactions."
+    lines = [f"Revenue for {day.isoformat()} (Central):"]
+    for row in rows:
+        lines.append(
+            f"- {row.entity}: {row.total_cents / 100:,.2f} {row.currency} "
+            f"({row.event_count} transactions)"
+        )
+    return "\n".join(lines)
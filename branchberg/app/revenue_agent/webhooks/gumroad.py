@@ -14,6 +14,7 @@ from fastapi import Request
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
+from branchberg.app import tracing
 from branchberg.app.revenue_agent.config import AgentSettings
 from branchberg.app.revenue_agent.repository import RevenueEventIngest, insert_revenue_event_idempotent
 
@@ -82,16 +83,19 @@ async def handle_gumroad_webhook(
             500,
         )
 
-    form = await request.form()
+    with tracing.span("gumroad.parse_form"):
+        form = await request.form()
 
     order_number = str(form.get("order_number") or "").strip()
     signature = str(form.get("signature") or "").strip()
 
-    if not _verify_gumroad_signature(
-        secret=settings.gumroad_webhook_secret,
-        order_number=order_number,
-        signature=signature,
-    ):
+    with tracing.span("gumroad.verify"):
+        verified = _verify_gumroad_signature(
+            secret=settings.gumroad_webhook_secret,
+            order_number=order_number,
+            signature=signature,
+        )
+    if not verified:
         return (
             GumroadWebhookResponse(
                 status="invalid",
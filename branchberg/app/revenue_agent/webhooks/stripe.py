@@ -11,6 +11,7 @@ from fastapi import Request
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
+from branchberg.app import tracing
 from branchberg.app.revenue_agent.config import AgentSettings
 from branchberg.app.revenue_agent.repository import RevenueEventIngest, insert_revenue_event_idempotent
 
@@ -58,7 +59,10 @@ async def handle_stripe_webhook(
     is fully deployed.
     """
 
-    raw = await request.body()
+    with tracing.span("stripe.read_body") as span:
+        raw = await request.body()
+        if span is not None:
+            span.set(bytes=len(raw))
     sig_header = request.headers.get("stripe-signature")
 
     if settings.safe_mode:
@@ -80,13 +84,15 @@ async def handle_stripe_webhook(
     try:
         import stripe
 
-        event = stripe.Webhook.construct_event(
-            payload=raw,
-            sig_header=sig_header,
-            secret=settings.stripe_webhook_secret,
-        )
-        # stripe returns StripeObject; cast to dict-like.
-        event_dict = dict(event)
+        # construct_event checks the signature, then parses the JSON payload.
+        with tracing.span("stripe.verify_and_parse"):
+            event = stripe.Webhook.construct_event(
+                payload=raw,
+                sig_header=sig_header,
+                secret=settings.stripe_webhook_secret,
+            )
+            # stripe returns StripeObject; newer SDKs only convert via to_dict().
+            event_dict = event.to_dict() if hasattr(event, "to_dict") else dict(event)
     except Exception as exc:
         return (
             StripeWebhookResponse(
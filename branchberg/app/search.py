@@ -0,0 +1,217 @@
+"""Full-text search over revenue events.
+
+Indexed text per event: the `description` metadata key, the customer email,
+the event id and a few reference keys from webhook metadata (Gumroad
+product id and order number, Stripe event id).
+
+- SQLite: an FTS5 table (`revenue_events_search`) with the trigram
+  tokenizer, so any fragment of 3+ characters matches (e.g. part of a
+  product id). Its rowid is the event's `seq` (the table's own rowids are
+  not stable across VACUUM, since its key is a String), so the triggers
+  that keep it in sync and the join back to `revenue_events` are both
+  index lookups. SQLite builds without FTS5 or the trigram tokenizer
+  (< 3.34) get no index, and search reports itself unavailable.
+- Postgres: a GIN expression index over a `tsvector` of the same text,
+  maintained by Postgres itself. Terms match whole words or word prefixes.
+
+Results are ranked (bm25 / ts_rank) and paginated. Both are set up by
+`ensure_search_index`, which runs from `init_db` and whenever the
+`revenue_events` table is created.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+SEARCH_TABLE = "revenue_events_search"
+# Earlier layouts, keyed by the table rowid or an UNINDEXED event id column.
+LEGACY_SEARCH_TABLE = "revenue_events_fts"
+PG_SEARCH_INDEX = "ix_revenue_events_search"
+MIN_TERM_LENGTH = 3
+
+# JSON paths inside `event_metadata` whose values are searchable.
+METADATA_PATHS = (
+    ("gumroad", "product_id"),
+    ("gumroad", "order_number"),
+    ("stripe_event", "id"),
+)
+
+_PG_TERM = re.compile(r"[^\w@.+-]+")
+
+logger = logging.getLogger(__name__)
+
+
+class SearchUnavailable(RuntimeError):
+    """Raised when the database has no full-text search support here."""
+
+
+class SearchQueryError(ValueError):
+    """Raised when a search query has nothing searchable in it."""
+
+
+def _sqlite_refs(row: str) -> str:
+    parts = [f"coalesce({row}.event_id, '')"]
+    parts += [
+        f"coalesce(json_extract({row}.event_metadata, '$.{'.'.join(path)}'), '')"
+        for path in METADATA_PATHS
+    ]
+    return " || ' ' || ".join(parts)
+
+
+def _sqlite_values(row: str) -> str:
+    return (
+        f"{row}.seq, json_extract({row}.event_metadata, '$.description'), "
+        f"{row}.customer_email, {_sqlite_refs(row)}"
+    )
+
+
+_SQLITE_COLUMNS = "rowid, description, customer_email, refs"
+_SQLITE_TRIGGERS = (
+    "revenue_events_search_insert",
+    "revenue_events_search_delete",
+    "revenue_events_search_update",
+)
+_LEGACY_SQLITE_TRIGGERS = (
+    "revenue_events_fts_insert",
+    "revenue_events_fts_delete",
+    "revenue_events_fts_update",
+)
+
+_SQLITE_DDL = [
+    f"""CREATE TRIGGER IF NOT EXISTS revenue_events_search_insert
+    AFTER INSERT ON revenue_events WHEN new.seq IS NOT NULL BEGIN
+        INSERT INTO {SEARCH_TABLE}({_SQLITE_COLUMNS})
+        VALUES ({_sqlite_values("new")});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS revenue_events_search_delete
+    AFTER DELETE ON revenue_events BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.seq;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS revenue_events_search_update
+    AFTER UPDATE OF seq, event_id, customer_email, event_metadata ON revenue_events
+    WHEN new.seq IS NOT NULL BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.seq;
+        INSERT INTO {SEARCH_TABLE}({_SQLITE_COLUMNS})
+        VALUES ({_sqlite_values("new")});
+    END""",
+]
+
+
+def _pg_document() -> str:
+    parts = [
+        "coalesce(event_metadata ->> 'description', '')",
+        "coalesce(customer_email, '')",
+        "coalesce(event_id, '')",
+    ]
+    parts += [
+        "coalesce(event_metadata #>> '{" + ",".join(path) + "}', '')" for path in METADATA_PATHS
+    ]
+    return "to_tsvector('simple', " + " || ' ' || ".join(parts) + ")"
+
+
+def _sqlite_table_exists(conn: Connection, name: str) -> bool:
+    return conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": name},
+    ).first() is not None
+
+
+def _drop_sqlite(conn: Connection, table: str, triggers: tuple[str, ...]) -> None:
+    for trigger in triggers:
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+    conn.exec_driver_sql(f"DROP TABLE IF EXISTS {table}")
+
+
+def _ensure_sqlite(conn: Connection) -> None:
+    if _sqlite_table_exists(conn, LEGACY_SEARCH_TABLE):
+        _drop_sqlite(conn, LEGACY_SEARCH_TABLE, _LEGACY_SQLITE_TRIGGERS)
+    if not _sqlite_table_exists(conn, SEARCH_TABLE):
+        try:
+            conn.exec_driver_sql(
+                f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+                "description, customer_email, refs, tokenize = 'trigram')"
+            )
+        except OperationalError as exc:
+            logger.warning("Full-text search disabled: SQLite cannot create the index (%s)", exc)
+            return
+        conn.exec_driver_sql(
+            f"INSERT INTO {SEARCH_TABLE}({_SQLITE_COLUMNS}) "
+            f"SELECT {_sqlite_values('revenue_events')} FROM revenue_events "
+            # Rows without a seq yet are indexed by the update trigger once they get one.
+            "WHERE seq IS NOT NULL"
+        )
+    for statement in _SQLITE_DDL:
+        conn.exec_driver_sql(statement)
+
+
+def ensure_search_index(bind: Engine | Connection) -> None:
+    """Create the search index (and backfill it) if it does not exist yet."""
+    if isinstance(bind, Engine):
+        with bind.begin() as conn:
+            ensure_search_index(conn)
+        return
+    if bind.dialect.name == "sqlite":
+        _ensure_sqlite(bind)
+    elif bind.dialect.name == "postgresql":
+        bind.exec_driver_sql(
+            f"CREATE INDEX IF NOT EXISTS {PG_SEARCH_INDEX} "
+            f"ON revenue_events USING gin (({_pg_document()}))"
+        )
+
+
+def drop_search_index(bind: Connection) -> None:
+    if bind.dialect.name == "sqlite":
+        _drop_sqlite(bind, SEARCH_TABLE, _SQLITE_TRIGGERS)
+        _drop_sqlite(bind, LEGACY_SEARCH_TABLE, _LEGACY_SQLITE_TRIGGERS)
+
+
+def _terms(query: str) -> list[str]:
+    terms = [term for term in query.split() if len(term) >= MIN_TERM_LENGTH]
+    if not terms:
+        raise SearchQueryError(f"Search terms need at least {MIN_TERM_LENGTH} characters.")
+    return terms
+
+
+def search_event_ids(
+    db: Session, query: str, *, limit: int = 50, offset: int = 0
+) -> list[tuple[str, float]]:
+    """Return `(revenue_event.id, score)` best match first; every term must match."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        if not _sqlite_table_exists(db.connection(), SEARCH_TABLE):
+            raise SearchUnavailable("Full-text search needs SQLite with the FTS5 trigram tokenizer.")
+        match = " ".join('"' + term.replace('"', '""') + '"' for term in _terms(query))
+        rows = db.execute(
+            text(
+                f"SELECT revenue_events.id, -bm25({SEARCH_TABLE}) AS score "
+                f"FROM {SEARCH_TABLE} JOIN revenue_events "
+                f"ON revenue_events.seq = {SEARCH_TABLE}.rowid "
+                f"WHERE {SEARCH_TABLE} MATCH :match "
+                "ORDER BY score DESC, revenue_events.id LIMIT :limit OFFSET :offset"
+            ),
+            {"match": match, "limit": limit, "offset": offset},
+        )
+    elif dialect == "postgresql":
+        words = [_PG_TERM.sub("", term) for term in _terms(query)]
+        tsquery = " & ".join(f"{word}:*" for word in words if word)
+        if not tsquery:
+            raise SearchQueryError("Search terms need letters or digits.")
+        document = _pg_document()
+        rows = db.execute(
+            text(
+                f"SELECT id, ts_rank({document}, q) AS score "
+                "FROM revenue_events, to_tsquery('simple', :tsquery) AS q "
+                f"WHERE {document} @@ q "
+                "ORDER BY score DESC, id LIMIT :limit OFFSET :offset"
+            ),
+            {"tsquery": tsquery, "limit": limit, "offset": offset},
+        )
+    else:
+        raise SearchUnavailable(f"Full-text search is not supported on {dialect}.")
+    return [(row.id, float(row.score)) for row in rows]
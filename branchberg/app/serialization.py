@@ -0,0 +1,48 @@
+"""Fast JSON responses for hot read endpoints.
+
+Endpoints that return a `FastJSONResponse` hand FastAPI a finished response,
+so it skips re-validating the payload against `response_model` (which stays
+on the route for the OpenAPI schema) and the `jsonable_encoder` pass.
+Bodies are encoded with orjson when it is installed, else with the stdlib
+encoder; both write datetimes the way Pydantic does.
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any, *, sort_keys: bool = False) -> bytes:
+    if orjson is not None:
+        option = orjson.OPT_SORT_KEYS if sort_keys else 0
+        return orjson.dumps(content, default=_default, option=option)
+    return json.dumps(
+        content,
+        default=_default,
+        sort_keys=sort_keys,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
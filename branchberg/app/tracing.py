@@ -0,0 +1,278 @@
+"""Lightweight request tracing: nested spans with a local exporter.
+
+`TracingMiddleware` opens a trace per HTTP request, sampled at
+`TRACE_SAMPLE_RATE` (0 turns tracing off). Code marks stages with
+
+    with tracing.span("stripe.verify"):
+        ...
+
+and the shared `db_timing` hook adds a `db.query` span per statement, so a slow
+webhook breaks down into verification, parsing, INSERT, rollback and
+re-query. Outside a sampled trace `span()` yields None and records nothing.
+
+Finished traces go to the exporters: an in-memory ring buffer (served at
+`GET /debug/traces` and `GET /debug/traces/stages`) and, when
+`TRACE_EXPORT_PATH` is set, one JSON line per trace appended to that file.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator, Optional, Sequence
+
+from starlette.datastructures import MutableHeaders
+
+from . import db_timing
+from .query_profiler import normalize_sql
+
+DEFAULT_BUFFER_SIZE = 200
+MAX_STATEMENT_LENGTH = 200
+
+
+@dataclass
+class Span:
+    name: str
+    span_id: str
+    parent_id: Optional[str]
+    started: float  # perf_counter
+    duration_ms: Optional[float] = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+
+@dataclass
+class Trace:
+    trace_id: str
+    root: Span
+    started_at: float  # epoch seconds
+    spans: list[Span] = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        origin = self.root.started
+        return {
+            "trace_id": self.trace_id,
+            "name": self.root.name,
+            "started_at": self.started_at,
+            "duration_ms": self.root.duration_ms,
+            "spans": [
+                {
+                    "name": span.name,
+                    "span_id": span.span_id,
+                    "parent_id": span.parent_id,
+                    "offset_ms": round((span.started - origin) * 1000, 3),
+                    "duration_ms": span.duration_ms,
+                    "attributes": span.attributes,
+                    "error": span.error,
+                }
+                for span in sorted(self.spans, key=lambda span: span.started)
+            ],
+        }
+
+
+class RingBufferExporter:
+    """Keeps the most recent traces in memory."""
+
+    def __init__(self, size: int = DEFAULT_BUFFER_SIZE):
+        self._traces: deque[dict] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def export(self, trace: Trace) -> None:
+        record = trace.as_dict()
+        with self._lock:
+            self._traces.append(record)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._traces.clear()
+
+    def recent(self, limit: int = 20, name: Optional[str] = None) -> list[dict]:
+        """Newest first; `name` filters on the root span (e.g. "POST /webhooks/stripe")."""
+        with self._lock:
+            traces = list(self._traces)
+        traces.reverse()
+        if name:
+            traces = [trace for trace in traces if trace["name"] == name]
+        return traces[:limit]
+
+    def stages(self, name: Optional[str] = None) -> dict[str, dict]:
+        """Latency per span name across buffered traces: count, p50, p95, max, total."""
+        durations: dict[str, list[float]] = {}
+        for trace in self.recent(limit=len(self._traces), name=name):
+            for span in trace["spans"]:
+                if span["duration_ms"] is not None:
+                    durations.setdefault(span["name"], []).append(span["duration_ms"])
+        return {
+            stage: {
+                "count": len(values),
+                "p50_ms": _percentile(values, 0.50),
+                "p95_ms": _percentile(values, 0.95),
+                "max_ms": max(values),
+                "total_ms": round(sum(values), 3),
+            }
+            for stage, values in sorted(durations.items())
+        }
+
+
+class JsonLinesExporter:
+    """Appends one JSON line per finished trace to `path`."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, trace: Trace) -> None:
+        line = json.dumps(trace.as_dict(), separators=(",", ":"), default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as handle:
+                handle.write(line + "\n")
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def _new_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+_current: ContextVar[Optional[tuple[Trace, Span]]] = ContextVar("trace_span", default=None)
+
+
+class Tracer:
+    def __init__(
+        self,
+        sample_rate: float = 0.0,
+        exporters: Sequence[Any] = (),
+        *,
+        sampler: Callable[[], float] = random.random,
+    ):
+        self.sample_rate = sample_rate
+        self.exporters = list(exporters)
+        self._sampler = sampler
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    @contextmanager
+    def trace(self, name: str, **attributes: Any) -> Iterator[Optional[Trace]]:
+        """Open a root span if this trace is sampled; export it when it ends."""
+        if not self.enabled or self._sampler() >= self.sample_rate:
+            yield None
+            return
+        root = Span(name, _new_id(), None, time.perf_counter(), attributes=dict(attributes))
+        trace = Trace(uuid.uuid4().hex, root, time.time(), [root])
+        token = _current.set((trace, root))
+        try:
+            yield trace
+        except BaseException as exc:
+            root.error = type(exc).__name__
+            raise
+        finally:
+            root.duration_ms = round((time.perf_counter() - root.started) * 1000, 3)
+            _current.reset(token)
+            for exporter in self.exporters:
+                exporter.export(trace)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Time a stage as a child of the current span (no-op outside a trace)."""
+    active = _current.get()
+    if active is None:
+        yield None
+        return
+    trace, parent = active
+    child = Span(name, _new_id(), parent.span_id, time.perf_counter(), attributes=dict(attributes))
+    trace.spans.append(child)
+    token = _current.set((trace, child))
+    try:
+        yield child
+    except BaseException as exc:
+        child.error = type(exc).__name__
+        raise
+    finally:
+        child.duration_ms = round((time.perf_counter() - child.started) * 1000, 3)
+        _current.reset(token)
+
+
+def current_trace_id() -> Optional[str]:
+    active = _current.get()
+    return active[0].trace_id if active else None
+
+
+def _on_statement(timing: db_timing.StatementTiming) -> None:
+    active = _current.get()
+    if active is None:
+        return
+    trace, parent = active
+    query = Span("db.query", _new_id(), parent.span_id, timing.started)
+    query.duration_ms = round(timing.seconds * 1000, 3)
+    query.attributes["statement"] = normalize_sql(timing.statement)[:MAX_STATEMENT_LENGTH]
+    trace.spans.append(query)
+
+
+def instrument_engines() -> None:
+    """Add a `db.query` span per statement inside sampled traces (idempotent)."""
+    db_timing.subscribe(_on_statement)
+
+
+def tracer_from_env() -> tuple[Tracer, RingBufferExporter]:
+    buffer = RingBufferExporter(int(os.getenv("TRACE_BUFFER_SIZE") or DEFAULT_BUFFER_SIZE))
+    exporters: list[Any] = [buffer]
+    export_path = (os.getenv("TRACE_EXPORT_PATH") or "").strip()
+    if export_path:
+        exporters.append(JsonLinesExporter(export_path))
+    sample_rate = min(max(float(os.getenv("TRACE_SAMPLE_RATE") or 0), 0.0), 1.0)
+    return Tracer(sample_rate, exporters), buffer
+
+
+class TracingMiddleware:
+    """ASGI middleware opening a (sampled) trace per HTTP request."""
+
+    def __init__(self, app, *, tracer: Tracer, exclude_paths: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.tracer = tracer
+        self.exclude_paths = frozenset(exclude_paths)
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not self.tracer.enabled
+            or scope["path"] in self.exclude_paths
+            or scope["path"].startswith("/debug/traces")
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        with self.tracer.trace(f"{scope['method']} {scope['path']}") as trace:
+            if trace is None:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    trace.root.set(status=message["status"])
+                    MutableHeaders(scope=message)["X-Trace-Id"] = trace.trace_id
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    trace.root.set(path=scope["path"])
+                    trace.root.name = f"{scope['method']} {route}"
@@ -0,0 +1,135 @@
+"""HTTP client for the BranchOS Revenue API, used by the Streamlit dashboard.
+
+One `requests.Session` per process keeps connections alive across Streamlit
+reruns and browser tabs. Reads raise `ApiError` instead of returning
+placeholders, so the dashboard's cached loaders never cache a failure.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Iterable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DEFAULT_TIMEOUT = 10.0
+# Read timeout for bulk calls: CSV uploads are answered only after every
+# row is imported, and columnar reads can stream for a while.
+UPLOAD_TIMEOUT = 300.0
+EVENTS_CURSOR_HEADER = "X-Events-Cursor"
+
+
+class ApiError(RuntimeError):
+    """The API could not be reached or returned a non-2xx response."""
+
+
+class RevenueApiClient:
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        session: Optional[requests.Session] = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        pool_size: int = 8,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+
+    def _send(self, method: str, path: str, **kwargs: Any) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+        except requests.RequestException as exc:
+            raise ApiError(f"Error connecting to API: {exc}") from exc
+        if response.status_code != 200:
+            raise ApiError(f"Error: {response.status_code} - {response.text}")
+        return response
+
+    def _request(self, method: str, path: str, **kwargs: Any) -> Any:
+        return self._send(method, path, **kwargs).json()
+
+    def get_revenue_summary(self) -> dict[str, Any]:
+        return self._request("GET", "/revenue/summary")
+
+    def get_revenue_events(self, limit: int = 50) -> list[dict[str, Any]]:
+        return self._request("GET", "/revenue/events", params={"limit": limit})
+
+    def get_revenue_events_page(
+        self,
+        *,
+        since: Optional[str] = None,
+        limit: int = 250,
+        fields: Optional[list[str]] = None,
+    ) -> tuple[list[dict[str, Any]], Optional[str]]:
+        """Events plus the `X-Events-Cursor` to pass as `since` next time.
+
+        Without `since` this is the newest page; with it, only events
+        recorded after the cursor, oldest first. `fields` limits each
+        event to those keys.
+        """
+        params: dict[str, Any] = {"limit": limit}
+        if since:
+            params["since"] = since
+        if fields:
+            params["fields"] = ",".join(fields)
+        response = self._send("GET", "/revenue/events", params=params)
+        return response.json(), response.headers.get(EVENTS_CURSOR_HEADER)
+
+    def get_revenue_events_frame(
+        self, *, columns: Optional[list[str]] = None, **filters: Any
+    ) -> "pd.DataFrame":
+        """Bulk-load events into a DataFrame via the Arrow endpoint.
+
+        `filters` are passed through (provider, entity, since, ...). Needs
+        pyarrow on this side too.
+        """
+        import pyarrow.ipc
+
+        params = {key: value for key, value in filters.items() if value is not None}
+        if columns:
+            params["columns"] = ",".join(columns)
+        response = self._send(
+            "GET",
+            "/revenue/events/columnar",
+            params=params,
+            timeout=(self.timeout, UPLOAD_TIMEOUT),
+        )
+        return pyarrow.ipc.open_stream(response.content).read_pandas()
+
+    def get_dashboard_snapshot(self, *, events_limit: int = 50, days: int = 30) -> dict[str, Any]:
+        """Totals, breakdown, daily series and recent events in one request."""
+        return self._request(
+            "GET", "/dashboard/snapshot", params={"events_limit": events_limit, "days": days}
+        )
+
+    def submit_manual_transaction(self, data: dict[str, Any]) -> dict[str, Any]:
+        return self._request("POST", "/ingest/manual", json=data)
+
+    def upload_csv(self, file: Any, data: dict[str, str]) -> dict[str, Any]:
+        return self._request("POST", "/ingest/csv", files={"file": file}, data=data)
+
+    def stream_csv(
+        self, chunks: Iterable[bytes], mapping: dict[str, Optional[str]]
+    ) -> dict[str, Any]:
+        """Send a CSV as a chunked request body to `/ingest/csv/stream`.
+
+        `chunks` is consumed lazily, so the file is never built into one
+        request body in memory (unlike the multipart `upload_csv`).
+        """
+        return self._request(
+            "POST",
+            "/ingest/csv/stream",
+            params={key: value for key, value in mapping.items() if value},
+            data=iter(chunks),
+            headers={"Content-Type": "text/csv"},
+            timeout=(self.timeout, UPLOAD_TIMEOUT),
+        )
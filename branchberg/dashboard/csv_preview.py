@@ -0,0 +1,38 @@
+"""Cheap CSV previews for the upload panel.
+
+Only the header and the first few rows are parsed, so picking a large
+export in the file uploader costs the same as picking a small one.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+from itertools import islice
+from typing import BinaryIO, Iterator
+
+import pandas as pd
+
+DEFAULT_SAMPLE_ROWS = 5
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+
+def preview_csv(file: BinaryIO, sample_rows: int = DEFAULT_SAMPLE_ROWS) -> tuple[list[str], pd.DataFrame]:
+    """Return (column names, first `sample_rows` rows); rewinds `file`."""
+    file.seek(0)
+    stream = io.TextIOWrapper(file, encoding="utf-8-sig", errors="replace", newline="")
+    try:
+        reader = csv.reader(stream)
+        columns = next(reader, [])
+        rows = [row + [""] * (len(columns) - len(row)) for row in islice(reader, sample_rows)]
+    finally:
+        stream.detach()
+        file.seek(0)
+    return columns, pd.DataFrame([row[: len(columns)] for row in rows], columns=columns)
+
+
+def iter_chunks(file: BinaryIO, chunk_size: int = UPLOAD_CHUNK_BYTES) -> Iterator[bytes]:
+    """Yield the file from the start in `chunk_size` pieces."""
+    file.seek(0)
+    while chunk := file.read(chunk_size):
+        yield chunk
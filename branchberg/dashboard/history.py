@@ -0,0 +1,120 @@
+"""Incrementally maintained transaction history for the dashboard.
+
+The first load fetches the newest page of events; every refresh after that
+asks the API only for events recorded since the last cursor and merges them
+into the cached frame. New rows are formatted column-wise as they arrive,
+so a refresh costs O(new rows) rather than O(page size).
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+import pandas as pd
+
+if TYPE_CHECKING:
+    from .api_client import RevenueApiClient
+
+DISPLAY_COLUMNS = ["Date", "Amount", "Provider", "Type", "Email", "Entity", "Event ID"]
+# Everything `format_events` reads; the API skips the rest (notably metadata).
+EVENT_FIELDS = [
+    "id",
+    "event_id",
+    "created_at",
+    "amount_dollars",
+    "provider",
+    "event_type",
+    "customer_email",
+    "entity",
+]
+
+
+def format_events(events: list[dict[str, Any]]) -> pd.DataFrame:
+    """Raw API events -> display rows (plus `id`/`created_at` for merging)."""
+    if not events:
+        return pd.DataFrame(columns=["id", "created_at", *DISPLAY_COLUMNS])
+    raw = pd.DataFrame.from_records(events)
+    created_at = pd.to_datetime(raw["created_at"], utc=True, format="ISO8601")
+    for column in ("customer_email", "entity"):
+        if column not in raw:
+            raw[column] = None
+    return pd.DataFrame(
+        {
+            "id": raw["id"],
+            "created_at": created_at,
+            "Date": created_at.dt.strftime("%Y-%m-%d %H:%M"),
+            "Amount": "$" + raw["amount_dollars"].map("{:,.2f}".format),
+            "Provider": raw["provider"],
+            "Type": raw["event_type"],
+            "Email": raw["customer_email"].fillna("N/A"),
+            "Entity": raw["entity"].fillna("N/A"),
+            "Event ID": raw["event_id"],
+        }
+    )
+
+
+class EventHistory:
+    """Newest `max_rows` events, shared by every session of the dashboard."""
+
+    def __init__(
+        self,
+        *,
+        max_rows: int = 250,
+        min_interval_seconds: float = 0.0,
+        page_size: int = 250,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_rows = max_rows
+        self.min_interval_seconds = min_interval_seconds
+        self.page_size = page_size
+        self.clock = clock
+        self.frame = format_events([])
+        self.cursor: Optional[str] = None
+        self._refreshed_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def refresh(self, client: RevenueApiClient, *, force: bool = False) -> pd.DataFrame:
+        """Merge in events recorded since the last refresh; return the frame."""
+        with self._lock:
+            now = self.clock()
+            if (
+                not force
+                and self._refreshed_at is not None
+                and now - self._refreshed_at < self.min_interval_seconds
+            ):
+                return self.frame
+
+            if self.cursor is None:
+                events, self.cursor = client.get_revenue_events_page(
+                    limit=self.max_rows, fields=EVENT_FIELDS
+                )
+                self.frame = format_events(events)
+            else:
+                deltas = []
+                while True:
+                    events, cursor = client.get_revenue_events_page(
+                        since=self.cursor, limit=self.page_size, fields=EVENT_FIELDS
+                    )
+                    deltas.append(format_events(events))
+                    if len(events) < self.page_size or cursor == self.cursor:
+                        self.cursor = cursor or self.cursor
+                        break
+                    self.cursor = cursor
+                self._merge([delta for delta in deltas if not delta.empty])
+            self._refreshed_at = now
+            return self.frame
+
+    def _merge(self, deltas: list[pd.DataFrame]) -> None:
+        if not deltas:
+            return
+        # The first page and the deltas after it can overlap; keep the latest copy.
+        frames = [self.frame, *deltas] if not self.frame.empty else deltas
+        merged = pd.concat(frames, ignore_index=True)
+        merged = merged.drop_duplicates(subset="id", keep="last")
+        merged = merged.sort_values("created_at", ascending=False, kind="stable")
+        self.frame = merged.head(self.max_rows).reset_index(drop=True)
+
+    def view(self, limit: int) -> pd.DataFrame:
+        return self.frame.head(limit)[DISPLAY_COLUMNS]
@@ -1,13 +1,20 @@
 """Streamlit live dashboard for BranchOS revenue tracking."""
 import os
 import streamlit as st
-import requests
 import pandas as pd
-from datetime import datetime
+
+# `streamlit run` puts this directory on sys.path.
+from api_client import ApiError, RevenueApiClient
+from csv_preview import iter_chunks, preview_csv
+from history import EventHistory
 
 # API Configuration
 API_URL = os.getenv("API_URL", "http://localhost:8000")
 
+# Seconds cached API reads stay fresh. Every rerun, widget interaction and
+# open tab shares the same cache, so this bounds API load per dashboard.
+CACHE_TTL_SECONDS = int(os.getenv("DASHBOARD_CACHE_TTL", "30"))
+
 st.set_page_config(
     page_title="BranchOS Income Ingest",
     page_icon="💰",
@@ -22,72 +29,71 @@ page = st.sidebar.radio(
 )
 
 # Helper functions
-def get_revenue_summary():
-    """Fetch revenue summary from API."""
-    try:
-        response = requests.get(f"{API_URL}/revenue/summary")
-        if response.status_code == 200:
-            return response.json()
-        else:
-            st.error(f"Error fetching summary: {response.status_code}")
-            return None
-    except Exception as e:
-        st.error(f"Error connecting to API: {str(e)}")
-        return None
+@st.cache_resource
+def get_api_client():
+    """One keep-alive HTTP session for the whole Streamlit process."""
+    return RevenueApiClient(API_URL)
+
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def load_dashboard_snapshot(events_limit=50):
+    return get_api_client().get_dashboard_snapshot(events_limit=events_limit)
+
+
+@st.cache_resource
+def get_event_history():
+    """Transaction history shared by all sessions, refreshed by deltas."""
+    return EventHistory(max_rows=250, min_interval_seconds=CACHE_TTL_SECONDS)
 
 
-def get_revenue_events(limit=50):
-    """Fetch recent revenue events from API."""
+def invalidate_revenue_cache():
+    """Drop cached reads after a write so the next render shows it."""
+    load_dashboard_snapshot.clear()
+    st.session_state["force_history_refresh"] = True
+
+
+def get_dashboard_snapshot(events_limit=50):
+    """Fetch every page's data in one cached round trip."""
     try:
-        response = requests.get(f"{API_URL}/revenue/events?limit={limit}")
-        if response.status_code == 200:
-            return response.json()
-        else:
-            st.error(f"Error fetching events: {response.status_code}")
-            return []
-    except Exception as e:
-        st.error(f"Error connecting to API: {str(e)}")
-        return []
+        return load_dashboard_snapshot(events_limit=events_limit)
+    except ApiError as e:
+        st.error(f"Error fetching dashboard data: {e}")
+        return None
 
 
 def submit_manual_transaction(amount, currency, email, customer_id, entity, description):
     """Submit a manual transaction to API."""
+    data = {
+        "amount": amount,
+        "currency": currency,
+        "customer_email": email if email else None,
+        "customer_id": customer_id if customer_id else None,
+        "entity": entity if entity else None,
+        "description": description if description else None
+    }
     try:
-        data = {
-            "amount": amount,
-            "currency": currency,
-            "customer_email": email if email else None,
-            "customer_id": customer_id if customer_id else None,
-            "entity": entity if entity else None,
-            "description": description if description else None
-        }
-        response = requests.post(f"{API_URL}/ingest/manual", json=data)
-        if response.status_code == 200:
-            return response.json(), None
-        else:
-            return None, f"Error: {response.status_code} - {response.text}"
-    except Exception as e:
-        return None, f"Error connecting to API: {str(e)}"
+        result = get_api_client().submit_manual_transaction(data)
+    except ApiError as e:
+        return None, str(e)
+    invalidate_revenue_cache()
+    return result, None
 
 
 def upload_csv(file, amount_col, currency_col, email_col, entity_col, description_col):
-    """Upload CSV file to API."""
+    """Stream CSV file to API in chunks."""
+    mapping = {
+        "amount_column": amount_col,
+        "currency_column": currency_col,
+        "email_column": email_col,
+        "entity_column": entity_col,
+        "description_column": description_col,
+    }
     try:
-        files = {"file": file}
-        data = {
-            "amount_column": amount_col,
-            "currency_column": currency_col if currency_col else "",
-            "email_column": email_col if email_col else "",
-            "entity_column": entity_col if entity_col else "",
-            "description_column": description_col if description_col else ""
-        }
-        response = requests.post(f"{API_URL}/ingest/csv", files=files, data=data)
-        if response.status_code == 200:
-            return response.json(), None
-        else:
-            return None, f"Error: {response.status_code} - {response.text}"
-    except Exception as e:
-        return None, f"Error connecting to API: {str(e)}"
+        result = get_api_client().stream_csv(iter_chunks(file), mapping)
+    except ApiError as e:
+        return None, str(e)
+    invalidate_revenue_cache()
+    return result, None
 
 
 # Main content based on selected page
@@ -96,7 +102,8 @@ if page == "Income Ingest":
     st.markdown("Track all revenue streams in one place - manual entries, CSV imports, and automated webhooks.")
 
     # Display summary metrics at top
-    summary = get_revenue_summary()
+    snapshot = get_dashboard_snapshot()
+    summary = snapshot["totals"] if snapshot else None
     if summary:
         col1, col2 = st.columns(2)
         with col1:
@@ -149,17 +156,13 @@ if page == "Income Ingest":
         uploaded_file = st.file_uploader("Choose CSV file", type=['csv'])
 
         if uploaded_file:
-            # Preview CSV
-            df = pd.read_csv(uploaded_file)
+            # Preview only the header and a few rows
+            columns, sample = preview_csv(uploaded_file)
             st.write("**Preview:**")
-            st.dataframe(df.head(5), use_container_width=True)
-
-            # Reset file pointer
-            uploaded_file.seek(0)
+            st.dataframe(sample, use_container_width=True)
 
             # Column mapping
             st.write("**Column Mapping:**")
-            columns = list(df.columns)
 
             amount_col = st.selectbox("Amount Column *", columns, key="amount_col")
             currency_col = st.selectbox("Currency Column (optional)", [""] + columns, key="currency_col")
@@ -168,8 +171,6 @@ if page == "Income Ingest":
             description_col = st.selectbox("Description Column (optional)", [""] + columns, key="desc_col")
 
             if st.button("Upload & Process CSV"):
-                # Reset file pointer again before upload
-                uploaded_file.seek(0)
                 result, error = upload_csv(
                     uploaded_file,
                     amount_col,
@@ -182,7 +183,7 @@ if page == "Income Ingest":
                 if result:
                     st.success(f"✅ CSV processed! Created {result['created_count']} transactions out of {result['total_rows']} rows.")
                     if result.get('errors'):
-                        st.warning(f"⚠️ Errors: {', '.join(result['errors'][:5])}")
+                        st.warning(f"⚠️ {result['error_count']} errors: {', '.join(result['errors'][:5])}")
                     st.rerun()
                 else:
                     st.error(error)
@@ -190,7 +191,8 @@ if page == "Income Ingest":
 elif page == "Revenue Summary":
     st.title("📊 Revenue Summary")
 
-    summary = get_revenue_summary()
+    snapshot = get_dashboard_snapshot()
+    summary = snapshot["totals"] if snapshot else None
     if summary:
         # Big metrics
         col1, col2, col3 = st.columns(3)
@@ -217,6 +219,25 @@ elif page == "Revenue Summary":
                 help="Average transaction value"
             )
 
+        if snapshot["timeseries"]:
+            st.subheader("Daily Revenue (last 30 days, UTC)")
+            series = pd.DataFrame(snapshot["timeseries"])
+            series["Revenue"] = series["total_cents"] / 100.0
+            st.bar_chart(series.set_index("day")["Revenue"])
+
+        if snapshot["breakdown"]:
+            st.subheader("By Provider and Entity")
+            breakdown = pd.DataFrame(snapshot["breakdown"])
+            breakdown["Revenue"] = (breakdown["total_cents"] / 100.0).map("${:,.2f}".format)
+            breakdown["entity"] = breakdown["entity"].fillna("N/A")
+            st.dataframe(
+                breakdown.rename(
+                    columns={"provider": "Provider", "entity": "Entity", "count": "Transactions"}
+                )[["Provider", "Entity", "Revenue", "Transactions"]],
+                use_container_width=True,
+                hide_index=True,
+            )
+
 elif page == "Transaction History":
     st.title("📜 Transaction History")
 
@@ -227,27 +248,20 @@ elif page == "Transaction History":
     with col2:
         limit = st.selectbox("Show", [25, 50, 100, 250], index=1)
 
-    # Fetch and display events
-    events = get_revenue_events(limit=limit)
-
-    if events:
-        # Convert to DataFrame for better display
-        df_data = []
-        for event in events:
-            df_data.append({
-                "Date": datetime.fromisoformat(event['created_at'].replace('Z', '+00:00')).strftime('%Y-%m-%d %H:%M'),
-                "Amount": f"${event['amount_dollars']:,.2f}",
-                "Provider": event['provider'],
-                "Type": event['event_type'],
-                "Email": event.get('customer_email', 'N/A'),
-                "Entity": event.get('entity', 'N/A'),
-                "Event ID": event['event_id']
-            })
-
-        df = pd.DataFrame(df_data)
+    # Only events recorded since the last refresh are fetched and merged
+    try:
+        history = get_event_history().refresh(
+            get_api_client(),
+            force=st.session_state.pop("force_history_refresh", False),
+        )
+    except ApiError as e:
+        st.error(f"Error fetching events: {e}")
+        history = get_event_history().frame
+
+    if not history.empty:
+        df = get_event_history().view(limit)
         st.dataframe(df, use_container_width=True, hide_index=True)
-
-        st.markdown(f"**Total transactions shown:** {len(events)}")
+        st.markdown(f"**Total transactions shown:** {len(df)}")
     else:
         st.info("No transactions found. Add some transactions using the Income Ingest page!")
 
@@ -0,0 +1,130 @@
+"""Tests for alert coalescing in the notification layer."""
+import asyncio
+
+from branchberg.app.revenue_agent.notifications.base import AlertMessage
+from branchberg.app.revenue_agent.notifications.coalescing import CoalescingNotifier
+
+
+class RecordingNotifier:
+    def __init__(self):
+        self.alerts = []
+        self.summaries = []
+
+    def notify_alert(self, alert):
+        self.alerts.append(alert)
+
+    def notify_summary(self, *, text, metadata=None):
+        self.summaries.append(text)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _duplicate(event_id: str, key: str = "stripe") -> AlertMessage:
+    return AlertMessage(
+        alert_type="duplicate",
+        severity="warning",
+        message=f"{event_id} delivered again",
+        key=key,
+    )
+
+
+def test_burst_becomes_first_alert_plus_one_digest():
+    clock = FakeClock()
+    inner = RecordingNotifier()
+    notifier = CoalescingNotifier(inner, window_seconds=60, max_examples=2, clock=clock)
+
+    for index in range(500):
+        notifier.notify_alert(_duplicate(f"evt_{index}"))
+    assert len(inner.alerts) == 1
+
+    clock.now = 61
+    assert notifier.flush() == 1
+    assert len(inner.alerts) == 2
+    digest = inner.alerts[1]
+    assert digest.metadata["count"] == 499
+    assert digest.metadata["examples"] == ["evt_1 delivered again", "evt_2 delivered again"]
+    assert digest.key == "stripe"
+    assert notifier.pending_groups == 0
+
+
+def test_groups_are_separated_by_type_severity_and_key():
+    inner = RecordingNotifier()
+    notifier = CoalescingNotifier(inner, clock=FakeClock())
+
+    notifier.notify_alert(_duplicate("evt_1", key="stripe"))
+    notifier.notify_alert(_duplicate("evt_2", key="gumroad"))
+    notifier.notify_alert(AlertMessage(alert_type="threshold", severity="critical", message="big sale"))
+    notifier.notify_alert(_duplicate("evt_3", key="stripe"))
+
+    assert [alert.message for alert in inner.alerts] == [
+        "evt_1 delivered again",
+        "evt_2 delivered again",
+        "big sale",
+    ]
+    assert notifier.pending_groups == 3
+
+
+def test_rate_limit_bounds_forwarded_volume():
+    clock = FakeClock()
+    inner = RecordingNotifier()
+    notifier = CoalescingNotifier(inner, rate_per_minute=6, burst=2, clock=clock)
+
+    for index in range(50):
+        notifier.notify_alert(_duplicate(f"evt_{index}", key=f"order_{index}"))
+    assert len(inner.alerts) == 2
+
+    # Closed windows wait for tokens instead of being dropped.
+    clock.now = 61
+    notifier.flush()
+    assert len(inner.alerts) <= 2 + 2 + 6
+    notifier.flush(force=True)
+    assert notifier.pending_groups == 0
+    total = sum((alert.metadata or {}).get("count", 1) for alert in inner.alerts)
+    assert total == 50
+
+
+def test_distinct_keys_are_capped():
+    inner = RecordingNotifier()
+    notifier = CoalescingNotifier(inner, max_groups=3, clock=FakeClock())
+
+    for index in range(100):
+        notifier.notify_alert(_duplicate(f"evt_{index}", key=f"order_{index}"))
+    assert notifier.pending_groups == 4
+
+
+def test_summaries_pass_through():
+    inner = RecordingNotifier()
+    notifier = CoalescingNotifier(inner, clock=FakeClock())
+    notifier.notify_summary(text="Daily total")
+    assert inner.summaries == ["Daily total"]
+
+
+def test_background_flush_sends_digests_and_stop_sends_the_rest():
+    clock = FakeClock()
+    inner = RecordingNotifier()
+    notifier = CoalescingNotifier(inner, window_seconds=60, clock=clock)
+
+    async def scenario():
+        notifier.start(interval_seconds=0.01)
+        notifier.notify_alert(_duplicate("evt_1"))
+        notifier.notify_alert(_duplicate("evt_2"))
+        clock.now = 61  # no further alert arrives to close the window
+        for _ in range(100):
+            if len(inner.alerts) == 2:
+                break
+            await asyncio.sleep(0.01)
+        assert inner.alerts[1].metadata["count"] == 1
+
+        notifier.notify_alert(_duplicate("evt_3", key="gumroad"))
+        notifier.notify_alert(_duplicate("evt_4", key="gumroad"))
+        await notifier.stop()  # window still open: forced out on shutdown
+
+    asyncio.run(scenario())
+    assert [(alert.metadata or {}).get("count") for alert in inner.alerts] == [None, 1, None, 1]
+    assert notifier.pending_groups == 0
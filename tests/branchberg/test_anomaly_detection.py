@@ -0,0 +1,130 @@
+"""Tests for streaming anomaly detection."""
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from branchberg.app.database import RevenueAlert, RevenueEvent, RevenueSeriesStats
+from branchberg.app.revenue_agent.anomaly import AnomalyDetector, AnomalySettings, ewma_update
+from branchberg.app.revenue_agent.config import AgentSettings
+from branchberg.app.revenue_agent.service import RevenueTrackingAgent
+
+START = datetime(2026, 3, 1, 0, 0, 0)
+
+
+def _add_hour(db, hour: int, count: int, amount_cents: int = 1000, provider: str = "stripe"):
+    base = START + timedelta(hours=hour)
+    for index in range(count):
+        stamp = base + timedelta(seconds=index + 1)
+        db.add(
+            RevenueEvent(
+                id=str(uuid.uuid4()),
+                event_id=f"evt_{uuid.uuid4().hex}",
+                provider=provider,
+                event_type="charge.succeeded",
+                amount_cents=amount_cents,
+                currency="USD",
+                entity="A+ Enterprise LLC",
+                event_metadata={},
+                created_at=stamp,
+                processed_at=stamp,
+            )
+        )
+    db.commit()
+
+
+def _run_at(detector, db, hour: int):
+    return detector.run(db, now=START + timedelta(hours=hour, minutes=5))
+
+
+def test_ewma_update_converges_on_constant_input():
+    mean, var = 0.0, 0.0
+    for _ in range(200):
+        mean, var = ewma_update(mean, var, 10.0, 0.1)
+    assert mean == pytest.approx(10.0)
+    assert var == pytest.approx(0.0, abs=1e-6)
+
+
+def test_steady_series_builds_baseline_without_alerts(db):
+    detector = AnomalyDetector(AnomalySettings(min_samples=12))
+    for hour in range(24):
+        _add_hour(db, hour, count=10 + hour % 3)
+        assert _run_at(detector, db, hour + 1) == []
+
+    stats = db.query(RevenueSeriesStats).one()
+    assert stats.samples == 24
+    assert 10 <= stats.count_mean <= 12
+    assert stats.bucket_count == 0
+
+
+def test_volume_spike_raises_anomaly_once(db):
+    detector = AnomalyDetector(AnomalySettings(min_samples=12))
+    for hour in range(24):
+        _add_hour(db, hour, count=10 + hour % 3)
+        _run_at(detector, db, hour + 1)
+
+    _add_hour(db, 24, count=120)
+    alerts = _run_at(detector, db, 25)
+
+    assert len(alerts) == 1
+    alert = alerts[0]
+    assert alert.alert_type == "anomaly"
+    assert alert.key == "A+ Enterprise LLC:stripe"
+    assert alert.metadata["direction"] == "spike"
+    assert alert.metadata["bucket_count"] == 120
+    assert db.query(RevenueAlert).count() == 1
+
+    # Re-running without new data neither double-counts nor re-alerts.
+    assert _run_at(detector, db, 25) == []
+    assert db.query(RevenueAlert).count() == 1
+
+
+def test_silence_on_busy_series_is_flagged_as_drop(db):
+    detector = AnomalyDetector(AnomalySettings(min_samples=12))
+    for hour in range(24):
+        _add_hour(db, hour, count=20)
+        _run_at(detector, db, hour + 1)
+
+    alerts = _run_at(detector, db, 30)
+    assert [alert.metadata["direction"] for alert in alerts] == ["drop"]
+
+
+def test_series_are_tracked_independently(db):
+    detector = AnomalyDetector(AnomalySettings(min_samples=1))
+    _add_hour(db, 0, count=3, provider="stripe")
+    _add_hour(db, 0, count=2, provider="gumroad")
+    _run_at(detector, db, 1)
+
+    counts = {stats.provider: stats.count_mean for stats in db.query(RevenueSeriesStats)}
+    assert counts == {"stripe": 3.0, "gumroad": 2.0}
+
+
+def test_alerts_job_notifies_and_respects_safe_mode(db):
+    sent = []
+
+    class RecordingNotifier:
+        def notify_alert(self, alert):
+            sent.append(alert)
+
+    def make_agent(safe_mode):
+        agent = RevenueTrackingAgent(
+            AgentSettings(
+                safe_mode=safe_mode,
+                stripe_webhook_secret=None,
+                gumroad_webhook_secret=None,
+                slack_webhook_url=None,
+            )
+        )
+        agent.notifier = RecordingNotifier()
+        agent.anomaly_detector = AnomalyDetector(AnomalySettings(min_samples=12))
+        return agent
+
+    for hour in range(24):
+        _add_hour(db, hour, count=10)
+    _add_hour(db, 24, count=200)
+
+    assert make_agent(True).run_alerts_job(db, now=START + timedelta(hours=25, minutes=5)) == []
+    agent = make_agent(False)
+    alerts = agent.run_alerts_job(db, now=START + timedelta(hours=25, minutes=5))
+    assert alerts
+    assert sent == alerts
@@ -0,0 +1,108 @@
+"""Tests for the audit log query and export API."""
+import csv
+import io
+import json
+
+from sqlalchemy import text
+
+
+def _paid_po(client, suffix: str) -> dict:
+    po = client.post(
+        "/po",
+        json={
+            "po_number": f"PO-AUD-{suffix}",
+            "customer_name": "Acme Corp",
+            "amount": 250.00,
+            "entity": "A+ Enterprise LLC",
+            "actor": "alice",
+        },
+    ).json()
+    invoice = client.post(
+        f"/po/{po['id']}/invoice",
+        json={"invoice_number": f"INV-AUD-{suffix}", "amount": 250.00, "actor": "bob"},
+    ).json()
+    payment = client.post(
+        f"/invoice/{invoice['id']}/payment",
+        json={
+            "payment_reference": f"PAY-AUD-{suffix}",
+            "amount": 250.00,
+            "method": "wire",
+            "artifact_uri": "s3://receipt",
+            "actor": "bob",
+        },
+    ).json()
+    return {"po": po, "invoice": invoice, "payment": payment}
+
+
+def test_po_trail_is_chronological(client):
+    records = _paid_po(client, "1")
+    _paid_po(client, "2")
+
+    response = client.get("/audit", params={"po_id": records["po"]["id"]})
+    assert response.status_code == 200
+    body = response.json()
+    assert [entry["action"] for entry in body["entries"]] == [
+        "po_created",
+        "invoice_created",
+        "payment_recorded",
+    ]
+    assert body["next_cursor"] is None
+    assert body["entries"][-1]["payment_id"] == records["payment"]["id"]
+
+
+def test_audit_requires_key_filter(client):
+    assert client.get("/audit").status_code == 422
+    assert client.get("/audit/export").status_code == 422
+
+
+def test_audit_pagination_with_cursor(client):
+    _paid_po(client, "3")
+    _paid_po(client, "4")
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"actor": "bob", "limit": 1}
+        if cursor:
+            params["cursor"] = cursor
+        body = client.get("/audit", params=params).json()
+        seen.extend(entry["id"] for entry in body["entries"])
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+
+    assert len(seen) == 4
+    assert len(set(seen)) == 4
+
+
+def test_audit_export_streams_ndjson_and_csv(client):
+    _paid_po(client, "5")
+
+    ndjson = client.get("/audit/export", params={"entity": "A+ Enterprise LLC"})
+    assert ndjson.status_code == 200
+    assert ndjson.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in ndjson.text.splitlines()]
+    assert len(rows) == 3
+
+    exported = client.get("/audit/export", params={"entity": "A+ Enterprise LLC", "format": "csv"})
+    assert exported.status_code == 200
+    reader = list(csv.DictReader(io.StringIO(exported.text)))
+    assert [row["action"] for row in reader] == [row["action"] for row in rows]
+    assert json.loads(reader[0]["metadata"]) == {"po_number": "PO-AUD-5"}
+    # Both formats (and /audit) write ISO 8601 timestamps.
+    assert [row["created_at"] for row in reader] == [row["created_at"] for row in rows]
+    listed = client.get("/audit", params={"entity": "A+ Enterprise LLC"}).json()
+    assert [row["created_at"] for row in rows] == [
+        entry["created_at"] for entry in listed["entries"]
+    ]
+
+
+def test_po_trail_query_uses_composite_index(db_engine):
+    with db_engine.connect() as conn:
+        plan = conn.execute(
+            text(
+                "EXPLAIN QUERY PLAN SELECT * FROM audit_log "
+                "WHERE po_id = 'x' ORDER BY created_at"
+            )
+        ).fetchall()
+    assert "ix_audit_log_po_id_created_at" in " ".join(str(row) for row in plan)
@@ -0,0 +1,47 @@
+"""Tests for the benchmark suite's datasets, statistics and comparison."""
+from benchmarks.datasets import DatasetSpec, csv_upload, iter_po_chain, iter_revenue_events
+from benchmarks.suite import compare, percentile, summarize
+
+
+def test_datasets_are_reproducible():
+    spec = DatasetSpec(events=50, purchase_orders=20, seed=7)
+
+    assert list(iter_revenue_events(spec)) == list(iter_revenue_events(spec))
+    assert list(iter_po_chain(spec)) == list(iter_po_chain(spec))
+    assert csv_upload(10, seed=7) == csv_upload(10, seed=7)
+    assert list(iter_revenue_events(spec)) != list(iter_revenue_events(DatasetSpec(events=50, seed=8)))
+
+
+def test_po_chain_stages_are_consistent():
+    for po, invoice, payment in iter_po_chain(DatasetSpec(purchase_orders=200)):
+        if po["status"] in {"draft", "issued"}:
+            assert invoice is None and payment is None
+        else:
+            assert invoice["po_id"] == po["id"]
+            assert (payment is not None) == (po["status"] == "paid")
+
+
+def test_percentiles_and_throughput():
+    samples = [float(value) for value in range(1, 101)]
+    assert percentile(samples, 50) == 50.0
+    assert percentile(samples, 99) == 99.0
+
+    stats = summarize([10.0, 10.0, 20.0, 40.0], items_per_call=5)
+    assert stats["p50_ms"] == 10.0
+    assert stats["max_ms"] == 40.0
+    assert stats["throughput_per_s"] == 250.0  # 20 items in 80ms
+
+
+def _results(**p95):
+    return {
+        "meta": {"dialect": "sqlite", "dataset": {"events": 10}},
+        "operations": {name: {"p50_ms": value, "p95_ms": value} for name, value in p95.items()},
+    }
+
+
+def test_compare_flags_p95_regressions_over_threshold():
+    old = _results(summary=10.0, events=10.0, flow=10.0)
+    new = _results(summary=11.0, events=13.0, flow=5.0)
+
+    assert compare(old, new, threshold=0.2) == ["events"]
+    assert compare(old, new, threshold=0.5) == []
@@ -0,0 +1,98 @@
+"""Tests for the Arrow IPC / Parquet revenue event export."""
+import io
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.ipc  # noqa: E402
+import pyarrow.parquet as pq  # noqa: E402
+
+from branchberg.app.columnar import iter_record_batches, revenue_events_select  # noqa: E402
+from branchberg.app.database import RevenueEvent  # noqa: E402
+
+START = datetime(2026, 3, 1, 12, 0)
+
+
+@pytest.fixture()
+def session_factory(session_factory):
+    db = session_factory()
+    for index in range(5):
+        db.add(
+            RevenueEvent(
+                id=str(uuid.uuid4()),
+                event_id=f"evt_{index}",
+                provider="stripe" if index % 2 == 0 else "gumroad",
+                event_type="sale",
+                amount_cents=100 * (index + 1),
+                currency="USD",
+                customer_email=None if index == 0 else f"user{index}@test.com",
+                event_metadata={"row": index},
+                created_at=START + timedelta(hours=index),
+                processed_at=START + timedelta(hours=index),
+            )
+        )
+    db.commit()
+    db.close()
+    return session_factory
+
+
+def test_arrow_stream_round_trips_to_pandas(client):
+    response = client.get("/revenue/events/columnar")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+
+    table = pyarrow.ipc.open_stream(response.content).read_all()
+    assert "metadata" not in table.column_names
+    assert table.schema.field("amount_cents").type == pa.int64()
+    frame = table.to_pandas()
+    assert list(frame["event_id"]) == [f"evt_{index}" for index in range(5)]
+    assert frame["created_at"].iloc[1] == pd.Timestamp(START + timedelta(hours=1), tz="UTC")
+    assert frame["customer_email"].isna().iloc[0]
+
+
+def test_filters_and_projection(client):
+    response = client.get(
+        "/revenue/events/columnar",
+        params={
+            "columns": "event_id,amount_cents,metadata",
+            "provider": "stripe",
+            "since": (START + timedelta(minutes=30)).isoformat(),
+        },
+    )
+    table = pyarrow.ipc.open_stream(response.content).read_all()
+    assert table.column_names == ["event_id", "amount_cents", "metadata"]
+    assert table.to_pydict() == {
+        "event_id": ["evt_2", "evt_4"],
+        "amount_cents": [300, 500],
+        "metadata": ['{"row": 2}', '{"row": 4}'],
+    }
+
+
+def test_parquet_output(client):
+    response = client.get("/revenue/events/columnar", params={"format": "parquet", "limit": 3})
+    assert response.headers["content-type"] == "application/vnd.apache.parquet"
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.num_rows == 3
+
+
+def test_rows_are_encoded_batch_by_batch(session_factory):
+    db = session_factory()
+    columns = ("event_id", "amount_cents")
+    batches = list(iter_record_batches(db, revenue_events_select(columns), columns, batch_size=2))
+    db.close()
+    assert [batch.num_rows for batch in batches] == [2, 2, 1]
+
+
+def test_unknown_column_and_missing_pyarrow(client, monkeypatch):
+    response = client.get("/revenue/events/columnar", params={"columns": "event_id,secret"})
+    assert response.status_code == 422
+    assert "secret" in response.json()["detail"]
+
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    response = client.get("/revenue/events/columnar")
+    assert response.status_code == 501
+    assert "pyarrow" in response.json()["detail"]
@@ -0,0 +1,101 @@
+"""Tests for batched CSV revenue imports."""
+import io
+
+import pytest
+from sqlalchemy import event
+
+from branchberg.app import csv_import
+from branchberg.app.csv_import import (
+    CsvColumnMapping,
+    CsvImportError,
+    CsvImportInterrupted,
+    import_revenue_csv,
+)
+from branchberg.app.database import OutboxEvent, RevenueEvent
+
+
+def test_rows_commit_in_batches_with_outbox_entries(db):
+    commits = []
+    event.listen(db, "after_commit", lambda session: commits.append(1))
+    rows = "".join(f"{index}.50,A+ Enterprise LLC\n" for index in range(7))
+
+    result = import_revenue_csv(
+        db,
+        io.StringIO("amount,entity\n" + rows),
+        CsvColumnMapping(amount="amount", entity="entity"),
+        batch_size=3,
+        commit_batches=True,
+    )
+
+    assert (result.created_count, result.total_rows, result.error_count) == (7, 7, 0)
+    assert len(commits) == 3
+    assert db.query(RevenueEvent).count() == 7
+    assert db.query(OutboxEvent).count() == 7
+    first = db.query(RevenueEvent).filter(RevenueEvent.amount_cents == 50).one()
+    assert first.event_metadata == {"csv_row": 1}
+    assert first.currency == "USD"
+
+
+def test_errors_are_counted_but_reported_up_to_a_cap(db, monkeypatch):
+    monkeypatch.setattr(csv_import, "MAX_REPORTED_ERRORS", 2)
+    stream = io.StringIO("amount\nx\ny\n5\nz\n")
+
+    result = import_revenue_csv(db, stream, CsvColumnMapping(amount="amount"))
+
+    assert result.as_dict() == {
+        "success": True,
+        "created_count": 1,
+        "total_rows": 4,
+        "error_count": 3,
+        "errors": ["Row 1: invalid amount 'x'", "Row 2: invalid amount 'y'"],
+    }
+
+
+def test_missing_amount_column_is_rejected(db):
+    with pytest.raises(CsvImportError, match="not found"):
+        import_revenue_csv(db, io.StringIO("total\n1\n"), CsvColumnMapping(amount="amount"))
+
+
+def _fail_on_flush(db, after):
+    flushes = []
+
+    @event.listens_for(db, "before_flush")
+    def fail(session, flush_context, instances):
+        flushes.append(1)
+        if len(flushes) > after:
+            raise RuntimeError("disk full")
+
+
+def test_default_import_is_one_transaction(db):
+    commits = []
+    event.listen(db, "after_commit", lambda session: commits.append(1))
+    _fail_on_flush(db, after=1)
+    rows = "".join(f"{index}.50\n" for index in range(7))
+
+    with pytest.raises(CsvImportInterrupted, match="nothing was committed") as excinfo:
+        import_revenue_csv(
+            db, io.StringIO("amount\n" + rows), CsvColumnMapping(amount="amount"), batch_size=3
+        )
+
+    assert commits == []
+    assert excinfo.value.as_dict()["committed_count"] == 0
+    assert db.query(RevenueEvent).count() == 0
+    assert db.query(OutboxEvent).count() == 0
+
+
+def test_batched_import_reports_where_it_stopped(db):
+    _fail_on_flush(db, after=2)
+    rows = "x\n" + "".join(f"{index}.50\n" for index in range(8))
+
+    with pytest.raises(CsvImportInterrupted, match="resume after row 7") as excinfo:
+        import_revenue_csv(
+            db,
+            io.StringIO("amount\n" + rows),
+            CsvColumnMapping(amount="amount"),
+            batch_size=3,
+            commit_batches=True,
+        )
+
+    assert excinfo.value.as_dict()["committed_count"] == 6
+    assert excinfo.value.as_dict()["committed_through_row"] == 7
+    assert db.query(RevenueEvent).count() == 6
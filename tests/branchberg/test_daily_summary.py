@@ -0,0 +1,177 @@
+"""Tests for the incremental daily summary job."""
+import uuid
+from datetime import date, datetime, timedelta
+
+from branchberg.app.database import (
+    JobWatermark,
+    RevenueDailySummary,
+    RevenueEvent,
+    backfill_revenue_event_seq,
+)
+from branchberg.app.revenue_agent.config import AgentSettings
+from branchberg.app.revenue_agent.service import RevenueTrackingAgent
+from branchberg.app.revenue_agent.summaries import WATERMARK_NAME, business_day, fold_new_events
+
+NOW = datetime(2026, 3, 10, 12, 0, 0)  # 06:00 Central
+
+
+def _add_event(db, *, amount_cents, created_at, processed_at, entity="A+ Enterprise LLC"):
+    db.add(
+        RevenueEvent(
+            id=str(uuid.uuid4()),
+            event_id=f"evt_{uuid.uuid4().hex[:12]}",
+            provider="stripe",
+            event_type="charge.succeeded",
+            amount_cents=amount_cents,
+            currency="usd",
+            entity=entity,
+            event_metadata={},
+            created_at=created_at,
+            processed_at=processed_at,
+        )
+    )
+    db.commit()
+
+
+def _totals(db):
+    return {
+        (row.day, row.entity): (row.total_cents, row.event_count)
+        for row in db.query(RevenueDailySummary).all()
+    }
+
+
+def test_business_day_uses_central_time():
+    # 03:00 UTC on March 10 is still March 9 in Chicago.
+    assert business_day(datetime(2026, 3, 10, 3, 0)) == date(2026, 3, 9)
+    assert business_day(datetime(2026, 3, 10, 6, 0)) == date(2026, 3, 10)
+
+
+def test_fold_is_incremental_and_idempotent(db):
+    yesterday = datetime(2026, 3, 9, 18, 0)
+    _add_event(db, amount_cents=1000, created_at=yesterday, processed_at=yesterday)
+    _add_event(db, amount_cents=2500, created_at=yesterday, processed_at=yesterday)
+    _add_event(db, amount_cents=700, created_at=yesterday, processed_at=yesterday, entity=None)
+
+    first = fold_new_events(db)
+    assert first.events_folded == 3
+    assert _totals(db) == {
+        (date(2026, 3, 9), "A+ Enterprise LLC"): (3500, 2),
+        (date(2026, 3, 9), "unassigned"): (700, 1),
+    }
+
+    again = fold_new_events(db)
+    assert again.events_folded == 0
+    assert _totals(db)[(date(2026, 3, 9), "A+ Enterprise LLC")] == (3500, 2)
+
+
+def test_late_arrival_is_folded_into_its_own_day(db):
+    _add_event(db, amount_cents=1000, created_at=datetime(2026, 3, 9, 18), processed_at=datetime(2026, 3, 9, 18))
+    fold_new_events(db)
+
+    # A sale from March 2 delivered today.
+    late_processed = NOW - timedelta(minutes=30)
+    _add_event(db, amount_cents=4200, created_at=datetime(2026, 3, 2, 20), processed_at=late_processed)
+    result = fold_new_events(db)
+
+    assert result.events_folded == 1
+    assert _totals(db)[(date(2026, 3, 2), "A+ Enterprise LLC")] == (4200, 1)
+    assert _totals(db)[(date(2026, 3, 9), "A+ Enterprise LLC")] == (1000, 1)
+
+
+def test_event_stamped_before_the_watermark_but_committed_after_it_is_folded(db):
+    _add_event(db, amount_cents=500, created_at=NOW, processed_at=NOW)
+    assert fold_new_events(db).events_folded == 1
+
+    # Stamped earlier by a transaction that was slower to commit.
+    slow = NOW - timedelta(seconds=30)
+    _add_event(db, amount_cents=700, created_at=slow, processed_at=slow)
+    result = fold_new_events(db)
+    assert result.events_folded == 1
+    assert result.watermark == 2
+    assert _totals(db)[(date(2026, 3, 10), "A+ Enterprise LLC")] == (1200, 2)
+
+
+def test_watermark_ties_on_processed_at_are_not_skipped(db):
+    stamp = datetime(2026, 3, 9, 18)
+    for _ in range(5):
+        _add_event(db, amount_cents=100, created_at=stamp, processed_at=stamp)
+
+    assert fold_new_events(db, max_events=2).events_folded == 2
+    assert fold_new_events(db, max_events=2).events_folded == 2
+    assert fold_new_events(db).events_folded == 1
+    assert _totals(db)[(date(2026, 3, 9), "A+ Enterprise LLC")] == (500, 5)
+
+
+class RecordingNotifier:
+    def __init__(self):
+        self.summaries = []
+
+    def notify_summary(self, *, text, metadata=None):
+        self.summaries.append((text, metadata))
+
+
+def test_agent_job_sends_yesterdays_summary_once(db):
+    settings = AgentSettings(
+        safe_mode=False,
+        stripe_webhook_secret=None,
+        gumroad_webhook_secret=None,
+        slack_webhook_url=None,
+    )
+    agent = RevenueTrackingAgent(settings)
+    agent.notifier = RecordingNotifier()
+    _add_event(db, amount_cents=123456, created_at=datetime(2026, 3, 9, 18), processed_at=datetime(2026, 3, 9, 18))
+
+    agent.run_daily_summary_job(db, now=NOW)
+    agent.run_daily_summary_job(db, now=NOW + timedelta(hours=1))
+
+    assert len(agent.notifier.summaries) == 1
+    text, metadata = agent.notifier.summaries[0]
+    assert "1,234.56 USD" in text
+    assert metadata == {"day": "2026-03-09"}
+    assert db.query(JobWatermark).count() == 2
+
+
+def test_agent_job_is_noop_in_safe_mode(db):
+    settings = AgentSettings(
+        safe_mode=True,
+        stripe_webhook_secret=None,
+        gumroad_webhook_secret=None,
+        slack_webhook_url=None,
+    )
+    assert RevenueTrackingAgent(settings).run_daily_summary_job(db, now=NOW) is None
+    assert db.query(RevenueDailySummary).count() == 0
+
+
+def test_backfill_numbers_older_events_and_moves_the_watermark(db):
+    stamps = [datetime(2026, 3, 9, hour) for hour in (18, 19, 20)]
+    db.execute(
+        RevenueEvent.__table__.insert(),
+        [
+            {
+                "id": f"legacy_{index}",
+                "event_id": f"evt_legacy_{index}",
+                "provider": "stripe",
+                "event_type": "charge.succeeded",
+                "amount_cents": 100,
+                "currency": "USD",
+                "entity": "A+ Enterprise LLC",
+                "created_at": stamp,
+                "processed_at": stamp,
+            }
+            for index, stamp in reversed(list(enumerate(stamps)))
+        ],
+    )
+    # Folded up to the second event before `seq` existed.
+    db.add(JobWatermark(name=WATERMARK_NAME, processed_at=stamps[1], event_id="legacy_1"))
+    db.commit()
+
+    backfill_revenue_event_seq(db.get_bind())
+
+    db.expire_all()
+    assert [row.seq for row in db.query(RevenueEvent).order_by(RevenueEvent.processed_at)] == [-3, -2, -1]
+    assert db.get(JobWatermark, WATERMARK_NAME).seq == -2
+
+    _add_event(db, amount_cents=500, created_at=NOW, processed_at=NOW)
+    result = fold_new_events(db)
+    assert result.events_folded == 2
+    assert result.watermark == 1
@@ -0,0 +1,145 @@
+"""Tests for the dashboard's API client, history cache and CSV preview."""
+import io
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from branchberg.dashboard.api_client import ApiError, RevenueApiClient
+from branchberg.dashboard.csv_preview import iter_chunks, preview_csv
+from branchberg.dashboard.history import EventHistory
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = responses
+        self.calls = []
+
+    def request(self, method, url, timeout=None, **kwargs):
+        self.calls.append((method, url, kwargs))
+        outcome = self.responses[url.rsplit("/", 2)[-1]]
+        if isinstance(outcome, Exception):
+            raise outcome
+        status, payload = outcome
+        return SimpleNamespace(status_code=status, text=str(payload), json=lambda: payload)
+
+
+def test_reads_share_one_session():
+    session = FakeSession({"summary": (200, {"count": 2}), "events": (200, [{"id": "a"}])})
+    client = RevenueApiClient("http://api.test/", session=session)
+
+    assert client.get_revenue_summary() == {"count": 2}
+    assert client.get_revenue_events(limit=25) == [{"id": "a"}]
+    assert session.calls[1] == ("GET", "http://api.test/revenue/events", {"params": {"limit": 25}})
+
+
+def test_errors_raise_instead_of_returning_placeholders():
+    session = FakeSession({"summary": (500, "boom"), "events": requests.ConnectionError("refused")})
+    client = RevenueApiClient("http://api.test", session=session)
+
+    with pytest.raises(ApiError, match="500"):
+        client.get_revenue_summary()
+    with pytest.raises(ApiError, match="refused"):
+        client.get_revenue_events()
+
+
+class FakeEventsClient:
+    """Serves /revenue/events pages from a list, newest page then deltas."""
+
+    def __init__(self, events):
+        self.events = events
+        self.calls = []
+
+    def get_revenue_events_page(self, *, since=None, limit=250, fields=None):
+        assert "metadata" not in fields
+        self.calls.append((since, limit))
+        if since is None:
+            page = sorted(self.events, key=lambda event: event["created_at"], reverse=True)[:limit]
+            return page, str(len(self.events))
+        page = self.events[int(since):int(since) + limit]
+        return page, str(int(since) + len(page))
+
+
+def _event(index, created_at):
+    return {
+        "id": f"id_{index}",
+        "event_id": f"evt_{index}",
+        "created_at": created_at,
+        "amount_dollars": 1234.5,
+        "provider": "stripe",
+        "event_type": "sale",
+        "customer_email": None,
+        "entity": "A+ Enterprise LLC",
+    }
+
+
+def test_event_history_appends_only_deltas():
+    events = [_event(0, "2026-03-10T10:00:00"), _event(1, "2026-03-10T11:00:00")]
+    client = FakeEventsClient(events)
+    history = EventHistory(max_rows=3, page_size=2)
+
+    frame = history.refresh(client)
+    assert list(frame["Event ID"]) == ["evt_1", "evt_0"]
+    assert frame["Date"].iloc[0] == "2026-03-10 11:00"
+    assert frame["Amount"].iloc[0] == "$1,234.50"
+    assert frame["Email"].iloc[0] == "N/A"
+
+    events += [_event(2, "2026-03-10T12:00:00"), _event(3, "2026-03-09T09:00:00"), _event(4, "2026-03-10T13:00:00")]
+    frame = history.refresh(client)
+    assert client.calls[1:] == [("2", 2), ("4", 2)]
+    assert list(frame["Event ID"]) == ["evt_4", "evt_2", "evt_1"]
+    assert list(history.view(2).columns) == ["Date", "Amount", "Provider", "Type", "Email", "Entity", "Event ID"]
+
+
+def test_event_history_respects_min_interval_unless_forced():
+    now = [0.0]
+    client = FakeEventsClient([_event(0, "2026-03-10T10:00:00")])
+    history = EventHistory(min_interval_seconds=30, clock=lambda: now[0])
+
+    history.refresh(client)
+    history.refresh(client)
+    assert len(client.calls) == 1
+    history.refresh(client, force=True)
+    now[0] = 31
+    history.refresh(client)
+    assert len(client.calls) == 3
+
+
+def test_preview_reads_only_a_sample_and_rewinds():
+    body = b"\xef\xbb\xbfamount,email\n" + b"".join(b"%d.00,user@test.com\n" % index for index in range(10_000))
+    file = io.BytesIO(body)
+
+    columns, sample = preview_csv(file, sample_rows=3)
+
+    assert columns == ["amount", "email"]
+    assert list(sample["amount"]) == ["0.00", "1.00", "2.00"]
+    assert file.tell() == 0
+    assert b"".join(iter_chunks(file, chunk_size=4096)) == body
+
+
+def test_stream_csv_sends_chunks_and_drops_empty_mapping():
+    session = FakeSession({"stream": (200, {"created_count": 1})})
+    client = RevenueApiClient("http://api.test", session=session)
+
+    client.stream_csv(iter([b"amount\n", b"1\n"]), {"amount_column": "amount", "email_column": None})
+
+    method, url, kwargs = session.calls[0]
+    assert (method, url) == ("POST", "http://api.test/ingest/csv/stream")
+    assert kwargs["params"] == {"amount_column": "amount"}
+    assert b"".join(kwargs["data"]) == b"amount\n1\n"
+
+
+def test_events_frame_reads_arrow_stream():
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.ipc
+
+    sink = pa.BufferOutputStream()
+    table = pa.table({"event_id": ["evt_1"], "amount_cents": [250]})
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    body = sink.getvalue().to_pybytes()
+    session = SimpleNamespace(request=lambda method, url, **kwargs: SimpleNamespace(status_code=200, content=body))
+    client = RevenueApiClient("http://api.test", session=session)
+
+    frame = client.get_revenue_events_frame(columns=["event_id", "amount_cents"], provider="stripe")
+    assert frame.to_dict("records") == [{"event_id": "evt_1", "amount_cents": 250}]
@@ -0,0 +1,91 @@
+"""Tests for the composite dashboard snapshot endpoint."""
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from branchberg.app.database import RevenueEvent
+
+
+def _add(db, *, amount_cents, provider, entity, created_at):
+    db.add(
+        RevenueEvent(
+            id=str(uuid.uuid4()),
+            event_id=f"evt_{uuid.uuid4().hex[:12]}",
+            provider=provider,
+            event_type="sale",
+            amount_cents=amount_cents,
+            currency="USD",
+            entity=entity,
+            event_metadata={},
+            created_at=created_at,
+            processed_at=created_at,
+        )
+    )
+
+
+def _seed(session_factory):
+    today = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+    db = session_factory()
+    _add(db, amount_cents=1000, provider="stripe", entity="A+ Enterprise LLC", created_at=today)
+    _add(db, amount_cents=2500, provider="stripe", entity="A+ Enterprise LLC", created_at=today - timedelta(days=1))
+    _add(db, amount_cents=700, provider="gumroad", entity=None, created_at=today - timedelta(days=1))
+    _add(db, amount_cents=9900, provider="manual", entity="Legacy Unchained Inc", created_at=today - timedelta(days=90))
+    db.commit()
+    db.close()
+    return today
+
+
+def test_snapshot_returns_all_sections(client, session_factory):
+    today = _seed(session_factory)
+
+    response = client.get("/dashboard/snapshot", params={"events_limit": 2, "days": 7})
+    assert response.status_code == 200
+    body = response.json()
+
+    assert body["totals"] == {"total_cents": 14100, "total_dollars": 141.0, "count": 4, "currency": "USD"}
+    assert [(row["provider"], row["entity"], row["total_cents"]) for row in body["breakdown"]] == [
+        ("manual", "Legacy Unchained Inc", 9900),
+        ("stripe", "A+ Enterprise LLC", 3500),
+        ("gumroad", None, 700),
+    ]
+    assert body["timeseries"] == [
+        {"day": (today - timedelta(days=1)).date().isoformat(), "total_cents": 3200, "count": 2},
+        {"day": today.date().isoformat(), "total_cents": 1000, "count": 1},
+    ]
+    assert [event["amount_cents"] for event in body["recent_events"]] == [1000, 2500]
+
+
+def test_snapshot_supports_conditional_requests(client, session_factory):
+    _seed(session_factory)
+
+    first = client.get("/dashboard/snapshot")
+    etag = first.headers["etag"]
+    assert "max-age" in first.headers["cache-control"]
+
+    unchanged = client.get("/dashboard/snapshot", headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+
+    db = session_factory()
+    _add(db, amount_cents=100, provider="stripe", entity=None, created_at=datetime.utcnow())
+    db.commit()
+    db.close()
+    changed = client.get("/dashboard/snapshot", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+def test_snapshot_runs_a_fixed_number_of_queries(client, session_factory, db_engine):
+    _seed(session_factory)
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    event.listen(db_engine, "before_cursor_execute", count)
+    try:
+        assert client.get("/dashboard/snapshot").status_code == 200
+    finally:
+        event.remove(db_engine, "before_cursor_execute", count)
+    assert len(statements) == 3
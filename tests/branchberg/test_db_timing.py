@@ -0,0 +1,52 @@
+"""Tests for the shared statement-timing hook."""
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from branchberg.app import db_timing
+
+
+@pytest.fixture()
+def recorded():
+    timings = []
+    db_timing.subscribe(timings.append)
+    yield timings
+    db_timing.unsubscribe(timings.append)
+
+
+def test_each_statement_reaches_every_subscriber_once(recorded):
+    engine = create_engine("sqlite://")
+    other = []
+    db_timing.subscribe(other.append)
+    db_timing.subscribe(other.append)  # idempotent
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    finally:
+        db_timing.unsubscribe(other.append)
+
+    assert [timing.statement for timing in recorded] == ["SELECT 1"]
+    assert [timing.statement for timing in other] == ["SELECT 1"]
+    assert recorded[0].seconds >= 0
+
+
+def test_failed_and_nested_statements_keep_timings_apart(recorded):
+    engine = create_engine("sqlite://")
+
+    def nested(timing):
+        if timing.statement == "SELECT 1":
+            timing.conn.execute(text("SELECT 2"))
+
+    db_timing.subscribe(nested)
+    try:
+        with engine.connect() as conn:
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM missing"))
+            conn.execute(text("SELECT 1"))
+            assert conn.info[db_timing._QUERY_START] == []
+    finally:
+        db_timing.unsubscribe(nested)
+
+    # The statement run from a subscriber gets its own timing.
+    assert [timing.statement for timing in recorded] == ["SELECT 1", "SELECT 2"]
+    assert recorded[0].started < recorded[1].started
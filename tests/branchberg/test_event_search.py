@@ -0,0 +1,188 @@
+"""Tests for full-text search over revenue events."""
+import uuid
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.orm import sessionmaker
+
+from branchberg.app.database import Base, RevenueEvent, backfill_revenue_event_seq
+from branchberg.app.search import (
+    LEGACY_SEARCH_TABLE,
+    SEARCH_TABLE,
+    SearchUnavailable,
+    drop_search_index,
+    ensure_search_index,
+    search_event_ids,
+)
+
+
+def _add(db, event_id, *, metadata=None, email=None):
+    record = RevenueEvent(
+        id=str(uuid.uuid4()),
+        event_id=event_id,
+        provider="manual",
+        event_type="csv_import",
+        amount_cents=1000,
+        currency="USD",
+        customer_email=email,
+        event_metadata=metadata or {},
+        created_at=datetime(2026, 3, 1),
+        processed_at=datetime(2026, 3, 1),
+    )
+    db.add(record)
+    return record
+
+
+def _search(client, q, **params):
+    response = client.get("/revenue/events/search", params={"q": q, **params})
+    assert response.status_code == 200, response.text
+    return [hit["event_id"] for hit in response.json()]
+
+
+def test_search_matches_descriptions_emails_and_metadata_fragments(client, session_factory):
+    db = session_factory()
+    _add(db, "csv_1", metadata={"description": "March consulting retainer"})
+    _add(db, "csv_2", metadata={"description": "Consulting workshop, consulting follow-up"})
+    _add(db, "gumroad_a", metadata={"gumroad": {"product_id": "xQz9ProdLaunch", "order_number": 4411}})
+    _add(db, "csv_3", email="finance@legacy-unchained.com")
+    db.commit()
+
+    assert _search(client, "consulting") == ["csv_2", "csv_1"]  # more hits rank higher
+    assert _search(client, "consulting retainer") == ["csv_1"]
+    assert _search(client, "ProdLaun") == ["gumroad_a"]
+    assert _search(client, "4411") == ["gumroad_a"]
+    assert _search(client, "legacy-unchained") == ["csv_3"]
+    assert _search(client, "consulting", limit=1, offset=1) == ["csv_1"]
+
+    hit = client.get("/revenue/events/search", params={"q": "retainer", "fields": "event_id"}).json()
+    assert list(hit[0]) == ["event_id", "score"]
+
+
+def test_index_follows_updates_and_deletes(client, session_factory):
+    db = session_factory()
+    record = _add(db, "csv_1", metadata={"description": "old text"})
+    db.commit()
+    record.event_metadata = {"description": "new wording"}
+    db.commit()
+    assert _search(client, "wording") == ["csv_1"]
+    assert _search(client, "old text") == []
+
+    db.delete(record)
+    db.commit()
+    assert _search(client, "wording") == []
+    db.close()
+
+
+def test_existing_rows_are_backfilled_when_the_index_is_added(session_factory, client):
+    db = session_factory()
+    db.execute(text(f"DROP TABLE {SEARCH_TABLE}"))
+    db.execute(text("DROP TRIGGER revenue_events_search_insert"))
+    _add(db, "csv_legacy", metadata={"description": "pre-index invoice"})
+    db.commit()
+    ensure_search_index(db.get_bind())
+    db.close()
+
+    assert _search(client, "pre-index") == ["csv_legacy"]
+
+
+def test_rows_without_a_seq_are_indexed_once_numbered(session_factory, client):
+    db = session_factory()
+    db.execute(
+        RevenueEvent.__table__.insert(),
+        [
+            {
+                "id": "legacy_1",
+                "event_id": "evt_legacy",
+                "provider": "manual",
+                "event_type": "csv_import",
+                "amount_cents": 100,
+                "event_metadata": {"description": "legacy retainer"},
+            }
+        ],
+    )
+    db.commit()
+    assert _search(client, "retainer") == []
+
+    backfill_revenue_event_seq(db.get_bind())
+    _add(db, "csv_1", metadata={"description": "new retainer"})
+    db.commit()
+    db.close()
+    assert sorted(_search(client, "retainer")) == ["csv_1", "evt_legacy"]
+
+
+def test_short_queries_are_rejected(client, session_factory):
+    assert client.get("/revenue/events/search", params={"q": "ab"}).status_code == 422
+    assert client.get("/revenue/events/search", params={"q": "ab cd"}).status_code == 422
+
+
+def test_index_is_keyed_by_seq_not_the_table_rowid(client, session_factory):
+    db = session_factory()
+    _add(db, "csv_1", metadata={"description": "consulting retainer"})
+    _add(db, "csv_2", metadata={"description": "workshop seats"})
+    db.commit()
+    # What VACUUM may do to a table keyed by a String column.
+    db.execute(text("UPDATE revenue_events SET rowid = 1000 - rowid"))
+    db.commit()
+    db.close()
+
+    assert _search(client, "retainer") == ["csv_1"]
+    assert _search(client, "workshop") == ["csv_2"]
+
+
+def test_updates_and_deletes_probe_the_index_by_rowid(session_factory):
+    db = session_factory()
+    triggers = dict(
+        db.execute(text("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'")).all()
+    )
+    db.close()
+
+    for name in ("revenue_events_search_delete", "revenue_events_search_update"):
+        assert f"DELETE FROM {SEARCH_TABLE} WHERE rowid = old.seq" in triggers[name]
+
+
+def test_legacy_id_keyed_index_is_replaced(session_factory, client):
+    db = session_factory()
+    _add(db, "csv_1", metadata={"description": "consulting retainer"})
+    db.commit()
+    conn = db.connection()
+    drop_search_index(conn)
+    conn.exec_driver_sql(
+        f"CREATE VIRTUAL TABLE {LEGACY_SEARCH_TABLE} USING fts5("
+        "revenue_event_id UNINDEXED, description, customer_email, refs, tokenize = 'trigram')"
+    )
+    conn.exec_driver_sql(
+        "CREATE TRIGGER revenue_events_fts_insert AFTER INSERT ON revenue_events BEGIN "
+        f"INSERT INTO {LEGACY_SEARCH_TABLE}(revenue_event_id) VALUES (new.id); END"
+    )
+    db.commit()
+    ensure_search_index(db.get_bind())
+    legacy = db.execute(
+        text("SELECT name FROM sqlite_master WHERE name LIKE 'revenue_events_fts%'")
+    ).all()
+    db.close()
+
+    assert legacy == []
+    assert _search(client, "retainer") == ["csv_1"]
+
+
+def test_search_is_unavailable_without_trigram_support(sqlite_engine):
+    @event.listens_for(sqlite_engine, "before_cursor_execute", retval=True)
+    def no_trigram(conn, cursor, statement, parameters, context, executemany):
+        return statement.replace("'trigram'", "'no_such_tokenizer'"), parameters
+
+    Base.metadata.create_all(bind=sqlite_engine)  # the after_create hook must not fail
+    ensure_search_index(sqlite_engine)
+    session = sessionmaker(bind=sqlite_engine)()
+    with pytest.raises(SearchUnavailable):
+        search_event_ids(session, "retainer")
+    session.close()
+
+
+def test_search_returns_503_without_an_index(session_factory, client):
+    with session_factory() as db:
+        drop_search_index(db.connection())
+        db.commit()
+
+    response = client.get("/revenue/events/search", params={"q": "retainer"})
+    assert response.status_code == 503
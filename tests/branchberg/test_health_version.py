@@ -25,3 +25,29 @@ def test_version_includes_version_field(client):
     assert response.status_code == 200
     data = response.json()
     assert "version" in data
+
+
+def test_version_is_resolved_once_per_process(client, monkeypatch):
+    """Version metadata is read at startup, not on every request."""
+    from branchberg.app import main
+
+    def fail():
+        raise AssertionError("pyproject.toml re-read on request")
+
+    monkeypatch.setattr(main, "resolve_version", fail)
+    data = client.get("/version").json()
+    assert data["version"] == main.BUILD_INFO["version"] == main.app.version
+
+
+def test_api_import_does_not_load_heavy_dependencies():
+    """Cold start stays lean: heavy libraries load on first use only."""
+    import json
+    import subprocess
+    import sys
+
+    code = (
+        "import json, sys; import branchberg.app.main; "
+        "print(json.dumps([m for m in ('pandas', 'pyarrow', 'stripe', 'reportlab', 'requests') if m in sys.modules]))"
+    )
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert json.loads(output.strip().splitlines()[-1]) == []
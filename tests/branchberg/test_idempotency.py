@@ -0,0 +1,108 @@
+"""Tests for Idempotency-Key handling on PO/invoice/payment writes."""
+from branchberg.app.database import AuditLog, Invoice, PurchaseOrder
+from branchberg.app.idempotency import IN_PROGRESS, MISMATCH, IdempotencyStore, StoredResponse
+from branchberg.app.main import IDEMPOTENCY_STORE
+
+
+PO_PAYLOAD = {
+    "po_number": "PO-IDEM-1",
+    "customer_name": "Acme Corp",
+    "amount": 500.00,
+    "entity": "A+ Enterprise LLC",
+}
+
+
+def test_store_expires_entries_after_ttl():
+    now = [0.0]
+    store = IdempotencyStore(ttl_seconds=10, clock=lambda: now[0])
+    response = StoredResponse(status=200, headers=[], body=b"{}")
+
+    assert store.begin("k", "fp") is None
+    assert store.begin("k", "fp") == IN_PROGRESS
+    store.complete("k", response)
+    assert store.begin("k", "fp") is response
+    assert store.begin("k", "other") == MISMATCH
+
+    now[0] = 11.0
+    assert len(store) == 0
+    assert store.begin("k", "other") is None
+
+
+def test_store_is_bounded():
+    store = IdempotencyStore(max_entries=2)
+    for key in ("a", "b", "c"):
+        store.begin(key, "fp")
+    assert len(store) == 2
+    assert store.begin("a", "fp") is None
+
+
+def test_retried_po_replays_stored_response(client, session_factory):
+    headers = {"Idempotency-Key": "po-retry-1"}
+    first = client.post("/po", json=PO_PAYLOAD, headers=headers)
+    second = client.post("/po", json=PO_PAYLOAD, headers=headers)
+
+    assert first.status_code == 200
+    assert second.status_code == 200
+    assert second.json() == first.json()
+    assert second.headers["idempotent-replayed"] == "true"
+
+    db = session_factory()
+    try:
+        assert db.query(PurchaseOrder).count() == 1
+        assert db.query(AuditLog).count() == 1
+    finally:
+        db.close()
+
+    # Without a key the retry still hits the uniqueness constraint.
+    assert client.post("/po", json=PO_PAYLOAD).status_code == 409
+
+
+def test_retried_invoice_does_not_create_second_invoice(client, session_factory):
+    po_id = client.post("/po", json={**PO_PAYLOAD, "po_number": "PO-IDEM-2"}).json()["id"]
+    invoice_payload = {"invoice_number": "INV-IDEM-2", "amount": 500.00, "status": "sent"}
+    headers = {"Idempotency-Key": "invoice-retry-2"}
+
+    first = client.post(f"/po/{po_id}/invoice", json=invoice_payload, headers=headers)
+    second = client.post(f"/po/{po_id}/invoice", json=invoice_payload, headers=headers)
+    assert first.status_code == 200
+    assert second.json()["id"] == first.json()["id"]
+
+    db = session_factory()
+    try:
+        assert db.query(Invoice).count() == 1
+    finally:
+        db.close()
+
+
+def test_key_reused_with_different_body_is_rejected(client):
+    headers = {"Idempotency-Key": "po-reuse-3"}
+    assert client.post("/po", json={**PO_PAYLOAD, "po_number": "PO-IDEM-3"}, headers=headers).status_code == 200
+
+    response = client.post("/po", json={**PO_PAYLOAD, "po_number": "PO-IDEM-4"}, headers=headers)
+    assert response.status_code == 422
+    assert "Idempotency-Key" in response.json()["detail"]
+
+
+def test_validation_errors_are_replayed_too(client):
+    headers = {"Idempotency-Key": "po-invalid-5"}
+    payload = {**PO_PAYLOAD, "po_number": "PO-IDEM-5", "status": "paid"}
+
+    first = client.post("/po", json=payload, headers=headers)
+    second = client.post("/po", json=payload, headers=headers)
+    assert first.status_code == 422
+    assert second.status_code == 422
+    assert second.headers["idempotent-replayed"] == "true"
+
+
+def test_keys_are_scoped_per_route(client):
+    IDEMPOTENCY_STORE.release("/po\nshared-key")
+    headers = {"Idempotency-Key": "shared-key"}
+    po_id = client.post("/po", json={**PO_PAYLOAD, "po_number": "PO-IDEM-6"}, headers=headers).json()["id"]
+
+    response = client.post(
+        f"/po/{po_id}/invoice",
+        json={"invoice_number": "INV-IDEM-6", "amount": 500.00, "status": "sent"},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert response.json()["po_id"] == po_id
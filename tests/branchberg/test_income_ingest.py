@@ -195,6 +195,47 @@ user1@test.com,A+ Enterprise LLC"""
     assert "not found in CSV" in response.json()["detail"]
 
 
+def test_csv_stream_upload(client, test_db):
+    """Test raw-body CSV upload sent in chunks."""
+    csv_content = (
+        "amount,currency,email,description\n"
+        '"$1,200.00",usd,user1@test.com,Retainer\n'
+        "not-a-number,,,\n"
+        "0.29,,,\n"
+    ).encode()
+
+    def chunks():
+        for start in range(0, len(csv_content), 7):
+            yield csv_content[start:start + 7]
+
+    response = client.post(
+        "/ingest/csv/stream",
+        params={"amount_column": "amount", "currency_column": "currency", "description_column": "description"},
+        content=chunks(),
+        headers={"Content-Type": "text/csv"},
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["created_count"] == 2
+    assert result["total_rows"] == 3
+    assert result["error_count"] == 1
+    assert result["errors"][0].startswith("Row 2:")
+
+    events = client.get("/revenue/events").json()
+    assert sorted(event["amount_cents"] for event in events) == [29, 120000]
+
+
+def test_csv_stream_upload_missing_column(client, test_db):
+    """Test raw-body CSV upload with missing required column."""
+    response = client.post("/ingest/csv/stream", params={"amount_column": "amount"}, content=b"email\nx@test.com\n")
+    assert response.status_code == 400
+    assert "not found in CSV" in response.json()["detail"]
+
+    response = client.post("/ingest/csv/stream", params={"amount_column": "amount"}, content=b"")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "CSV file is empty"
+
+
 def test_webhook_endpoints_exist(client):
     """Test that webhook endpoints exist (even if not implemented)."""
     response = client.post("/webhooks/stripe")
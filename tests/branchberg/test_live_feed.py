@@ -0,0 +1,167 @@
+"""Tests for the live revenue feed (SSE over the outbox)."""
+import asyncio
+import json
+
+from branchberg.app import main
+from branchberg.app.live_feed import LiveFeed, stream_frames
+from branchberg.app.outbox import TOPIC_PO_TRANSITION, TOPIC_REVENUE_EVENT, enqueue
+from branchberg.app.revenue_agent.repository import RevenueEventIngest, insert_revenue_event_idempotent
+
+
+def _ingest(session_factory, *event_ids):
+    db = session_factory()
+    try:
+        for event_id in event_ids:
+            insert_revenue_event_idempotent(
+                db,
+                RevenueEventIngest(
+                    event_id=event_id, provider="stripe", event_type="charge.succeeded", amount_cents=500
+                ),
+            )
+    finally:
+        db.close()
+
+
+def _transition(session_factory, po_id):
+    db = session_factory()
+    enqueue(db, TOPIC_PO_TRANSITION, {"po_id": po_id, "to_state": "paid"}, key=po_id)
+    db.commit()
+    db.close()
+
+
+def _event_ids(frames):
+    return [json.loads(frame.data.decode().split("data: ", 1)[1])["payload"]["event_id"] for frame in frames]
+
+
+def test_new_events_fan_out_to_every_viewer_once_encoded(session_factory):
+    async def scenario():
+        feed = LiveFeed(session_factory)
+        first = await feed.subscribe()
+        second = await feed.subscribe(topics=frozenset({TOPIC_REVENUE_EVENT}))
+
+        _ingest(session_factory, "evt_a", "evt_b")
+        _transition(session_factory, "po_1")
+        assert await feed.poll_once() == 3
+
+        first_frames = [first.queue.get_nowait() for _ in range(3)]
+        second_frames = [second.queue.get_nowait() for _ in range(2)]
+        assert [frame.topic for frame in first_frames] == [TOPIC_REVENUE_EVENT] * 2 + [TOPIC_PO_TRANSITION]
+        assert second.queue.empty()
+        assert first_frames[0].data is second_frames[0].data
+        assert first_frames[0].data.startswith(b"id: 1\nevent: revenue_event.created\ndata: ")
+        await feed.close()
+
+    asyncio.run(scenario())
+
+
+def test_overlapping_polls_do_not_publish_a_frame_twice(session_factory):
+    async def scenario():
+        feed = LiveFeed(session_factory)
+        viewer = await feed.subscribe()
+        _ingest(session_factory, "evt_a", "evt_b")
+
+        frames = await asyncio.to_thread(feed._read_new, (0, 0))
+        feed.publish(frames)
+        feed.publish(frames)  # a second poll that read from the same cursor
+
+        assert viewer.queue.qsize() == 2
+        assert [frame.id for frame in feed._buffer] == [1, 2]
+        await feed.close()
+
+    asyncio.run(scenario())
+
+
+def test_resume_from_buffer_and_from_database(session_factory):
+    _ingest(session_factory, "evt_old_1", "evt_old_2")
+
+    async def scenario():
+        feed = LiveFeed(session_factory, buffer_size=2)
+        watcher = await feed.subscribe()  # starts at the tail (id 2)
+        _ingest(session_factory, "evt_3", "evt_4", "evt_5")
+        await feed.poll_once()
+
+        from_buffer = await feed.subscribe(after=(0, 3))
+        assert _event_ids(from_buffer.backlog) == ["evt_4", "evt_5"]
+
+        from_db = await feed.subscribe(after=(0, 0))
+        assert _event_ids(from_db.backlog) == ["evt_old_1", "evt_old_2", "evt_3", "evt_4", "evt_5"]
+
+        caught_up = await feed.subscribe(after=(0, 5))
+        assert caught_up.backlog == []
+        assert feed.viewer_count == 4
+        feed.unsubscribe(watcher)
+        await feed.close()
+
+    asyncio.run(scenario())
+
+
+def test_slow_viewer_is_dropped_instead_of_buffered(session_factory):
+    async def scenario():
+        feed = LiveFeed(session_factory, queue_size=2)
+        slow = await feed.subscribe()
+        _ingest(session_factory, "evt_1", "evt_2", "evt_3")
+        await feed.poll_once()
+
+        assert slow.dropped
+        assert feed.viewer_count == 0
+        chunks = [chunk async for chunk in stream_frames(feed, slow)]
+        assert chunks[0].startswith(b"retry:")
+        assert len(chunks) == 2  # one frame got through before the close marker
+        await feed.close()
+
+    asyncio.run(scenario())
+
+
+def test_endpoint_streams_sse_and_honours_last_event_id(session_factory, monkeypatch):
+    feed = LiveFeed(session_factory, poll_seconds=0.01)
+    monkeypatch.setattr(main, "LIVE_FEED", feed)
+    _ingest(session_factory, "evt_1", "evt_2")
+
+    async def scenario():
+        disconnect = asyncio.Event()
+        body = bytearray()
+        start = {}
+
+        async def receive():
+            await disconnect.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                body.extend(message.get("body", b""))
+                if body.count(b"\nevent: ") >= 3:
+                    disconnect.set()
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": "/live/revenue",
+            "raw_path": b"/live/revenue",
+            "root_path": "",
+            "query_string": b"",
+            "headers": [(b"host", b"testserver"), (b"last-event-id", b"0")],
+            "client": ("127.0.0.1", 1234),
+            "server": ("testserver", 80),
+        }
+
+        async def new_sale():
+            await asyncio.sleep(0.05)
+            await asyncio.to_thread(_ingest, session_factory, "evt_live")
+
+        sale = asyncio.create_task(new_sale())
+        await asyncio.wait_for(main.app(scope, receive, send), timeout=5)
+        await sale
+        await feed.close()
+        return start, bytes(body)
+
+    start, body = asyncio.run(scenario())
+    assert start["status"] == 200
+    assert dict(start["headers"])[b"content-type"].startswith(b"text/event-stream")
+    events = [chunk for chunk in body.split(b"\n\n") if chunk.startswith(b"id: ")]
+    assert [chunk.split(b"\n")[0] for chunk in events[:3]] == [b"id: 1", b"id: 2", b"id: 3"]
+    assert b'"event_id":"evt_live"' in events[2]
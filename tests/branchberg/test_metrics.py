@@ -0,0 +1,89 @@
+"""Tests for the Prometheus-style /metrics endpoint."""
+import io
+
+import pytest
+
+from branchberg.app import metrics
+from branchberg.app.revenue_agent.config import AgentSettings
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram("test_seconds", "Test.", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, route="/a")
+    histogram.observe(0.5, route="/a")
+    histogram.observe(5, route="/a")
+
+    lines = list(histogram.samples())
+    assert 'test_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 'test_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{route="/a"} 3' in lines
+    assert histogram.sum(route="/a") == pytest.approx(5.55)
+
+
+def test_label_values_are_escaped():
+    counter = metrics.Counter("test_total", "Test.", ("path",))
+    counter.inc(path='a"b\\c')
+    assert list(counter.samples()) == ['test_total{path="a\\"b\\\\c"} 1']
+
+
+def test_metrics_endpoint_reports_route_templates_and_db_work(client):
+    before = metrics.REQUEST_DURATION.count(method="GET", route="/revenue/events", status="200")
+    client.get("/revenue/events")
+    client.post("/po/does-not-exist/invoice", json={})
+
+    assert metrics.REQUEST_DURATION.count(method="GET", route="/revenue/events", status="200") == before + 1
+    assert metrics.REQUEST_DB_QUERIES.sum(route="/revenue/events") >= 1
+
+    res = client.get("/metrics")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = res.text
+    assert "# TYPE http_request_duration_seconds histogram" in text
+    assert 'route="/po/{po_id}/invoice"' in text
+    assert "/po/does-not-exist" not in text
+    assert "db_query_duration_seconds_count" in text
+    assert "db_pool_size" in text
+    # The scrape itself is not recorded.
+    assert 'route="/metrics"' not in text
+
+
+def test_webhook_outcomes_are_counted(client, monkeypatch):
+    import branchberg.app.main as main_module
+
+    settings = AgentSettings(
+        safe_mode=True, stripe_webhook_secret="whsec", gumroad_webhook_secret=None, slack_webhook_url=None
+    )
+    monkeypatch.setattr(main_module, "AGENT_SETTINGS", settings, raising=True)
+    labels = {"provider": "stripe", "status": "safe_mode", "outcome": "safe_mode"}
+    before = metrics.WEBHOOK_EVENTS.value(**labels)
+
+    client.post("/webhooks/stripe", content=b"{}", headers={"Stripe-Signature": "t=1,v1=abc"})
+
+    assert metrics.WEBHOOK_EVENTS.value(**labels) == before + 1
+
+
+def test_record_webhook_splits_created_and_duplicate():
+    created = metrics.WEBHOOK_EVENTS.value(provider="gumroad", status="ok", outcome="created")
+    duplicate = metrics.WEBHOOK_EVENTS.value(provider="gumroad", status="ok", outcome="duplicate")
+
+    metrics.record_webhook("gumroad", "ok", True)
+    metrics.record_webhook("gumroad", "ok", False)
+
+    assert metrics.WEBHOOK_EVENTS.value(provider="gumroad", status="ok", outcome="created") == created + 1
+    assert metrics.WEBHOOK_EVENTS.value(provider="gumroad", status="ok", outcome="duplicate") == duplicate + 1
+
+
+def test_csv_import_throughput_is_recorded(client):
+    created = metrics.CSV_ROWS.value(result="created")
+    imports = metrics.CSV_ROWS_PER_SECOND.count()
+
+    res = client.post(
+        "/ingest/csv",
+        files={"file": ("rows.csv", io.BytesIO(b"amount\n10.00\n20.00\nnope\n"), "text/csv")},
+        data={"amount_column": "amount"},
+    )
+    assert res.status_code == 200
+
+    assert metrics.CSV_ROWS.value(result="created") == created + 2
+    assert metrics.CSV_ROWS_PER_SECOND.count() == imports + 1
@@ -0,0 +1,315 @@
+"""Tests for the transactional outbox and its dispatcher."""
+import hashlib
+import hmac
+import json
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+from sqlalchemy import create_mock_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from branchberg.app.database import CURRENT_TXID, OutboxCursor, OutboxEvent, committed_after
+from branchberg.app.outbox import (
+    TOPIC_PAYMENT,
+    TOPIC_PO_TRANSITION,
+    TOPIC_REVENUE_EVENT,
+    HttpSubscriber,
+    NotifierSubscriber,
+    OutboxConfigError,
+    OutboxDispatcher,
+    _stamp_outbox_txids,
+    parse_subscribers,
+)
+from branchberg.app.revenue_agent.repository import RevenueEventIngest, insert_revenue_event_idempotent
+
+NOW = datetime(2026, 3, 10, 12, 0, 0)
+
+
+class StubReceiver:
+    """Local HTTP endpoint that records batches and fails on demand."""
+
+    def __init__(self):
+        self.batches = []
+        self.signatures = []
+        self.fail_next = 0
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                if receiver.fail_next:
+                    receiver.fail_next -= 1
+                    self.send_response(503)
+                else:
+                    receiver.batches.append(json.loads(body))
+                    receiver.signatures.append((self.headers.get("X-Outbox-Signature"), body))
+                    self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = HTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/hook"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def event_ids(self):
+        return [event["id"] for batch in self.batches for event in batch["events"]]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture()
+def receiver():
+    stub = StubReceiver()
+    yield stub
+    stub.close()
+
+
+def _ingest(session_factory, count, *, start=0):
+    db = session_factory()
+    try:
+        for index in range(start, start + count):
+            insert_revenue_event_idempotent(
+                db,
+                RevenueEventIngest(
+                    event_id=f"evt_{index}",
+                    provider="stripe",
+                    event_type="charge.succeeded",
+                    amount_cents=1000 + index,
+                    entity="A+ Enterprise LLC",
+                ),
+            )
+    finally:
+        db.close()
+
+
+def test_insert_writes_one_outbox_row_per_new_event(session_factory):
+    _ingest(session_factory, 3)
+    _ingest(session_factory, 3)  # duplicate deliveries
+
+    db = session_factory()
+    rows = db.query(OutboxEvent).order_by(OutboxEvent.id).all()
+    assert [row.topic for row in rows] == [TOPIC_REVENUE_EVENT] * 3
+    assert [row.payload["event_id"] for row in rows] == ["evt_0", "evt_1", "evt_2"]
+    db.close()
+
+
+@pytest.mark.parametrize("dialect, stamped", [("postgresql", True), ("sqlite", False)])
+def test_outbox_rows_record_their_transaction_on_postgres(dialect, stamped):
+    row = OutboxEvent(topic=TOPIC_PAYMENT, payload={})
+    connection = SimpleNamespace(dialect=SimpleNamespace(name=dialect))
+    session = SimpleNamespace(new=[row, object()], connection=lambda: connection)
+
+    _stamp_outbox_txids(session, None, None)
+
+    assert (row.txid is CURRENT_TXID) == stamped
+
+
+def test_postgres_reads_stop_at_the_oldest_transaction_in_flight():
+    engine = create_mock_engine("postgresql://", lambda *args, **kwargs: None)
+    query = committed_after(
+        Session(bind=engine).query(OutboxEvent), OutboxEvent.txid, OutboxEvent.id, (7, 3)
+    )
+
+    sql = str(query.statement.compile(dialect=postgresql.dialect()))
+    assert "WHERE (outbox_events.txid, outbox_events.id) > (" in sql
+    assert "outbox_events.txid < pg_snapshot_xmin(pg_current_snapshot())::text::bigint" in sql
+    assert sql.endswith("ORDER BY outbox_events.txid, outbox_events.id")
+
+
+def test_cursor_follows_commit_order_not_id_order(session_factory, receiver):
+    # On Postgres a lower id can commit after a higher one; txid orders them.
+    db = session_factory()
+    db.add_all([OutboxEvent(id=5, txid=10, topic=TOPIC_PAYMENT, payload={}, created_at=NOW)])
+    db.commit()
+    dispatcher = OutboxDispatcher(session_factory, [HttpSubscriber("erp", receiver.url)])
+    assert dispatcher.dispatch_once(NOW) == {"erp": 1}
+
+    db.add_all([OutboxEvent(id=3, txid=11, topic=TOPIC_PAYMENT, payload={}, created_at=NOW)])
+    db.commit()
+    db.close()
+    assert dispatcher.dispatch_once(NOW) == {"erp": 1}
+    assert receiver.event_ids == [5, 3]
+
+
+def test_dispatcher_delivers_batches_and_advances_cursor(session_factory, receiver):
+    _ingest(session_factory, 5)
+    subscriber = HttpSubscriber("erp", receiver.url, secret="s3cret")
+    dispatcher = OutboxDispatcher(session_factory, [subscriber], batch_size=2)
+
+    assert dispatcher.dispatch_once(NOW) == {"erp": 5}
+    assert [len(batch["events"]) for batch in receiver.batches] == [2, 2, 1]
+    assert receiver.event_ids == [1, 2, 3, 4, 5]
+    assert receiver.batches[0]["events"][0]["payload"]["event_id"] == "evt_0"
+
+    signature, body = receiver.signatures[0]
+    assert signature == hmac.new(b"s3cret", body, hashlib.sha256).hexdigest()
+
+    assert dispatcher.dispatch_once(NOW) == {"erp": 0}
+    _ingest(session_factory, 1, start=5)
+    assert dispatcher.dispatch_once(NOW) == {"erp": 1}
+    assert receiver.event_ids[-1] == 6
+
+
+def test_failing_subscriber_retries_with_backoff_without_blocking_others(session_factory, receiver):
+    _ingest(session_factory, 3)
+    healthy = StubReceiver()
+    try:
+        dispatcher = OutboxDispatcher(
+            session_factory,
+            [HttpSubscriber("flaky", receiver.url), HttpSubscriber("healthy", healthy.url)],
+            backoff_seconds=10,
+        )
+        receiver.fail_next = 2
+
+        assert dispatcher.dispatch_once(NOW) == {"flaky": 0, "healthy": 3}
+        db = session_factory()
+        cursor = db.get(OutboxCursor, "flaky")
+        assert cursor.attempts == 1
+        assert cursor.next_attempt_at == NOW + timedelta(seconds=10)
+        assert "503" in cursor.last_error
+        db.close()
+
+        # Still backing off, then a second failure doubles the delay.
+        assert dispatcher.dispatch_once(NOW + timedelta(seconds=5)) == {"flaky": 0, "healthy": 0}
+        dispatcher.dispatch_once(NOW + timedelta(seconds=10))
+        db = session_factory()
+        assert db.get(OutboxCursor, "flaky").next_attempt_at == NOW + timedelta(seconds=30)
+        db.close()
+
+        assert dispatcher.dispatch_once(NOW + timedelta(seconds=30))["flaky"] == 3
+        assert receiver.event_ids == [1, 2, 3]
+    finally:
+        healthy.close()
+
+
+def test_topic_filter_still_advances_cursor(session_factory):
+    db = session_factory()
+    db.add(OutboxEvent(topic=TOPIC_PAYMENT, key="pay_1", payload={"payment_id": "pay_1"}, created_at=NOW))
+    db.commit()
+    db.close()
+    _ingest(session_factory, 1)
+
+    sent = []
+
+    class Recorder:
+        def notify_alert(self, alert):
+            sent.append(alert)
+
+    dispatcher = OutboxDispatcher(session_factory, [NotifierSubscriber(Recorder())])
+    assert dispatcher.dispatch_once(NOW) == {"notifier": 1}
+    assert [alert.alert_type for alert in sent] == ["revenue"]
+    assert "10.00 USD via stripe" in sent[0].message
+
+    db = session_factory()
+    assert db.get(OutboxCursor, "notifier").last_event_id == 2
+    db.close()
+
+
+def test_prune_keeps_undelivered_and_recent_events(session_factory, receiver):
+    _ingest(session_factory, 4)
+    db = session_factory()
+    db.query(OutboxEvent).filter(OutboxEvent.id <= 3).update({"created_at": NOW - timedelta(days=30)})
+    db.commit()
+    db.close()
+
+    dispatcher = OutboxDispatcher(
+        session_factory, [HttpSubscriber("erp", receiver.url)], batch_size=2, max_batches_per_run=1
+    )
+    dispatcher.dispatch_once(NOW)  # delivers 1-2 only, then prunes
+
+    db = session_factory()
+    assert [row.id for row in db.query(OutboxEvent).order_by(OutboxEvent.id)] == [3, 4]
+    db.close()
+
+
+def test_prune_keeps_the_newest_event_so_ids_are_not_reused(session_factory, receiver):
+    _ingest(session_factory, 2)
+    db = session_factory()
+    db.query(OutboxEvent).update({"created_at": NOW - timedelta(days=30)})
+    db.commit()
+    db.close()
+
+    dispatcher = OutboxDispatcher(session_factory, [HttpSubscriber("erp", receiver.url)])
+    dispatcher.dispatch_once(NOW)
+    _ingest(session_factory, 1, start=2)
+    assert dispatcher.dispatch_once(NOW) == {"erp": 1}
+    assert receiver.event_ids == [1, 2, 3]
+
+
+def test_rolled_back_ids_do_not_stall_the_cursor(session_factory, receiver):
+    _ingest(session_factory, 3)
+    db = session_factory()
+    db.query(OutboxEvent).filter(OutboxEvent.id == 2).delete()  # as if its insert had rolled back
+    db.commit()
+    db.close()
+
+    dispatcher = OutboxDispatcher(session_factory, [HttpSubscriber("erp", receiver.url)])
+    assert dispatcher.dispatch_once(NOW) == {"erp": 2}
+    assert receiver.event_ids == [1, 3]
+
+
+def test_parse_subscribers():
+    subscribers = parse_subscribers(
+        '[{"name": "erp", "url": "http://erp.test/hook", "topics": ["payment.recorded"]}]'
+    )
+    assert subscribers[0].name == "erp"
+    assert subscribers[0].topics == frozenset({TOPIC_PAYMENT})
+    assert parse_subscribers("") == []
+    with pytest.raises(OutboxConfigError):
+        parse_subscribers('[{"name": "erp"}]')
+    with pytest.raises(OutboxConfigError):
+        parse_subscribers('[{"name": "a", "url": "http://x"}, {"name": "a", "url": "http://y"}]')
+
+
+def test_payment_commits_revenue_and_payment_outbox_rows(client, session_factory):
+    po_id = client.post(
+        "/po",
+        json={
+            "po_number": "PO-OUT-1",
+            "customer_name": "Acme Corp",
+            "customer_id": "ACME-1",
+            "amount": 250.00,
+            "currency": "USD",
+            "entity": "A+ Enterprise LLC",
+        },
+    ).json()["id"]
+    invoice_id = client.post(
+        f"/po/{po_id}/invoice",
+        json={"invoice_number": "INV-OUT-1", "amount": 250.00, "currency": "USD", "status": "sent"},
+    ).json()["id"]
+    response = client.post(
+        f"/invoice/{invoice_id}/payment",
+        json={
+            "payment_reference": "PAY-OUT-1",
+            "amount": 250.00,
+            "currency": "USD",
+            "method": "ach",
+            "artifact_uri": "s3://receipt",
+        },
+    )
+    assert response.status_code == 200
+
+    db = session_factory()
+    rows = db.query(OutboxEvent).filter(OutboxEvent.topic != TOPIC_PO_TRANSITION).order_by(OutboxEvent.id).all()
+    assert [row.topic for row in rows] == [TOPIC_REVENUE_EVENT, TOPIC_PAYMENT]
+    assert rows[1].payload["payment_id"] == response.json()["id"]
+    assert rows[1].payload["po_id"] == po_id
+
+    transitions = db.query(OutboxEvent).filter(OutboxEvent.topic == TOPIC_PO_TRANSITION).order_by(OutboxEvent.id)
+    assert [(row.payload["from_state"], row.payload["to_state"]) for row in transitions] == [
+        (None, "issued"),
+        ("issued", "invoiced"),
+        ("invoiced", "paid"),
+    ]
+    db.close()
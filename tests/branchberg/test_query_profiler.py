@@ -0,0 +1,142 @@
+"""Tests for the opt-in SQL query profiler middleware."""
+import logging
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from branchberg.app import query_profiler
+from branchberg.app.database import RevenueEvent
+from branchberg.app.query_profiler import ProfilerSettings, QueryProfilerMiddleware, normalize_sql
+
+
+def _client(session_factory, settings: ProfilerSettings) -> TestClient:
+    app = FastAPI()
+
+    def get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @app.get("/n-plus-one/{count}")
+    def n_plus_one(count: int, db: Session = Depends(get_db)):
+        for index in range(count):
+            db.execute(text("SELECT id FROM revenue_events WHERE event_id = :event_id"), {"event_id": f"evt_{index}"})
+        return {"ok": True}
+
+    @app.get("/single")
+    def single(db: Session = Depends(get_db)):
+        db.query(RevenueEvent).filter(RevenueEvent.provider == "stripe").all()
+        return {"ok": True}
+
+    app.add_middleware(QueryProfilerMiddleware, settings=settings)
+    return TestClient(app)
+
+
+def test_normalize_sql_collapses_values():
+    first = normalize_sql("SELECT * FROM t WHERE id = 5 AND name = 'a''b' AND k IN (?, ?, ?)")
+    second = normalize_sql("SELECT *\n  FROM t WHERE id = 42 AND name = 'x' AND k IN (?)")
+    assert first == second == "SELECT * FROM t WHERE id = ? AND name = ? AND k IN (?)"
+    assert normalize_sql("SELECT a FROM t_1 WHERE c::text = :p_1") == "SELECT a FROM t_1 WHERE c::text = ?"
+
+
+def test_repeated_statement_shapes_are_flagged(session_factory, caplog):
+    client = _client(session_factory, ProfilerSettings(slow_query_ms=10_000, n_plus_one_threshold=3))
+
+    with caplog.at_level(logging.WARNING, logger=query_profiler.__name__):
+        res = client.get("/n-plus-one/4")
+
+    assert res.status_code == 200
+    assert res.headers["X-Query-Count"] == "4"
+    assert res.headers["Server-Timing"].startswith("db;dur=")
+    warnings = [record.getMessage() for record in caplog.records]
+    assert any(
+        "suspected N+1 in GET /n-plus-one/{count}: 4 x SELECT id FROM revenue_events WHERE event_id = ?" in message
+        for message in warnings
+    )
+
+
+def test_below_threshold_is_not_flagged(session_factory, caplog):
+    client = _client(session_factory, ProfilerSettings(slow_query_ms=10_000, n_plus_one_threshold=3))
+
+    with caplog.at_level(logging.WARNING, logger=query_profiler.__name__):
+        client.get("/n-plus-one/2")
+
+    assert not [record for record in caplog.records if "N+1" in record.getMessage()]
+
+
+def test_slow_queries_are_logged_with_plan(session_factory, caplog):
+    client = _client(session_factory, ProfilerSettings(slow_query_ms=0, n_plus_one_threshold=100))
+
+    with caplog.at_level(logging.WARNING, logger=query_profiler.__name__):
+        res = client.get("/single")
+
+    assert res.headers["X-Query-Count"] == "1"
+    slow = [record.getMessage() for record in caplog.records if "slow query" in record.getMessage()]
+    assert len(slow) == 1
+    assert "FROM revenue_events" in slow[0]
+    # EXPLAIN QUERY PLAN output from SQLite
+    assert "SCAN" in slow[0] or "SEARCH" in slow[0]
+
+
+class RecordingCursor:
+    def __init__(self, fail_on=None):
+        self.executed = []
+        self.fail_on = fail_on
+
+    def execute(self, statement, parameters=None):
+        self.executed.append(statement)
+        if self.fail_on and statement.startswith(self.fail_on):
+            raise RuntimeError("permission denied")
+
+    def fetchall(self):
+        return [("Seq Scan on revenue_events",)]
+
+    def close(self):
+        pass
+
+
+class PostgresConnection:
+    dialect = type("Dialect", (), {"name": "postgresql"})()
+
+    def __init__(self, cursor):
+        self.connection = type("DBAPIConnection", (), {"cursor": lambda _self: cursor})()
+
+    def in_transaction(self):
+        return True
+
+
+@pytest.mark.parametrize("fail_on, expected", [(None, "Seq Scan"), ("EXPLAIN", "EXPLAIN failed")])
+def test_postgres_explain_runs_inside_a_savepoint(fail_on, expected):
+    cursor = RecordingCursor(fail_on)
+    plan = query_profiler.explain(PostgresConnection(cursor), "SELECT * FROM revenue_events", {})
+
+    assert plan[0].startswith(expected)
+    savepoint = query_profiler.EXPLAIN_SAVEPOINT
+    assert cursor.executed[0] == f"SAVEPOINT {savepoint}"
+    assert cursor.executed[-1] == f"RELEASE SAVEPOINT {savepoint}"
+    assert (f"ROLLBACK TO SAVEPOINT {savepoint}" in cursor.executed) == (fail_on is not None)
+
+
+def test_queries_outside_requests_are_not_recorded(session_factory):
+    query_profiler.instrument_engines()
+    db = session_factory()
+    try:
+        db.execute(text("SELECT 1"))
+    finally:
+        db.close()
+    assert query_profiler.current_profile() is None
+
+
+def test_settings_from_env(monkeypatch):
+    monkeypatch.delenv("QUERY_PROFILER", raising=False)
+    assert query_profiler.settings_from_env() is None
+
+    monkeypatch.setenv("QUERY_PROFILER", "1")
+    monkeypatch.setenv("QUERY_PROFILER_SLOW_MS", "25")
+    monkeypatch.setenv("QUERY_PROFILER_N_PLUS_ONE", "8")
+    assert query_profiler.settings_from_env() == ProfilerSettings(slow_query_ms=25.0, n_plus_one_threshold=8)
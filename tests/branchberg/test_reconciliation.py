@@ -0,0 +1,214 @@
+"""Tests for bank statement reconciliation."""
+import io
+
+import pytest
+
+from branchberg.app.database import AuditLog, Invoice, Payment, PurchaseOrder, RevenueEvent
+from branchberg.app.reconciliation import InvoiceIndex, OpenInvoice, StatementLine, parse_amount_cents
+
+
+def _create_invoice(client, suffix: str, amount: float) -> str:
+    po_response = client.post(
+        "/po",
+        json={
+            "po_number": f"PO-{suffix}",
+            "customer_name": "Acme Corp",
+            "amount": amount,
+            "entity": "A+ Enterprise LLC",
+        },
+    )
+    assert po_response.status_code == 200
+    invoice_response = client.post(
+        f"/po/{po_response.json()['id']}/invoice",
+        json={"invoice_number": f"INV-{suffix}", "amount": amount, "status": "sent"},
+    )
+    assert invoice_response.status_code == 200
+    return invoice_response.json()["id"]
+
+
+def _post_statement(client, csv_text: str):
+    return client.post(
+        "/reconcile/statement",
+        files={"file": ("statement.csv", io.BytesIO(csv_text.encode("utf-8")), "text/csv")},
+        data={"amount_column": "amount", "reference_column": "memo", "date_column": "date"},
+    )
+
+
+def test_parse_amount_cents_handles_bank_formats():
+    assert parse_amount_cents("$1,234.56") == 123456
+    assert parse_amount_cents("0.105") == 11
+    assert parse_amount_cents("(12.00)") == -1200
+    with pytest.raises(ValueError):
+        parse_amount_cents("n/a")
+
+
+def test_index_prefers_reference_match_and_resolves_double_claims():
+    index = InvoiceIndex(
+        [
+            OpenInvoice("inv-a", "INV-100", 5000, "USD"),
+            OpenInvoice("inv-b", "INV-200", 7500, "USD"),
+            OpenInvoice("inv-c", "INV-300", 7500, "USD"),
+        ]
+    )
+    proposals = index.match(
+        [
+            StatementLine(1, 5000, "USD", "ACH CREDIT ACME"),
+            StatementLine(2, 5000, "USD", "ACME PAYMENT inv100"),
+            StatementLine(3, 7500, "USD", "WIRE"),
+            StatementLine(4, 9900, "USD", "INV-200"),
+        ]
+    )
+    by_line = {proposal.line.line_number: proposal for proposal in proposals}
+
+    # Line 2 names the invoice, so it outranks line 1's amount-only claim.
+    assert by_line[2].match_type == "reference_and_amount"
+    assert by_line[2].invoice_id == "inv-a"
+    assert by_line[1].invoice_id is None
+    assert by_line[3].match_type == "amount_ambiguous"
+    assert set(by_line[3].candidate_invoice_ids) == {"inv-b", "inv-c"}
+    assert by_line[4].match_type == "reference_only"
+    assert by_line[4].invoice_id is None
+
+
+def test_shared_invoice_number_is_matched_by_amount_or_left_ambiguous():
+    index = InvoiceIndex(
+        [
+            OpenInvoice("inv-a", "INV-100", 5000, "USD"),
+            OpenInvoice("inv-b", "INV-100", 7500, "USD"),
+            OpenInvoice("inv-c", "INV-200", 900, "USD"),
+            OpenInvoice("inv-d", "INV-200", 900, "USD"),
+        ]
+    )
+    proposals = index.match(
+        [
+            StatementLine(1, 7500, "USD", "WIRE INV-100"),
+            StatementLine(2, 900, "USD", "INV-200"),
+            StatementLine(3, 100, "USD", "INV-100"),
+        ]
+    )
+    by_line = {proposal.line.line_number: proposal for proposal in proposals}
+
+    assert by_line[1].match_type == "reference_and_amount"
+    assert by_line[1].invoice_id == "inv-b"
+    assert by_line[2].match_type == "reference_only"
+    assert by_line[2].invoice_id is None
+    assert by_line[2].candidate_invoice_ids == ["inv-c", "inv-d"]
+    assert by_line[3].match_type == "reference_only"
+    assert by_line[3].candidate_invoice_ids == ["inv-a", "inv-b"]
+
+
+def test_statement_proposes_matches_without_writing(client, session_factory):
+    invoice_id = _create_invoice(client, "REC-1", 1250.00)
+    _create_invoice(client, "REC-2", 300.00)
+
+    response = _post_statement(
+        client,
+        "date,amount,memo\n"
+        "2026-03-01,\"$1,250.00\",ACH ACME INV-REC-1\n"
+        "2026-03-01,-45.00,BANK FEE\n"
+        "2026-03-02,999.99,UNKNOWN WIRE\n"
+        "2026-03-02,abc,BROKEN\n",
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total_lines"] == 2
+    assert body["open_invoices"] == 2
+    assert body["matched_count"] == 1
+    assert len(body["errors"]) == 1
+
+    proposal = body["proposals"][0]
+    assert proposal["invoice_id"] == invoice_id
+    assert proposal["confidence"] == pytest.approx(0.99)
+    assert proposal["posted_at"] == "2026-03-01"
+
+    db = session_factory()
+    try:
+        assert db.query(Payment).count() == 0
+    finally:
+        db.close()
+
+
+def test_statement_rejects_missing_column(client):
+    response = client.post(
+        "/reconcile/statement",
+        files={"file": ("statement.csv", io.BytesIO(b"amount,memo\n1.00,x\n"), "text/csv")},
+        data={"amount_column": "amount", "reference_column": "description"},
+    )
+    assert response.status_code == 400
+
+
+def test_confirm_posts_all_payments_with_side_effects(client, session_factory):
+    first = _create_invoice(client, "REC-3", 100.00)
+    second = _create_invoice(client, "REC-4", 200.00)
+
+    response = client.post(
+        "/reconcile/confirm",
+        json={
+            "actor": "recon-bot",
+            "payments": [
+                {
+                    "invoice_id": first,
+                    "payment_reference": "ACH-1",
+                    "amount": 100.00,
+                    "method": "ach",
+                    "artifact_uri": "s3://statements/march.csv",
+                },
+                {
+                    "invoice_id": second,
+                    "payment_reference": "WIRE-1",
+                    "amount": 200.00,
+                    "method": "wire",
+                    "artifact_uri": "s3://statements/march.csv",
+                },
+            ],
+        },
+    )
+    assert response.status_code == 200
+    assert [payment["invoice_id"] for payment in response.json()] == [first, second]
+
+    db = session_factory()
+    try:
+        assert db.query(Payment).count() == 2
+        assert {invoice.status for invoice in db.query(Invoice).all()} == {"paid"}
+        assert {po.status for po in db.query(PurchaseOrder).all()} == {"paid"}
+        assert db.query(RevenueEvent).filter(RevenueEvent.event_type == "po_payment").count() == 2
+        audit = db.query(AuditLog).filter(AuditLog.action == "payment_recorded").all()
+        assert {entry.actor for entry in audit} == {"recon-bot"}
+    finally:
+        db.close()
+
+
+def test_confirm_is_all_or_nothing(client, session_factory):
+    first = _create_invoice(client, "REC-5", 100.00)
+    second = _create_invoice(client, "REC-6", 200.00)
+
+    response = client.post(
+        "/reconcile/confirm",
+        json={
+            "payments": [
+                {
+                    "invoice_id": first,
+                    "payment_reference": "ACH-5",
+                    "amount": 100.00,
+                    "method": "ach",
+                    "artifact_uri": "s3://statements/march.csv",
+                },
+                {
+                    "invoice_id": second,
+                    "payment_reference": "ACH-6",
+                    "amount": 150.00,
+                    "method": "ach",
+                    "artifact_uri": "s3://statements/march.csv",
+                },
+            ],
+        },
+    )
+    assert response.status_code == 422
+    assert second in response.json()["detail"]
+
+    db = session_factory()
+    try:
+        assert db.query(Payment).count() == 0
+        assert {invoice.status for invoice in db.query(Invoice).all()} == {"sent"}
+    finally:
+        db.close()
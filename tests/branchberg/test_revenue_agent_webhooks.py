@@ -238,3 +238,33 @@ def test_gumroad_webhook_success_and_retry_idempotent(client, db_session_factory
     assert body2["status"] == "ok"
     assert body2["created"] is False
     assert _count_events(db_session_factory) == 1
+
+
+def test_stripe_webhook_with_real_signature(client, db_session_factory, monkeypatch):
+    """Unmocked verification: the SDK returns an Event object, not a dict."""
+    import json
+    import time
+
+    _set_agent_settings(monkeypatch, safe_mode=False, stripe_secret="whsec_test", gumroad_secret="gsec")
+
+    payload = json.dumps(
+        {
+            "id": "evt_signed",
+            "object": "event",
+            "type": "charge.succeeded",
+            "data": {"object": {"object": "charge", "amount": 1500, "currency": "usd"}},
+        }
+    ).encode()
+    timestamp = int(time.time())
+    signature = hmac.new(b"whsec_test", f"{timestamp}.".encode() + payload, hashlib.sha256).hexdigest()
+
+    res = client.post(
+        "/webhooks/stripe",
+        content=payload,
+        headers={"Stripe-Signature": f"t={timestamp},v1={signature}"},
+    )
+    assert res.status_code == 200
+    body = res.json()
+    assert body["status"] == "ok"
+    assert body["created"] is True
+    assert _count_events(db_session_factory) == 1
@@ -0,0 +1,118 @@
+"""Tests for PO/invoice/payment links promoted onto revenue events."""
+import json
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from branchberg.app.database import (
+    Base,
+    RevenueEvent,
+    backfill_revenue_event_links,
+    ensure_columns,
+    ensure_indexes,
+)
+
+
+def _pay_new_po(client, suffix):
+    po = client.post(
+        "/po",
+        json={
+            "po_number": f"PO-{suffix}",
+            "customer_name": "Acme Corp",
+            "amount": 500.00,
+            "currency": "USD",
+            "entity": "A+ Enterprise LLC",
+        },
+    ).json()
+    invoice = client.post(
+        f"/po/{po['id']}/invoice",
+        json={"invoice_number": f"INV-{suffix}", "amount": 500.00, "currency": "USD", "status": "sent"},
+    ).json()
+    payment = client.post(
+        f"/invoice/{invoice['id']}/payment",
+        json={
+            "payment_reference": f"PAY-{suffix}",
+            "amount": 500.00,
+            "currency": "USD",
+            "method": "ach",
+            "artifact_uri": "s3://receipt",
+        },
+    ).json()
+    return po["id"], invoice["id"], payment["id"]
+
+
+def test_lookup_by_po_invoice_or_payment(client):
+    po_id, invoice_id, payment_id = _pay_new_po(client, "1")
+    _pay_new_po(client, "2")
+
+    for params in ({"po_id": po_id}, {"invoice_id": invoice_id}, {"payment_id": payment_id}):
+        events = client.get("/revenue/events/linked", params=params).json()
+        assert len(events) == 1
+        assert (events[0]["po_id"], events[0]["invoice_id"], events[0]["payment_id"]) == (
+            po_id,
+            invoice_id,
+            payment_id,
+        )
+        assert events[0]["event_type"] == "po_payment"
+
+    narrow = client.get("/revenue/events/linked", params={"invoice_id": invoice_id, "fields": "amount_cents"})
+    assert narrow.json() == [{"amount_cents": 50000}]
+    assert client.get("/revenue/events/linked", params={"po_id": "missing"}).json() == []
+    assert client.get("/revenue/events/linked").status_code == 422
+
+
+def test_lookup_is_an_index_probe(client, db_engine):
+    with db_engine.connect() as conn:
+        plan = conn.execute(
+            text("EXPLAIN QUERY PLAN SELECT id FROM revenue_events WHERE invoice_id = 'x'")
+        ).all()
+    assert "USING INDEX ix_revenue_events_invoice_id" in " ".join(str(row[-1]) for row in plan)
+
+
+def test_existing_tables_gain_columns_and_links_are_backfilled(sqlite_engine):
+    metadata = {"po_id": "po_1", "invoice_id": "inv_1", "payment_id": "pay_1", "payment_reference": "R"}
+    with sqlite_engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE revenue_events (id VARCHAR PRIMARY KEY, event_id VARCHAR NOT NULL UNIQUE, "
+                "provider VARCHAR NOT NULL, event_type VARCHAR NOT NULL, amount_cents INTEGER NOT NULL, "
+                "currency VARCHAR, customer_email VARCHAR, customer_id VARCHAR, event_metadata JSON, "
+                "created_at DATETIME, processed_at DATETIME, entity VARCHAR)"
+            )
+        )
+        for index, (event_type, meta) in enumerate([("po_payment", metadata), ("sale", {"po_id": "nope"})]):
+            conn.execute(
+                text(
+                    "INSERT INTO revenue_events (id, event_id, provider, event_type, amount_cents, event_metadata) "
+                    "VALUES (:id, :event_id, 'manual', :event_type, 100, :metadata)"
+                ),
+                {"id": f"rec_{index}", "event_id": f"evt_{index}", "event_type": event_type, "metadata": json.dumps(meta)},
+            )
+
+    Base.metadata.create_all(bind=sqlite_engine)  # same steps as init_db
+    ensure_columns(sqlite_engine)
+    backfill_revenue_event_links(sqlite_engine, batch_size=1)
+    ensure_indexes(sqlite_engine)
+
+    index_names = {index["name"] for index in inspect(sqlite_engine).get_indexes("revenue_events")}
+    assert {"ix_revenue_events_po_id", "ix_revenue_events_invoice_id", "ix_revenue_events_payment_id"} <= index_names
+    db = sessionmaker(bind=sqlite_engine)()
+    linked, sale = db.query(RevenueEvent).order_by(RevenueEvent.id).all()
+    assert (linked.po_id, linked.invoice_id, linked.payment_id) == ("po_1", "inv_1", "pay_1")
+    assert (sale.po_id, sale.payment_id) == (None, None)
+    db.close()
+
+
+def test_links_backfill_runs_once(db_engine):
+    backfill_revenue_event_links(db_engine)
+    statements = []
+
+    @event.listens_for(db_engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    backfill_revenue_event_links(db_engine)
+    event.remove(db_engine, "before_cursor_execute", record)
+
+    assert len(statements) == 1
+    assert "FROM job_watermarks" in statements[0]
@@ -0,0 +1,170 @@
+"""Tests for cursor-based delta fetching and field projection on /revenue/events."""
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy import event
+
+from branchberg.app.database import (
+    CURRENT_TXID,
+    REVENUE_EVENT_SEQ,
+    RevenueEvent,
+    _assign_revenue_event_seq,
+)
+
+
+def _add(session_factory, event_id, *, age_seconds=60, created_at=None):
+    processed_at = datetime.utcnow() - timedelta(seconds=age_seconds)
+    db = session_factory()
+    db.add(
+        RevenueEvent(
+            id=str(uuid.uuid4()),
+            event_id=event_id,
+            provider="stripe",
+            event_type="charge.succeeded",
+            amount_cents=1000,
+            currency="USD",
+            event_metadata={},
+            created_at=created_at or processed_at,
+            processed_at=processed_at,
+        )
+    )
+    db.commit()
+    db.close()
+
+
+def _event_ids(response):
+    return [event["event_id"] for event in response.json()]
+
+
+def test_since_returns_only_newer_events_oldest_first(client, session_factory):
+    _add(session_factory, "evt_1", age_seconds=300)
+    _add(session_factory, "evt_2", age_seconds=200)
+
+    first = client.get("/revenue/events")
+    assert _event_ids(first) == ["evt_2", "evt_1"]
+    cursor = first.headers["x-events-cursor"]
+
+    assert _event_ids(client.get("/revenue/events", params={"since": cursor})) == []
+
+    # A late arrival (old created_at) still counts as new.
+    _add(session_factory, "evt_late", age_seconds=100, created_at=datetime(2025, 1, 1))
+    _add(session_factory, "evt_3", age_seconds=50)
+    delta = client.get("/revenue/events", params={"since": cursor})
+    assert _event_ids(delta) == ["evt_late", "evt_3"]
+    assert _event_ids(client.get("/revenue/events", params={"since": delta.headers["x-events-cursor"]})) == []
+
+
+def test_since_pages_through_large_deltas(client, session_factory):
+    cursor = client.get("/revenue/events").headers["x-events-cursor"]
+    for index in range(5):
+        _add(session_factory, f"evt_{index}", age_seconds=100 - index)
+
+    seen = []
+    while True:
+        page = client.get("/revenue/events", params={"since": cursor, "limit": 2})
+        seen += _event_ids(page)
+        cursor = page.headers["x-events-cursor"]
+        if len(page.json()) < 2:
+            break
+    assert seen == [f"evt_{index}" for index in range(5)]
+
+
+def test_cursor_follows_commit_order_not_processed_at(client, session_factory):
+    _add(session_factory, "evt_new", age_seconds=0)
+    cursor = client.get("/revenue/events").headers["x-events-cursor"]
+
+    # Stamped before evt_new by a transaction that committed after it.
+    _add(session_factory, "evt_slow", age_seconds=30)
+    delta = client.get("/revenue/events", params={"since": cursor})
+    assert _event_ids(delta) == ["evt_slow"]
+    assert delta.headers["x-events-cursor"] != cursor
+
+
+def _set_txids(session_factory, **txids):
+    db = session_factory()
+    for event_id, txid in txids.items():
+        db.query(RevenueEvent).filter(RevenueEvent.event_id == event_id).update({"txid": txid})
+    db.commit()
+    db.close()
+
+
+def test_cursor_orders_by_writing_transaction_first(client, session_factory):
+    # As on Postgres: seq is handed out at insert, txid orders the commits.
+    _add(session_factory, "evt_a")
+    _add(session_factory, "evt_b")
+    _set_txids(session_factory, evt_a=20, evt_b=10)
+
+    delta = client.get("/revenue/events", params={"since": "0"})
+    assert _event_ids(delta) == ["evt_b", "evt_a"]
+    cursor = delta.headers["x-events-cursor"]
+    assert cursor == "20:1"
+    assert client.get("/revenue/events").headers["x-events-cursor"] == cursor
+
+    _add(session_factory, "evt_c")
+    _set_txids(session_factory, evt_c=30)
+    assert _event_ids(client.get("/revenue/events", params={"since": cursor})) == ["evt_c"]
+
+
+def test_postgres_numbers_events_from_a_sequence_without_locking():
+    record = RevenueEvent(event_id="evt_1")
+    connection = SimpleNamespace(dialect=SimpleNamespace(name="postgresql"))
+    session = SimpleNamespace(new=[record], connection=lambda: connection)
+
+    _assign_revenue_event_seq(session, None, None)
+
+    assert record.seq.compare(REVENUE_EVENT_SEQ.next_value())
+    assert record.txid is CURRENT_TXID
+
+
+def test_events_flushed_together_get_consecutive_seqs(session_factory):
+    db = session_factory()
+    db.add_all(
+        RevenueEvent(
+            id=str(uuid.uuid4()),
+            event_id=f"evt_{index}",
+            provider="stripe",
+            event_type="charge.succeeded",
+            amount_cents=100,
+        )
+        for index in range(3)
+    )
+    db.commit()
+    assert sorted(row.seq for row in db.query(RevenueEvent)) == [1, 2, 3]
+    db.close()
+
+
+def test_invalid_cursor_is_rejected(client, session_factory):
+    assert client.get("/revenue/events", params={"since": "not-a-cursor"}).status_code == 400
+
+
+def test_fields_projection_loads_and_returns_only_requested_columns(client, session_factory):
+    _add(session_factory, "evt_1", age_seconds=300)
+    statements = []
+    engine = session_factory.kw["bind"]
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = client.get("/revenue/events", params={"fields": "event_id,amount_dollars"})
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert response.json() == [{"event_id": "evt_1", "amount_dollars": 10.0}]
+    assert "x-events-cursor" in response.headers
+    page_query = next(sql for sql in statements if "ORDER BY revenue_events.created_at DESC" in sql)
+    assert "event_metadata" not in page_query
+    assert "customer_email" not in page_query
+
+    cursor = "0"
+    delta = client.get("/revenue/events", params={"since": cursor, "fields": "metadata"})
+    assert delta.json() == [{"metadata": {}}]
+    assert delta.headers["x-events-cursor"] != cursor
+
+
+def test_unknown_field_is_rejected(client, session_factory):
+    response = client.get("/revenue/events", params={"fields": "event_id,password"})
+    assert response.status_code == 422
+    assert "password" in response.json()["detail"]
@@ -0,0 +1,212 @@
+"""Tests for the embedded job scheduler and its leader lease."""
+import asyncio
+import random
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from branchberg.app.database import JobRun
+from branchberg.app.revenue_agent.config import AgentSettings
+from branchberg.app.revenue_agent.scheduler import (
+    CronError,
+    CronSchedule,
+    JobScheduler,
+    RowLease,
+    ScheduledJob,
+)
+from branchberg.app.revenue_agent.service import RevenueTrackingAgent
+
+START = datetime(2026, 3, 10, 12, 0, 30)
+
+
+def _scheduler(session_factory, jobs, holder, **kwargs):
+    return JobScheduler(
+        session_factory,
+        jobs,
+        lease=RowLease(session_factory, holder=holder, ttl_seconds=60),
+        clock=lambda: START,
+        rng=random.Random(7),
+        **kwargs,
+    )
+
+
+def test_cron_next_after():
+    every_quarter = CronSchedule.parse("*/15 * * * *")
+    assert every_quarter.next_after(datetime(2026, 3, 10, 12, 7)) == datetime(2026, 3, 10, 12, 15)
+    assert every_quarter.next_after(datetime(2026, 3, 10, 12, 45)) == datetime(2026, 3, 10, 13, 0)
+
+    weekdays_at_nine = CronSchedule.parse("0 9 * * 1-5")
+    # 2026-03-13 is a Friday; next match is Monday the 16th.
+    assert weekdays_at_nine.next_after(datetime(2026, 3, 13, 10, 0)) == datetime(2026, 3, 16, 9, 0)
+
+    yearly = CronSchedule.parse("30 6 1 1 *")
+    assert yearly.next_after(datetime(2026, 3, 10)) == datetime(2027, 1, 1, 6, 30)
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "61 * * * *", "*/0 * * * *", "a * * * *"])
+def test_cron_rejects_bad_expressions(expression):
+    with pytest.raises(CronError):
+        CronSchedule.parse(expression)
+
+
+def test_job_slots_follow_their_timezone():
+    job = ScheduledJob(
+        name="morning",
+        schedule=CronSchedule.parse("0 7 * * *"),
+        func=lambda db, now: None,
+        timezone=ZoneInfo("America/Chicago"),
+    )
+    # 07:00 CDT is 12:00 UTC.
+    assert job.next_slot(datetime(2026, 3, 10, 6, 0)) == datetime(2026, 3, 10, 12, 0)
+
+
+def test_row_lease_has_one_holder_until_it_expires(session_factory):
+    first = RowLease(session_factory, holder="replica-a", ttl_seconds=60)
+    second = RowLease(session_factory, holder="replica-b", ttl_seconds=60)
+
+    assert first.acquire(START)
+    assert not second.acquire(START + timedelta(seconds=30))
+    assert first.acquire(START + timedelta(seconds=45))  # renewal
+    assert not second.acquire(START + timedelta(seconds=100))
+    assert second.acquire(START + timedelta(seconds=106))
+    assert not first.acquire(START + timedelta(seconds=110))
+
+    second.release()
+    assert first.acquire(START + timedelta(seconds=111))
+
+
+def test_only_the_leader_runs_each_slot_and_history_is_recorded(session_factory):
+    calls = []
+    job = ScheduledJob(
+        name="tick",
+        schedule=CronSchedule.parse("* * * * *"),
+        func=lambda db, now: calls.append(now),
+    )
+    replica_a = _scheduler(session_factory, [job], "replica-a")
+    replica_b = _scheduler(session_factory, [job], "replica-b")
+
+    due = START + timedelta(seconds=31)  # 12:01:01
+    runs = replica_a.run_pending(due) + replica_b.run_pending(due)
+    assert [run.holder for run in runs] == ["replica-a"]
+    assert replica_a.is_leader and not replica_b.is_leader
+    assert replica_a.run_pending(due) == []
+    assert len(calls) == 1
+
+    db = session_factory()
+    run = db.query(JobRun).one()
+    assert run.scheduled_for == datetime(2026, 3, 10, 12, 1)
+    assert run.status == "success"
+    assert run.duration_ms is not None and run.duration_ms >= 0
+    db.close()
+
+
+def test_new_leader_resumes_without_repeating_and_coalesces_missed_slots(session_factory):
+    calls = []
+    job = ScheduledJob(
+        name="tick",
+        schedule=CronSchedule.parse("* * * * *"),
+        func=lambda db, now: calls.append(now),
+    )
+    replica_a = _scheduler(session_factory, [job], "replica-a")
+    replica_b = _scheduler(session_factory, [job], "replica-b")
+
+    replica_a.run_pending(START + timedelta(seconds=31))
+    # replica-a dies; its lease expires and replica-b takes over ten minutes later.
+    later = START + timedelta(minutes=10)
+    runs = replica_b.run_pending(later)
+
+    assert [run.scheduled_for for run in runs] == [datetime(2026, 3, 10, 12, 2)]
+    assert len(calls) == 2
+    assert replica_b.run_pending(later) == []
+
+
+def test_failures_are_recorded_and_do_not_stop_other_jobs(session_factory):
+    def boom(db, now):
+        raise RuntimeError("database on fire")
+
+    ok_calls = []
+    jobs = [
+        ScheduledJob(name="boom", schedule=CronSchedule.parse("* * * * *"), func=boom),
+        ScheduledJob(name="ok", schedule=CronSchedule.parse("* * * * *"), func=lambda db, now: ok_calls.append(now)),
+    ]
+    runs = _scheduler(session_factory, jobs, "replica-a").run_pending(START + timedelta(minutes=1))
+
+    assert [(run.job_name, run.status) for run in runs] == [("boom", "error"), ("ok", "success")]
+    assert runs[0].error == "RuntimeError: database on fire"
+    assert len(ok_calls) == 1
+
+
+def test_jitter_delays_the_run_within_bounds(session_factory):
+    calls = []
+    job = ScheduledJob(
+        name="jittery",
+        schedule=CronSchedule.parse("* * * * *"),
+        func=lambda db, now: calls.append(now),
+        jitter_seconds=20,
+    )
+    scheduler = _scheduler(session_factory, [job], "replica-a")
+    scheduler.run_pending(START)  # computes the first slot
+    slot, due = scheduler._next["jittery"]
+    assert slot < due <= slot + timedelta(seconds=20)
+
+    scheduler.run_pending(slot)
+    assert calls == []
+    scheduler.run_pending(due)
+    assert len(calls) == 1
+
+
+def test_local_jobs_run_on_every_replica_without_history(session_factory):
+    calls = []
+    job = ScheduledJob(
+        name="flush",
+        schedule=CronSchedule.parse("* * * * *"),
+        func=lambda db, now: calls.append(now),
+        leader_only=False,
+    )
+    replica_a = _scheduler(session_factory, [job], "replica-a")
+    replica_b = _scheduler(session_factory, [job], "replica-b")
+
+    due = START + timedelta(minutes=1)
+    replica_a.run_pending(due)
+    replica_b.run_pending(due)
+
+    assert len(calls) == 2
+    db = session_factory()
+    assert db.query(JobRun).count() == 0
+    db.close()
+
+
+def test_agent_jobs_and_async_loop(session_factory):
+    agent = RevenueTrackingAgent(
+        AgentSettings(
+            safe_mode=True,
+            stripe_webhook_secret=None,
+            gumroad_webhook_secret=None,
+            slack_webhook_url=None,
+        )
+    )
+    jobs = agent.scheduled_jobs()
+    assert [job.name for job in jobs] == ["daily_summary", "alerts"]
+
+    ticks = []
+
+    class CountingScheduler(JobScheduler):
+        def run_pending(self, now=None):
+            ticks.append(now)
+            return []
+
+    scheduler = CountingScheduler(
+        session_factory,
+        jobs,
+        lease=RowLease(session_factory, holder="replica-a"),
+        poll_seconds=0.01,
+    )
+
+    async def run():
+        scheduler.start()
+        await asyncio.sleep(0.05)
+        await scheduler.stop()
+
+    asyncio.run(run())
+    assert len(ticks) >= 2
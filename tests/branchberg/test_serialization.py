@@ -0,0 +1,44 @@
+"""Tests for the fast JSON response path."""
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+from branchberg.app import serialization
+from branchberg.app.main import RevenueEventResponse, _revenue_event_dict
+from branchberg.app.serialization import FastJSONResponse, dumps
+
+
+def _event(**overrides):
+    values = dict(
+        id="rec_1",
+        event_id="evt_1",
+        provider="stripe",
+        event_type="charge.succeeded",
+        amount_cents=12345,
+        currency="USD",
+        customer_email="ünïcode@test.com",
+        customer_id=None,
+        entity="A+ Enterprise LLC",
+        created_at=datetime(2026, 3, 1, 12, 30, 5, 123456),
+        processed_at=datetime(2026, 3, 1, 12, 30, 6),
+        event_metadata={"note": "x", "nested": {"n": 1}},
+        po_id=None,
+        invoice_id=None,
+        payment_id=None,
+    )
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+def test_fast_path_matches_pydantic_serialization():
+    for event in (_event(), _event(event_metadata=None, customer_email=None)):
+        expected = RevenueEventResponse.from_orm(event).model_dump(mode="json")
+        assert json.loads(dumps(_revenue_event_dict(event))) == expected
+
+
+def test_stdlib_fallback_writes_the_same_bytes(monkeypatch):
+    payload = [_revenue_event_dict(_event())]
+    fast = dumps(payload, sort_keys=True)
+    monkeypatch.setattr(serialization, "orjson", None)
+    assert dumps(payload, sort_keys=True) == fast
+    assert FastJSONResponse(payload).body == dumps(payload)
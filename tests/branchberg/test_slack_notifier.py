@@ -0,0 +1,160 @@
+"""Tests for the queued Slack notifier."""
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import requests
+
+from branchberg.app.revenue_agent.notifications.base import AlertMessage
+from branchberg.app.revenue_agent.notifications.slack import SlackWebhookNotifier
+
+ALERT = AlertMessage(alert_type="duplicate", severity="warning", message="evt_1 retried")
+
+
+class FakeSession:
+    """Stands in for `requests.Session`; replays scripted status codes."""
+
+    def __init__(self, statuses=None, gate=None):
+        self.statuses = list(statuses or [])
+        self.gate = gate
+        self.posts = []
+        self.closed = False
+
+    def post(self, url, json=None, timeout=None):
+        if self.gate is not None:
+            self.gate.wait(5)
+        self.posts.append(json)
+        status = self.statuses.pop(0) if self.statuses else 200
+        if isinstance(status, Exception):
+            raise status
+        return SimpleNamespace(status_code=status, headers={})
+
+    def close(self):
+        self.closed = True
+
+
+def test_no_webhook_url_is_noop():
+    notifier = SlackWebhookNotifier(None, session=FakeSession())
+    notifier.notify_alert(ALERT)
+    assert notifier.stats["queued"] == 0
+    assert notifier.stats["sent"] == 0
+
+
+def test_delivers_in_background_over_shared_session():
+    session = FakeSession()
+    notifier = SlackWebhookNotifier("https://hooks.slack.test/x", session=session)
+
+    notifier.notify_alert(ALERT)
+    notifier.notify_summary(text="Daily total: $100.00")
+    assert notifier.flush(timeout=5)
+
+    assert session.posts == [
+        {"text": "[WARNING] duplicate: evt_1 retried"},
+        {"text": "Daily total: $100.00"},
+    ]
+    assert notifier.stats["sent"] == 2
+    notifier.close()
+    assert session.closed
+
+
+def test_retries_with_backoff_then_counts_failure():
+    sleeps = []
+    session = FakeSession(statuses=[503, requests.ConnectionError("down"), 500, 502])
+    notifier = SlackWebhookNotifier(
+        "https://hooks.slack.test/x",
+        session=session,
+        max_retries=3,
+        backoff_seconds=0.5,
+        sleep=sleeps.append,
+    )
+
+    notifier.notify_alert(ALERT)
+    notifier.flush(timeout=5)
+
+    assert len(session.posts) == 4
+    assert sleeps == [0.5, 1.0, 2.0]
+    assert notifier.stats["failed"] == 1
+    assert notifier.stats["sent"] == 0
+    notifier.close()
+
+
+def test_client_errors_are_not_retried():
+    session = FakeSession(statuses=[404])
+    notifier = SlackWebhookNotifier("https://hooks.slack.test/x", session=session, sleep=lambda _: None)
+
+    notifier.notify_alert(ALERT)
+    notifier.flush(timeout=5)
+
+    assert len(session.posts) == 1
+    assert notifier.stats["failed"] == 1
+    notifier.close()
+
+
+def test_full_queue_drops_or_spills_without_blocking(tmp_path):
+    gate = threading.Event()
+    spill_path = tmp_path / "slack_spill.jsonl"
+    notifier = SlackWebhookNotifier(
+        "https://hooks.slack.test/x",
+        session=FakeSession(gate=gate),
+        max_queue=1,
+        overflow="spill",
+        spill_path=str(spill_path),
+    )
+
+    # The worker holds one message at the gate; one more fits in the queue.
+    for index in range(5):
+        notifier.notify_summary(text=f"msg {index}")
+
+    stats = notifier.stats
+    assert stats["spilled"] >= 3
+    spilled = [json.loads(line) for line in spill_path.read_text().splitlines()]
+    assert spilled[-1] == {"text": "msg 4"}
+
+    gate.set()
+    notifier.close()
+
+
+def test_drop_newest_counts_dropped_messages():
+    gate = threading.Event()
+    notifier = SlackWebhookNotifier(
+        "https://hooks.slack.test/x",
+        session=FakeSession(gate=gate),
+        max_queue=1,
+        overflow="drop_newest",
+    )
+    for index in range(5):
+        notifier.notify_summary(text=f"msg {index}")
+
+    assert notifier.stats["dropped"] >= 3
+    gate.set()
+    assert notifier.flush(timeout=5)
+    notifier.close()
+
+
+def test_close_with_a_full_queue_returns_within_its_timeout():
+    gate = threading.Event()
+    notifier = SlackWebhookNotifier(
+        "https://hooks.slack.test/x",
+        session=FakeSession(gate=gate),
+        max_queue=1,
+        overflow="drop_newest",
+    )
+    for index in range(3):
+        notifier.notify_summary(text=f"msg {index}")
+
+    started = time.monotonic()
+    notifier.close(timeout=0.2)
+    assert time.monotonic() - started < 1
+    gate.set()
+
+
+def test_notifier_can_be_reused_after_close():
+    session = FakeSession()
+    notifier = SlackWebhookNotifier("https://hooks.slack.test/x", session=session)
+    notifier.notify_summary(text="first")
+    notifier.close()
+    notifier.notify_summary(text="second")
+    assert notifier.flush(timeout=5)
+    notifier.close()
+    assert session.posts == [{"text": "first"}, {"text": "second"}]
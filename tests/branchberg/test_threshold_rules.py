@@ -0,0 +1,281 @@
+"""Tests for inline threshold rules."""
+import asyncio
+import io
+import time
+import uuid
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import event
+
+from branchberg.app.csv_import import CsvColumnMapping, import_revenue_csv
+from branchberg.app.database import RevenueAlert, RevenueEvent
+from branchberg.app.revenue_agent import repository
+from branchberg.app.revenue_agent.config import AgentSettings
+from branchberg.app.revenue_agent.repository import RevenueEventIngest, insert_revenue_event_idempotent
+from branchberg.app.revenue_agent.rules import RuleConfigError, RulesEngine, parse_rules
+from branchberg.app.revenue_agent.service import RevenueTrackingAgent
+
+DAY = date(2026, 3, 10)
+
+
+@pytest.fixture()
+def install_engine():
+    def install(engine):
+        repository.set_rules_engine(engine)
+        return engine
+
+    yield install
+    repository.set_rules_engine(None)
+    repository.PENDING_ALERTS.clear()
+
+
+class RecordingNotifier:
+    def __init__(self):
+        self.alerts = []
+
+    def notify_alert(self, alert):
+        self.alerts.append(alert)
+
+
+def _evaluate(engine, amount_cents, *, provider="stripe", entity="A+ Enterprise LLC", currency="USD", day=DAY):
+    return engine.evaluate(
+        amount_cents=amount_cents, provider=provider, entity=entity, currency=currency, day=day
+    )
+
+
+def _add_manual(db, amount_cents, *, currency="USD", created_at=datetime(2026, 3, 10, 18)):
+    db.add(
+        RevenueEvent(
+            id=str(uuid.uuid4()),
+            event_id=f"manual_{uuid.uuid4().hex[:16]}",
+            provider="manual",
+            event_type="manual_entry",
+            amount_cents=amount_cents,
+            currency=currency,
+            entity="A+ Enterprise LLC",
+            created_at=created_at,
+            processed_at=created_at,
+        )
+    )
+
+
+def test_parse_rules_accepts_dollars_or_cents():
+    rules = parse_rules(
+        '[{"name": "big", "threshold": 50.5},'
+        ' {"name": "daily", "kind": "daily_total", "threshold_cents": 1000, "currency": "usd"}]'
+    )
+    assert [(rule.name, rule.kind, rule.threshold_cents) for rule in rules] == [
+        ("big", "single", 5050),
+        ("daily", "daily_total", 1000),
+    ]
+    assert rules[1].currency == "USD"
+    assert parse_rules(None) == []
+
+
+@pytest.mark.parametrize(
+    "raw",
+    ["not json", '{"name": "x"}', '[{"name": "x"}]', '[{"threshold": 1, "kind": "weekly"}]'],
+)
+def test_parse_rules_rejects_bad_config(raw):
+    with pytest.raises(RuleConfigError):
+        parse_rules(raw)
+
+
+def test_single_rule_fires_per_event_at_or_above_threshold():
+    notifier = RecordingNotifier()
+    engine = RulesEngine.from_config('[{"name": "big", "threshold": 100}]', notifier=notifier)
+
+    assert _evaluate(engine, 9999) == []
+    assert len(_evaluate(engine, 10000)) == 1
+    assert len(_evaluate(engine, 25000)) == 1
+    assert [alert.alert_type for alert in notifier.alerts] == ["threshold", "threshold"]
+
+
+def test_daily_total_fires_once_per_entity_and_day():
+    engine = RulesEngine.from_config('[{"name": "daily", "kind": "daily_total", "threshold": 100}]')
+
+    assert _evaluate(engine, 6000) == []
+    hits = _evaluate(engine, 6000)
+    assert len(hits) == 1
+    assert hits[0].metadata["amount_cents"] == 12000
+    assert hits[0].key == "daily:A+ Enterprise LLC"
+    assert _evaluate(engine, 6000) == []
+
+    # Other entities and the next day keep their own totals.
+    assert _evaluate(engine, 6000, entity="Other LLC") == []
+    assert _evaluate(engine, 6000, day=date(2026, 3, 11)) == []
+    assert len(_evaluate(engine, 6000, day=date(2026, 3, 11))) == 1
+
+
+def test_daily_total_keeps_currencies_apart():
+    engine = RulesEngine.from_config('[{"name": "daily", "kind": "daily_total", "threshold": 100}]')
+
+    assert _evaluate(engine, 6000, currency="USD") == []
+    assert _evaluate(engine, 6000, currency="EUR") == []
+    hits = _evaluate(engine, 6000, currency="EUR")
+    assert [(hit.metadata["currency"], hit.metadata["amount_cents"]) for hit in hits] == [("EUR", 12000)]
+    assert "120.00 EUR" in hits[0].message
+
+
+def test_provider_and_entity_filters():
+    engine = RulesEngine.from_config(
+        '[{"name": "gum", "threshold": 10, "provider": "gumroad"},'
+        ' {"name": "aplus", "threshold": 10, "entity": "A+ Enterprise LLC"}]'
+    )
+
+    assert [alert.metadata["rule"] for alert in _evaluate(engine, 5000, provider="gumroad")] == [
+        "aplus",
+        "gum",
+    ]
+    assert [alert.metadata["rule"] for alert in _evaluate(engine, 5000, entity="Other LLC")] == []
+
+
+def test_insert_records_alert_only_for_new_matching_events(db, install_engine):
+    notifier = RecordingNotifier()
+    install_engine(RulesEngine.from_config('[{"name": "big", "threshold": 100}]', notifier=notifier))
+
+    def ingest(event_id, amount_cents):
+        return insert_revenue_event_idempotent(
+            db,
+            RevenueEventIngest(
+                event_id=event_id,
+                provider="stripe",
+                event_type="charge.succeeded",
+                amount_cents=amount_cents,
+                entity="A+ Enterprise LLC",
+                occurred_at=datetime(2026, 3, 10, 18),
+            ),
+        )
+
+    ingest("evt_small", 500)
+    assert repository.PENDING_ALERTS.write() == 0
+
+    _, created = ingest("evt_big", 20000)
+    assert created
+    _, created = ingest("evt_big", 20000)
+    assert not created
+
+    # Hits are written off the request path.
+    assert db.query(RevenueAlert).count() == 0
+    assert repository.PENDING_ALERTS.write() == 1
+    alerts = db.query(RevenueAlert).all()
+    assert [(alert.alert_type, alert.key) for alert in alerts] == [("threshold", "big:A+ Enterprise LLC")]
+    assert alerts[0].record_metadata["event_id"] == "evt_big"
+    assert len(notifier.alerts) == 1
+
+
+def test_rules_run_for_events_committed_outside_the_webhook_path(db, install_engine):
+    notifier = RecordingNotifier()
+    install_engine(RulesEngine.from_config('[{"name": "big", "threshold": 100}]', notifier=notifier))
+
+    _add_manual(db, 20000)
+    db.commit()
+    import_revenue_csv(db, io.StringIO("amount\n50.00\n150.00\n"), CsvColumnMapping(amount="amount"))
+
+    assert [alert.metadata["amount_cents"] for alert in notifier.alerts] == [20000, 15000]
+    assert repository.PENDING_ALERTS.write() == 2
+    assert db.query(RevenueAlert).count() == 2
+
+    _add_manual(db, 30000)
+    db.rollback()
+    db.commit()
+    assert len(notifier.alerts) == 2
+
+
+@pytest.mark.parametrize("safe_mode", [True, False])
+def test_safe_mode_records_threshold_alerts_without_sending(db, install_engine, safe_mode):
+    agent = RevenueTrackingAgent(
+        AgentSettings(
+            safe_mode=safe_mode,
+            stripe_webhook_secret=None,
+            gumroad_webhook_secret=None,
+            slack_webhook_url="https://hooks.slack.test/x",
+            alert_rules='[{"name": "big", "threshold": 100}]',
+        )
+    )
+    agent.notifier.inner = RecordingNotifier()
+    install_engine(agent.rules_engine)
+
+    _add_manual(db, 20000)
+    db.commit()
+
+    assert repository.PENDING_ALERTS.write() == 1
+    assert len(agent.notifier.inner.alerts) == (0 if safe_mode else 1)
+
+
+def test_daily_totals_resume_from_committed_events(db, install_engine):
+    for _ in range(3):
+        _add_manual(db, 3000)
+    _add_manual(db, 9000, currency="EUR")
+    _add_manual(db, 9000, created_at=datetime(2026, 3, 9, 18))
+    db.commit()
+
+    # A freshly deployed process picks up the day's USD total (90.00).
+    notifier = RecordingNotifier()
+    install_engine(
+        RulesEngine.from_config(
+            '[{"name": "daily", "kind": "daily_total", "threshold": 100}]', notifier=notifier
+        )
+    )
+    _add_manual(db, 500)
+    db.commit()
+    assert notifier.alerts == []
+    _add_manual(db, 600)
+    db.commit()
+    assert [alert.metadata["amount_cents"] for alert in notifier.alerts] == [10100]
+
+
+def test_evaluation_is_cheap_per_event():
+    rules = ",".join(
+        f'{{"name": "r{index}", "kind": "daily_total", "threshold": 1000000, "provider": "gumroad"}}'
+        for index in range(50)
+    )
+    engine = RulesEngine.from_config(f'[{rules}, {{"name": "big", "threshold": 1000000}}]')
+
+    started = time.perf_counter()
+    for _ in range(20000):
+        _evaluate(engine, 100)
+    elapsed = time.perf_counter() - started
+
+    # Stripe events skip the 50 gumroad-only rules entirely.
+    assert elapsed < 1.0
+
+
+def test_daily_total_seed_is_an_index_range_scan(db, db_engine):
+    rule = parse_rules('[{"name": "daily", "kind": "daily_total", "threshold": 100}]')[0]
+    statements = []
+
+    @event.listens_for(db_engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    _add_manual(db, 3000, currency="usd")
+    db.commit()
+
+    start, end = datetime(2026, 3, 10, 6), datetime(2026, 3, 11, 6)
+    total = repository.committed_daily_total(db, rule, "A+ Enterprise LLC", "USD", start, end)
+    assert total == 3000
+    statement, parameters = statements[-1]
+    plan = db.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+    assert "ix_revenue_events_entity_currency_created_at" in " ".join(str(row[-1]) for row in plan)
+
+
+def test_pending_alerts_are_written_by_the_lifespan_loop(db, install_engine):
+    install_engine(RulesEngine.from_config('[{"name": "big", "threshold": 100}]'))
+    pending = repository.PENDING_ALERTS
+
+    async def scenario():
+        pending.start(interval_seconds=0.01)
+        _add_manual(db, 20000)
+        db.commit()
+        for _ in range(100):
+            if not len(pending):
+                break
+            await asyncio.sleep(0.01)
+        _add_manual(db, 30000)
+        db.commit()
+        await pending.stop()  # writes what the loop has not reached yet
+
+    asyncio.run(scenario())
+    assert db.query(RevenueAlert).count() == 2
@@ -0,0 +1,132 @@
+"""Tests for request tracing spans and the /debug/traces endpoints."""
+import json
+
+import pytest
+
+import branchberg.app.main as main_module
+from branchberg.app import tracing
+from branchberg.app.revenue_agent.config import AgentSettings
+
+
+def test_spans_nest_under_the_root():
+    buffer = tracing.RingBufferExporter()
+    tracer = tracing.Tracer(1.0, [buffer])
+
+    with tracer.trace("job") as trace:
+        with tracing.span("outer", step=1):
+            with tracing.span("inner"):
+                pass
+        assert tracing.current_trace_id() == trace.trace_id
+
+    assert tracing.current_trace_id() is None
+    [record] = buffer.recent()
+    names = {span["name"]: span for span in record["spans"]}
+    assert names["outer"]["parent_id"] == names["job"]["span_id"]
+    assert names["inner"]["parent_id"] == names["outer"]["span_id"]
+    assert names["outer"]["attributes"] == {"step": 1}
+    assert all(span["duration_ms"] is not None for span in record["spans"])
+
+
+def test_errors_are_recorded_on_the_span():
+    buffer = tracing.RingBufferExporter()
+    tracer = tracing.Tracer(1.0, [buffer])
+
+    with pytest.raises(KeyError):
+        with tracer.trace("job"):
+            with tracing.span("lookup"):
+                raise KeyError("missing")
+
+    spans = {span["name"]: span for span in buffer.recent()[0]["spans"]}
+    assert spans["lookup"]["error"] == "KeyError"
+    assert spans["job"]["error"] == "KeyError"
+
+
+def test_unsampled_traces_record_nothing():
+    buffer = tracing.RingBufferExporter()
+    tracer = tracing.Tracer(0.5, [buffer], sampler=lambda: 0.9)
+
+    with tracer.trace("job") as trace:
+        with tracing.span("stage") as stage:
+            assert stage is None
+    assert trace is None
+    assert buffer.recent() == []
+    assert not tracing.Tracer(0.0).enabled
+
+
+def test_json_lines_exporter_appends_one_line_per_trace(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = tracing.Tracer(1.0, [tracing.JsonLinesExporter(str(path))])
+
+    for name in ("first", "second"):
+        with tracer.trace(name):
+            with tracing.span("stage"):
+                pass
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["name"] for line in lines] == ["first", "second"]
+    assert [span["name"] for span in lines[0]["spans"]] == ["first", "stage"]
+
+
+def test_ring_buffer_is_bounded_and_summarizes_stages():
+    buffer = tracing.RingBufferExporter(size=3)
+    tracer = tracing.Tracer(1.0, [buffer])
+    for _ in range(5):
+        with tracer.trace("job"):
+            with tracing.span("stage"):
+                pass
+
+    assert len(buffer.recent(limit=10)) == 3
+    stages = buffer.stages()
+    assert stages["stage"]["count"] == 3
+    assert stages["stage"]["p50_ms"] <= stages["stage"]["max_ms"]
+
+
+@pytest.fixture()
+def client(client, monkeypatch):
+    monkeypatch.setattr(main_module.TRACER, "sample_rate", 1.0)
+    main_module.TRACE_BUFFER.clear()
+    yield client
+    main_module.TRACE_BUFFER.clear()
+
+
+def test_stripe_webhook_stages_are_traced(client, monkeypatch):
+    settings = AgentSettings(
+        safe_mode=False, stripe_webhook_secret="whsec_test", gumroad_webhook_secret=None, slack_webhook_url=None
+    )
+    monkeypatch.setattr(main_module, "AGENT_SETTINGS", settings, raising=True)
+
+    import stripe
+
+    def ok_construct_event(payload, sig_header, secret):
+        return {"id": "evt_trace", "type": "charge.succeeded", "data": {"object": {"amount": 500}}}
+
+    monkeypatch.setattr(stripe.Webhook, "construct_event", ok_construct_event, raising=True)
+
+    first = client.post("/webhooks/stripe", content=b"{}", headers={"Stripe-Signature": "t=1,v1=abc"})
+    retry = client.post("/webhooks/stripe", content=b"{}", headers={"Stripe-Signature": "t=1,v1=abc"})
+    assert first.headers["X-Trace-Id"] != retry.headers["X-Trace-Id"]
+
+    res = client.get("/debug/traces", params={"name": "POST /webhooks/stripe"})
+    assert res.status_code == 200
+    retry_trace, first_trace = res.json()["traces"]
+    assert retry_trace["trace_id"] == retry.headers["X-Trace-Id"]
+
+    first_names = [span["name"] for span in first_trace["spans"]]
+    for stage in ("stripe.read_body", "stripe.verify_and_parse", "repository.insert_revenue_event", "repository.commit"):
+        assert stage in first_names
+    assert "db.query" in first_names
+
+    # The duplicate delivery shows the IntegrityError path.
+    retry_names = [span["name"] for span in retry_trace["spans"]]
+    assert "repository.rollback" in retry_names
+    assert "repository.requery" in retry_names
+    insert = next(span for span in retry_trace["spans"] if span["name"] == "repository.insert_revenue_event")
+    assert insert["attributes"] == {"provider": "stripe", "created": False}
+
+    stages = client.get("/debug/traces/stages").json()["stages"]
+    assert stages["repository.commit"]["count"] == 2
+
+
+def test_debug_requests_are_not_traced(client):
+    client.get("/debug/traces")
+    assert client.get("/debug/traces").json()["traces"] == []
@@ -2,7 +2,65 @@
 import sys
 import os
 
+import pytest
+
 # Add project root to Python path for imports
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
+
+
+@pytest.fixture()
+def sqlite_engine(tmp_path):
+    """An empty file-backed SQLite database, usable from the TestClient's threads."""
+    from sqlalchemy import create_engine
+
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'test.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture()
+def db_engine(sqlite_engine):
+    """`sqlite_engine` with every table (and the search index) created."""
+    from branchberg.app.database import Base
+
+    Base.metadata.create_all(bind=sqlite_engine)
+    return sqlite_engine
+
+
+@pytest.fixture()
+def session_factory(db_engine):
+    from sqlalchemy.orm import sessionmaker
+
+    return sessionmaker(autocommit=False, autoflush=False, bind=db_engine)
+
+
+@pytest.fixture()
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+
+@pytest.fixture()
+def client(session_factory):
+    """TestClient for the API with `get_db` served from `session_factory`."""
+    from fastapi.testclient import TestClient
+
+    from branchberg.app.database import get_db
+    from branchberg.app.main import app
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)